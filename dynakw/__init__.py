@@ -8,6 +8,8 @@ logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 
 from .core.keyword_file import DynaKeywordReader
+from .core.block_index import BlockInfo
+from .core.mesh_tables import ElementTable, NodeTable
 from .core.enums import KeywordType
 from .core.parameter_ref import ParameterRef
 from .core.card_schema import CardField, CardGroup, CardSchema
@@ -24,6 +26,9 @@ from .core.introspect import (
 
 __all__ = [
     "DynaKeywordReader",
+    "BlockInfo",
+    "NodeTable",
+    "ElementTable",
     "KeywordType",
     "ParameterRef",
     "LSDynaKeyword",
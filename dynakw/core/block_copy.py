@@ -0,0 +1,124 @@
+"""Copying unchanged keyword blocks from the files they were read from.
+
+A keyword read from a file remembers where its block is -- the file, the byte
+offset and length, and a CRC-32 of the bytes -- and whether it has been
+changed since (``LSDynaKeyword.modified``).  ``DynaKeywordReader.write`` hands
+every keyword to a ``BlockCopier`` first, which writes the block of an
+unchanged one straight from its file: the file is memory-mapped once, and the
+bytes go from the map to the output without being decoded or formatted.
+Only the keywords it declines are written from their cards.  An unchanged
+deck is therefore written back byte for byte, comments, spacing and line
+ends included, at the speed of a file copy.
+
+The CRC is checked before a block is copied, so a file that has changed since
+it was read is never copied from; its keywords are formatted instead.  A
+compressed file is inflated as the blocks are copied, once as long as they are
+asked for in file order, as they are when a deck is written.  Nothing is
+copied from a stream that can only be read once.
+"""
+
+import mmap
+import zlib
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+from dynakw.core.compression import compression_of, open_deck
+from dynakw.core.deck_source import DeckSource
+from dynakw.keywords.lsdyna_keyword import LSDynaKeyword
+
+
+class BlockCopier:
+    """Copies the blocks of unchanged keywords, from a deck and its include files."""
+
+    def __init__(self, master: DeckSource):
+        self._master = master
+        # Reads ``length`` bytes at ``offset`` of each file; None when it
+        # cannot be copied from.
+        self._readers: Dict[str, Optional[Callable[[int, int], bytes]]] = {}
+        self._maps: List[mmap.mmap] = []
+        self._views: List[memoryview] = []
+        self._inflated: List["_Inflated"] = []
+
+    def copy(self, keyword: LSDynaKeyword, out: BinaryIO) -> bool:
+        """
+        Write the block of *keyword* to *out* as it was read, if it is unchanged.
+
+        Returns:
+            Whether it was written; when not, *out* is untouched.
+        """
+        span = keyword._span
+        if span is None or keyword.modified:
+            return False
+        path, offset, length, crc = span
+        if path not in self._readers:
+            self._readers[path] = self._reader(path)
+        read = self._readers[path]
+        if read is None:
+            return False
+        try:
+            data = read(offset, length)
+        except OSError:
+            return False
+        if len(data) != length or zlib.crc32(data) != crc:
+            return False
+        out.write(data)
+        if data[-1:] != b'\n':
+            out.write(b'\n')
+        return True
+
+    def _reader(self, path: str) -> Optional[Callable[[int, int], bytes]]:
+        master = self._master
+        if path == master.name and master.path is None:
+            return master.read_at if master.rereadable else None
+        if path == master.name:
+            path = master.path
+        if compression_of(path) is not None:
+            try:
+                inflated = _Inflated(path)
+            except OSError:
+                return None
+            self._inflated.append(inflated)
+            return inflated.read_at
+        try:
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Gone, or empty and so not the file the blocks came from.
+            return None
+        self._maps.append(mm)
+        view = memoryview(mm)
+        self._views.append(view)
+        return lambda offset, length: view[offset:offset + length]
+
+    def close(self):
+        """Unmap the files mapped."""
+        for view in self._views:
+            view.release()
+        for mm in self._maps:
+            mm.close()
+        for inflated in self._inflated:
+            inflated.close()
+        self._views.clear()
+        self._maps.clear()
+        self._inflated.clear()
+        self._readers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _Inflated:
+    """A compressed file read at offsets.  It seeks forward by inflating up to
+    the offset, and back by starting over."""
+
+    def __init__(self, path: str):
+        self._file = open_deck(path, background=False)
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def close(self):
+        self._file.close()
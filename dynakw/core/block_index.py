@@ -0,0 +1,249 @@
+"""Table of contents of a keyword file.
+
+A keyword file is a sequence of blocks, each starting at a line that begins
+with ``*``.  ``scan_blocks`` finds those blocks in one pass over the raw bytes
+without parsing any card, and records where each one is, so a block can later
+be read on its own::
+
+    blocks = scan_blocks("model.k")
+    [b.keyword_line for b in blocks if b.type == KeywordType.NODE]
+
+The blocks are those ``DynaKeywordReader`` produces when it reads the same
+file, in the same order, so ``BlockInfo.ordinal`` is also the position of the
+keyword in ``DynaKeywordReader.keywords()``.
+
+``map_blocks`` is the reader's own way of splitting a file: it memory-maps the
+file and hands out each block's bytes, leaving their decoding to whoever
+parses the block.  ``read_blocks`` does the same by reading the file in large
+buffers, for files that are not to be, or cannot be, mapped.  Both read
+compressed files too (see ``dynakw.core.compression``), ``map_blocks`` by
+handing them to ``read_blocks``.
+"""
+
+import logging
+import mmap
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from dynakw.core.compression import compression_of, open_deck
+from dynakw.core.enums import KeywordType
+from dynakw.keywords.lsdyna_keyword import LSDynaKeyword
+from dynakw.keywords.UNKNOWN import Unknown
+from dynakw.utils.block_text import first_line
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = 1 << 20
+"""Bytes read at a time by ``read_blocks`` and ``scan_blocks``."""
+
+
+@dataclass(frozen=True)
+class BlockInfo:
+    """Where one keyword block is, and what it is."""
+
+    ordinal: int
+    """Position of the block in reading order, counting all files read."""
+    keyword_line: str
+    """The keyword line, upper-cased and stripped, e.g. ``"*NODE"``."""
+    keyword_class: Optional[type]
+    """The class that parses the block; None when it is read as ``Unknown``."""
+    type: KeywordType
+    path: str
+    """The file holding the block; an include file when includes are followed."""
+    byte_offset: int
+    byte_length: int
+    line_offset: int
+    """Index of the keyword line in ``path``; the line number less one."""
+    line_count: int
+
+    @property
+    def start_line(self) -> int:
+        """The line number of the keyword line, counting from 1."""
+        return self.line_offset + 1
+
+    def contains_line(self, line: int) -> bool:
+        """Whether the 1-based line number *line* of ``path`` is in the block."""
+        return self.start_line <= line < self.start_line + self.line_count
+
+
+def _classify(keyword_line: str):
+    """The class and type a reader gives the block starting at *keyword_line*."""
+    keyword_class = LSDynaKeyword.resolve(keyword_line)
+    if keyword_class is None or keyword_class is Unknown:
+        return None, KeywordType.UNKNOWN
+    return keyword_class, LSDynaKeyword._parse_keyword_name(keyword_line)[0]
+
+
+def block_info(ordinal: int, path: str, data: bytes, line_offset: int,
+               byte_offset: int) -> BlockInfo:
+    """The ``BlockInfo`` of the block *data* found at the given place in *path*."""
+    keyword_line = first_line(data).strip().upper()
+    keyword_class, kw_type = _classify(keyword_line)
+    line_count = data.count(b'\n') + (not data.endswith(b'\n'))
+    return BlockInfo(ordinal, keyword_line, keyword_class, kw_type, path,
+                     byte_offset, len(data), line_offset, line_count)
+
+
+def scan_blocks(path: str) -> List[BlockInfo]:
+    """
+    Lists the keyword blocks of a file without parsing them.
+
+    ``*INCLUDE`` blocks are listed like any other; ``include_tree`` lists the
+    blocks of a deck with its include files followed.
+
+    Args:
+        path (str): The keyword file.
+
+    Returns:
+        The blocks in reading order.  A missing file gives an empty list.
+    """
+    try:
+        f = open_deck(path)
+    except OSError as e:
+        logger.error(f"Error reading file {path}: {e}")
+        return []
+
+    with f:
+        return scan_file(f, path)
+
+
+def scan_file(f: BinaryIO, path: str) -> List[BlockInfo]:
+    """As ``scan_blocks``, for the deck read from the binary file object *f*."""
+    return [block_info(ordinal, path, data, line_offset, byte_offset)
+            for ordinal, (data, line_offset, byte_offset)
+            in enumerate(split_blocks(f))]
+
+
+def map_blocks(path: str) -> Iterator[Tuple[bytes, int]]:
+    """
+    The keyword blocks of a file, found in a memory map of it.
+
+    The file is mapped, not read: block boundaries are found by searching the
+    map for a newline followed by ``*``, and each block is copied out of the
+    map once, as bytes.  No per-line Python objects are made, and nothing
+    handed out refers into the map, so the file can be overwritten while
+    keywords read from it are alive.  ``*INCLUDE`` lines are not followed.
+
+    The file is opened and mapped when this is called, so a file that cannot be
+    opened raises ``OSError`` here rather than while iterating.
+
+    A compressed file cannot be mapped; its blocks are those of ``read_blocks``.
+
+    Returns:
+        An iterator over ``(block bytes, line offset of the keyword line)``.
+    """
+    blocks = map_split_blocks(path)
+    return ((data, line_offset) for data, line_offset, _ in blocks)
+
+
+def map_split_blocks(path: str) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    As ``map_blocks``, yielding ``(block bytes, line offset, byte offset)``.
+
+    The byte offsets of a compressed file are those of its inflated text.
+    """
+    if compression_of(path) is not None:
+        return _read_file_split_blocks(open_deck(path), BUFFER_SIZE)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return iter(())
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return _mapped_blocks(mm)
+
+
+def _mapped_blocks(mm: mmap.mmap) -> Iterator[Tuple[bytes, int, int]]:
+    with mm:
+        size = len(mm)
+        if mm[:1] == b'*':
+            pos = 0
+        else:
+            pos = mm.find(b'\n*')
+            if pos < 0:
+                return
+            pos += 1
+        line_no = mm[:pos].count(b'\n')
+        while pos < size:
+            end = mm.find(b'\n*', pos)
+            end = size if end < 0 else end + 1
+            data = mm[pos:end]
+            yield data, line_no, pos
+            line_no += data.count(b'\n')
+            pos = end
+
+
+def read_blocks(path: str, buffer_size: int = BUFFER_SIZE) -> Iterator[Tuple[bytes, int]]:
+    """
+    The keyword blocks of a file, as ``map_blocks`` gives them, read in buffers.
+
+    The file is opened when this is called, so a file that cannot be opened
+    raises ``OSError`` here rather than while iterating.  A compressed file is
+    inflated in a thread of its own while its blocks are split and parsed.
+    """
+    f = open_deck(path)
+    return _read_file_blocks(f, buffer_size)
+
+
+def _read_file_blocks(f: BinaryIO, buffer_size: int) -> Iterator[Tuple[bytes, int]]:
+    with f:
+        yield from buffered_blocks(f, buffer_size)
+
+
+def _read_file_split_blocks(f: BinaryIO, buffer_size: int) -> Iterator[Tuple[bytes, int, int]]:
+    with f:
+        yield from split_blocks(f, buffer_size)
+
+
+def buffered_blocks(f: BinaryIO, buffer_size: int = BUFFER_SIZE) -> Iterator[Tuple[bytes, int]]:
+    """
+    The keyword blocks read from the binary file object *f*.
+
+    *f* is read *buffer_size* bytes at a time, and block boundaries are found
+    by searching the buffer for a newline followed by ``*``, as in
+    ``map_blocks``; lines are never split out one by one.
+
+    Returns:
+        An iterator over ``(block bytes, line offset of the keyword line)``.
+    """
+    for data, line_offset, _ in split_blocks(f, buffer_size):
+        yield data, line_offset
+
+
+def split_blocks(f: BinaryIO, buffer_size: int = BUFFER_SIZE) -> Iterator[Tuple[bytes, int, int]]:
+    """As ``buffered_blocks``, yielding ``(block bytes, line offset, byte offset)``."""
+    # The buffer starts with a newline that is not in the file, so that a
+    # keyword on the first line is found by the same search as any other.
+    buf = bytearray(b'\n')
+    base = -1           # file offset of buf[0]
+    line_no = -1        # line offset of buf[pos]; of buf[0] before the first keyword
+    pos = None          # start of the current block in buf; None before the first keyword
+    scan = 0            # where the next search of buf starts
+    while True:
+        end = buf.find(b'\n*', scan)
+        if end >= 0:
+            if pos is None:
+                line_no += buf.count(b'\n', 0, end + 1)
+            else:
+                data = bytes(buf[pos:end + 1])
+                yield data, line_no, base + pos
+                line_no += data.count(b'\n')
+            pos = scan = end + 1
+            continue
+
+        chunk = f.read(buffer_size)
+        if not chunk:
+            if pos is not None and pos < len(buf):
+                yield bytes(buf[pos:]), line_no, base + pos
+            return
+        # Keep only the current block, or before the first keyword the last
+        # newline, which may be followed by a '*' in the new chunk.
+        if pos is None:
+            keep = buf.rfind(b'\n')
+            line_no += buf.count(b'\n', 0, keep)
+        else:
+            keep = pos
+            pos = 0
+        del buf[:keep]
+        base += keep
+        scan = max(len(buf) - 1, 0)
+        buf += chunk
@@ -0,0 +1,192 @@
+"""Writing changed keywords back into the files they were read from.
+
+``DynaKeywordReader.patch`` leaves a deck where it is and rewrites only what
+changed.  Every keyword read from a file knows its block's byte offset,
+length and CRC-32 (see ``dynakw.core.block_copy``), so a changed keyword is
+formatted on its own and put over its old block:
+
+* a block that formats to its old length is overwritten in place;
+* one that formats shorter is padded to its old length with ``$`` comment
+  lines, which LS-DYNA skips, and overwritten in place as well;
+* otherwise the file is rewritten from that block to its end, with the
+  blocks after it copied from the file, and the rest of the file moves.
+
+Changing a ``*PARAMETER`` in a deck of many gigabytes therefore writes a few
+hundred bytes, unless the new block is longer than the old one.  The blocks a
+patch overwrites or moves are checked against their CRC first: a file changed
+since it was read is left alone.  A patch is not atomic; a crash while the
+end of a file is being rewritten leaves that file cut short.
+"""
+
+import io
+import os
+import tempfile
+import zlib
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from dynakw.core.compression import compression_of
+from dynakw.keywords.lsdyna_keyword import LSDynaKeyword
+
+_PAD_LINE = 80
+"""Longest ``$`` comment line written as padding, newline included."""
+
+_COPY_CHUNK = 16 << 20
+"""Bytes copied at a time when the end of a file is rewritten."""
+
+
+class PatchError(Exception):
+    """A file cannot be patched: it is compressed, or has changed since it was read."""
+
+
+def padding(size: int, newline: bytes = b'\n') -> bytes:
+    """``$`` comment lines of *size* bytes in all, ending in *newline*;
+    *size* is at least one more than the length of *newline*."""
+    shortest = 1 + len(newline)
+    lines = []
+    while size > 0:
+        n = min(size, _PAD_LINE)
+        if 0 < size - n < shortest:
+            n -= shortest
+        lines.append(b'$' + b' ' * (n - shortest) + newline)
+        size -= n
+    return b''.join(lines)
+
+
+class FilePatch:
+    """
+    The changes to one file, worked out and checked before anything is written.
+
+    Args:
+        path: The file.
+        keywords: The keywords read from it, each once, with a span in it.
+        pad: Pad blocks that format shorter to their old length.
+
+    Raises:
+        PatchError: The file cannot be patched.
+    """
+
+    def __init__(self, path: str, keywords: List[LSDynaKeyword], pad: bool = True):
+        if compression_of(path) is not None:
+            raise PatchError(f"{path} is compressed")
+        self.path = path
+        self._blocks = sorted(keywords, key=lambda kw: kw._span[1])
+        # The new bytes of each changed block, by position in _blocks, and
+        # the lines they gain.
+        self._new: Dict[int, bytes] = {}
+        self._new_lines: Dict[int, int] = {}
+        # Where the file starts to move, and its new end spooled from there.
+        self._tail_from: Optional[int] = None
+        self._tail: Optional[BinaryIO] = None
+        with open(path, 'rb') as f:
+            for i, keyword in enumerate(self._blocks):
+                if keyword.modified:
+                    self._new[i], self._new_lines[i] = self._render(f, keyword, pad)
+                    if self._tail_from is None and len(self._new[i]) != keyword._span[2]:
+                        self._tail_from = i
+            if self._tail_from is not None:
+                self._spool_tail(f)
+
+    @property
+    def changed(self) -> int:
+        """The number of blocks the patch writes."""
+        return len(self._new)
+
+    def _render(self, f: BinaryIO, keyword: LSDynaKeyword, pad: bool) -> Tuple[bytes, int]:
+        """The new bytes of *keyword*'s block, in the line ends of its old
+        one, and the lines it has more than the old one."""
+        _, offset, length, crc = keyword._span
+        f.seek(offset)
+        old = f.read(length)
+        if len(old) != length or zlib.crc32(old) != crc:
+            raise PatchError(f"{self.path} has changed since it was read")
+        text = _written(keyword).encode('utf-8')
+        newline = b'\r\n' if old.endswith(b'\r\n') else b'\n'
+        if newline != b'\n':
+            text = text.replace(b'\n', newline)
+        if pad and len(newline) < length - len(text):
+            text += padding(length - len(text), newline)
+        return text, text.count(b'\n') - old.count(b'\n')
+
+    def _spool_tail(self, f: BinaryIO):
+        """Write the new end of the file, from the first block that changes
+        length, to a temporary file, checking the blocks copied."""
+        self._tail = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(self.path)))
+        pos = self._blocks[self._tail_from]._span[1]
+        for i in range(self._tail_from, len(self._blocks)):
+            _, offset, length, crc = self._blocks[i]._span
+            _copy(f, self._tail, pos, offset - pos)
+            if i in self._new:
+                self._tail.write(self._new[i])
+            elif _copy(f, self._tail, offset, length) != crc:
+                self._tail.close()
+                raise PatchError(f"{self.path} has changed since it was read")
+            pos = offset + length
+        f.seek(0, os.SEEK_END)
+        _copy(f, self._tail, pos, f.tell() - pos)
+
+    def apply(self):
+        """
+        Write the changes, and record the blocks where they now are: the
+        changed keywords are no longer ``modified``, and the spans and line
+        numbers of the blocks after them follow the file.
+        """
+        moved_from = (self._blocks[self._tail_from]._span[1]
+                      if self._tail_from is not None else None)
+        with open(self.path, 'r+b') as f:
+            for i, data in self._new.items():
+                if self._tail_from is None or i < self._tail_from:
+                    f.seek(self._blocks[i]._span[1])
+                    f.write(data)
+            if self._tail is not None:
+                with self._tail:
+                    self._tail.seek(0)
+                    f.seek(moved_from)
+                    while True:
+                        chunk = self._tail.read(_COPY_CHUNK)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                    f.truncate()
+        self._record()
+
+    def close(self):
+        """Drop a patch that is not to be applied."""
+        if self._tail is not None:
+            self._tail.close()
+
+    def _record(self):
+        shift = 0
+        lines = 0
+        for i, keyword in enumerate(self._blocks):
+            path, offset, length, crc = keyword._span
+            if lines and keyword._start_line is not None:
+                keyword._start_line += lines
+            data = self._new.get(i)
+            if data is None:
+                if shift:
+                    keyword._span = (path, offset + shift, length, crc)
+                continue
+            keyword._rewritten((path, offset + shift, len(data), zlib.crc32(data)), data)
+            shift += len(data) - length
+            lines += self._new_lines[i]
+
+
+def _written(keyword: LSDynaKeyword) -> str:
+    """*keyword* formatted from its cards."""
+    out = io.StringIO()
+    keyword.write_source(out)
+    return out.getvalue()
+
+
+def _copy(src: BinaryIO, dst: BinaryIO, offset: int, length: int) -> int:
+    """Copy *length* bytes at *offset* of *src* to *dst*; returns their CRC-32."""
+    crc = 0
+    src.seek(offset)
+    while length > 0:
+        chunk = src.read(min(length, _COPY_CHUNK))
+        if not chunk:
+            break
+        crc = zlib.crc32(chunk, crc)
+        dst.write(chunk)
+        length -= len(chunk)
+    return crc
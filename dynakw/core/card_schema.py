@@ -8,8 +8,11 @@ therefore belongs here rather than in a separate table that could drift.
 """
 
 from dataclasses import dataclass, field
+from functools import cached_property
 from typing import Any, Callable, Dict, List, Optional, Union
 
+from dynakw.utils.format_parser import FormatParser, LineCodec
+
 
 @dataclass
 class CardField:
@@ -89,6 +92,22 @@ class CardSchema:
     condition_doc: str = ""
     dynamic: bool = False
 
+    @cached_property
+    def codec(self) -> LineCodec:
+        """This card's layout compiled for reading and writing lines.
+
+        Built on first use and kept, so slice offsets, field converters, field
+        writers and the header line are worked out once per card rather than
+        once per line.  It is the same codec ``FormatParser.parse_line`` uses
+        for the same layout, so custom parsers share it too.  ``fields`` must
+        not be changed once the codec has been built.
+        """
+        return FormatParser().codec(
+            [f.type for f in self.fields],
+            [f.width for f in self.fields],
+            header_names=[f.header_name or f.name for f in self.fields],
+        )
+
 
 @dataclass
 class CardGroup:
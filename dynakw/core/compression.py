@@ -0,0 +1,155 @@
+"""Keyword files kept compressed with gzip, bzip2 or xz.
+
+A deck named ``model.k.gz``, ``model.k.bz2`` or ``model.k.xz`` (or
+``.lzma``) is read and written through the standard library module for its
+format, without an uncompressed copy on disk.  A file whose name does not
+say it is compressed is recognised by its first bytes, so an ``*INCLUDE``
+naming a compressed file without such an extension is read too::
+
+    dkr = DynaKeywordReader("model.k.gz", follow_include=True)
+    dkr.write("model_scaled.k.xz")
+
+``open_deck`` inflates a file in a thread of its own, a few buffers ahead of
+whoever reads it, so that the reader splits and parses blocks while the next
+ones are being inflated; the decompressors release the GIL while they work.
+A compressed file cannot be memory-mapped, and the byte offsets of its
+``BlockInfo`` entries count uncompressed bytes.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import queue
+import threading
+from typing import BinaryIO, TextIO
+
+BUFFER_SIZE = 1 << 20
+"""Bytes inflated at a time by the thread of ``open_deck``."""
+
+BUFFERS_AHEAD = 4
+"""Inflated buffers the thread of ``open_deck`` may get ahead of its reader."""
+
+_EXTENSIONS = {'.gz': gzip, '.bz2': bz2, '.xz': lzma, '.lzma': lzma}
+_MAGIC = [(b'\x1f\x8b', gzip), (b'BZh', bz2), (b'\xfd7zXZ\x00', lzma)]
+
+
+def compression_of(path: str, sniff: bool = True):
+    """
+    The module (``gzip``, ``bz2`` or ``lzma``) that reads *path*, or None for
+    a plain file.
+
+    Args:
+        path: The file.
+        sniff: When the name does not give the format, look at the first
+            bytes of the file, if there is one.
+    """
+    module = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if module is not None or not sniff:
+        return module
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(6)
+    except OSError:
+        return None
+    for magic, module in _MAGIC:
+        if head.startswith(magic):
+            return module
+    return None
+
+
+def open_deck(path: str, background: bool = True) -> BinaryIO:
+    """
+    Opens *path* for reading bytes, inflating it if it is compressed.
+
+    Args:
+        path: The file.
+        background: Inflate in a thread of its own, ahead of the reads.  The
+            file given back then cannot seek; without it, a compressed file
+            seeks by inflating up to the offset.
+
+    Raises:
+        OSError: The file cannot be opened.
+    """
+    module = compression_of(path)
+    if module is None:
+        return open(path, 'rb')
+    f = module.open(path, 'rb')
+    return _Inflater(f) if background else f
+
+
+def open_for_writing(path: str) -> TextIO:
+    """Opens *path* for writing text, compressed if its extension asks for it."""
+    module = compression_of(path, sniff=False)
+    if module is None:
+        return open(path, 'w', encoding='utf-8')
+    return module.open(path, 'wt', encoding='utf-8')
+
+
+class _Inflater:
+    """A compressed file read by a thread of its own, *BUFFERS_AHEAD* buffers ahead."""
+
+    def __init__(self, f: BinaryIO):
+        self._file = f
+        self.name = getattr(f, 'name', None)
+        self._buffers: queue.Queue = queue.Queue(maxsize=BUFFERS_AHEAD)
+        self._stop = threading.Event()
+        self._rest = b''
+        self._done = False
+        self._thread = threading.Thread(target=self._inflate, daemon=True,
+                                        name=f"inflate {self.name}")
+        self._thread.start()
+
+    def _inflate(self):
+        try:
+            while not self._stop.is_set():
+                data = self._file.read(BUFFER_SIZE)
+                self._put(data)
+                if not data:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._buffers.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def read(self, size: int = -1) -> bytes:
+        """Up to *size* inflated bytes; all that is left when *size* is negative."""
+        if size is None or size < 0:
+            parts = [self._rest]
+            self._rest = b''
+            while not self._done:
+                parts.append(self._next())
+            return b''.join(parts)
+        while not self._rest and not self._done:
+            self._rest = self._next()
+        data, self._rest = self._rest[:size], self._rest[size:]
+        return data
+
+    def _next(self) -> bytes:
+        item = self._buffers.get()
+        if isinstance(item, Exception):
+            self._done = True
+            raise item
+        if not item:
+            self._done = True
+        return item
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
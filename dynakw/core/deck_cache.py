@@ -0,0 +1,140 @@
+"""Sidecar cache of a parsed keyword file.
+
+Reading a large deck is dominated by parsing its text.  When the same deck is
+opened again and has not changed, the parsed keywords can be loaded back from
+a file written beside it instead::
+
+    model.k                 the deck
+    model.k.dynakw-cache    its keywords and block index, pickled
+
+The cache is keyed on the library version and, for the deck and every include
+file read with it, the absolute path, size, modification time and a BLAKE2b
+hash of the content.  A cache whose key does not match is ignored and
+rewritten, so a stale cache never changes what is read.
+
+The cache is a pickle.  Only load caches written by this library, from
+directories you trust.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = ".dynakw-cache"
+
+_HASH_CHUNK = 1 << 20
+
+
+def cache_path(filename: str) -> str:
+    """The sidecar cache file for the deck *filename*."""
+    return filename + SUFFIX
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stat_key(path: str) -> Tuple[str, int, int]:
+    """The absolute path, size and modification time of *path*."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def make_key(paths: List[str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The key a cache of *paths*, read with *options*, is stored under.
+
+    Args:
+        paths: The deck followed by the include files read with it.
+        options: Reader settings that change what is parsed.
+    """
+    from dynakw import __version__
+    return {
+        'version': __version__,
+        'options': dict(options),
+        'files': [stat_key(p) + (_file_hash(p),) for p in paths],
+    }
+
+
+def _key_matches(key: Dict[str, Any], options: Dict[str, Any]) -> bool:
+    from dynakw import __version__
+    if key.get('version') != __version__ or key.get('options') != options:
+        return False
+    for path, size, mtime_ns, digest in key['files']:
+        try:
+            if stat_key(path) != (path, size, mtime_ns):
+                return False
+        except OSError:
+            return False
+    # Size and time agree; the content has the last word.
+    return all(_file_hash(path) == digest for path, _, _, digest in key['files'])
+
+
+def load(filename: str, options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    The cached reading of *filename*, or None when there is no valid cache.
+
+    Returns:
+        A dict with ``keywords`` (a list of pickled keywords, in order),
+        ``index``, ``include_files`` and ``includes``.
+    """
+    path = cache_path(filename)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            key = pickle.load(f)
+            if not _key_matches(key, options):
+                logger.info(f"Cache {path} is out of date")
+                return None
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Error {e} loading cache {path}")
+        return None
+
+
+def save(filename: str, options: Dict[str, Any], keywords: List[bytes],
+         index: list, include_files: List[str], read_stat: Tuple[str, int, int],
+         includes: Optional[List[Tuple[int, int, str, str]]] = None):
+    """
+    Writes the cache of *filename*.  A cache that cannot be written is logged
+    and skipped; reading does not depend on it.
+
+    Args:
+        filename: The deck.
+        options: Reader settings that change what is parsed.
+        keywords: Each keyword, pickled as it was parsed, in order.
+        index: The block index of the deck.
+        include_files: The include files read with the deck.
+        read_stat: ``stat_key`` of the deck when reading began.  Nothing is
+            written if the deck has changed since.
+        includes: Where each include file is included (``IncludeTree.includes``).
+    """
+    path = cache_path(filename)
+    tmp_path = path + ".tmp"
+    try:
+        key = make_key([filename] + list(include_files), options)
+        if key['files'][0][:3] != tuple(read_stat):
+            logger.info(f"{filename} changed while it was read; not caching it")
+            return
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump({'keywords': keywords, 'index': index,
+                         'include_files': list(include_files),
+                         'includes': list(includes or [])},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Error {e} writing cache {path}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,236 @@
+"""Writing a deck as a master file and the include files it pulls in.
+
+``DynaKeywordReader.write(filename, shard=...)`` spreads the keywords over
+several files, each written like a deck of its own, and writes a master
+``filename`` that includes them with ``*INCLUDE``.  ``plan_shards`` decides
+which keyword goes where; the policy is one of
+
+``"type"``
+    A file per keyword family, the first word of the keyword: ``*NODE`` to
+    ``model_node.k``, ``*MAT_...`` to ``model_mat.k``, ``*SET_...`` to
+    ``model_set.k``.  ``*KEYWORD``, ``*END``, ``*TITLE`` and the
+    ``*INCLUDE...`` keywords that were not followed stay in the master.
+``"part"``
+    A file per part ID, ``model_part7.k``, for the keywords that have a
+    ``PID`` column: ``*PART`` and the elements.  A keyword holding several
+    parts is split into one keyword per part.  Everything else stays in the
+    master.
+``"include"``
+    The include files the deck was read from (with ``follow_include``), at
+    the same places relative to the master, nested as they were.  A deck read
+    and written this way gets its include layout back.
+a callable
+    Given each keyword, returns the file it goes to, relative to the
+    master's directory, or None to keep it in the master.
+
+Apart from ``"include"``, the master includes each file where its first
+keyword was, and holds one ``*KEYWORD``, first, and one ``*END``, last: the
+ones of include files read with ``follow_include`` would otherwise land in
+the middle of it, and LS-DYNA stops reading at the first ``*END``.  Keywords
+stay in deck order within their file.  Keywords that
+are not split are written as they are always written: copied from the file
+they were read from while unchanged (see ``dynakw.core.block_copy``).
+"""
+
+import copy
+import os
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from dynakw.core.compression import compression_of
+from dynakw.keywords.lsdyna_keyword import LSDynaKeyword
+from dynakw.keywords.UNKNOWN import Unknown
+
+ShardPolicy = Union[str, Callable[[LSDynaKeyword], Optional[str]]]
+"""``"type"``, ``"part"``, ``"include"``, or a callable naming each keyword's file."""
+
+_MASTER_FAMILIES = ('keyword', 'end', 'title', 'include')
+"""Keyword families that ``"type"`` keeps in the master."""
+
+
+def plan_shards(keywords: List[LSDynaKeyword], policy: ShardPolicy, filename: str,
+                read_from: Optional[str] = None,
+                includes: Optional[List[Tuple[int, int, str, str]]] = None
+                ) -> List[Tuple[str, List[LSDynaKeyword]]]:
+    """
+    The files to write for *keywords* under *policy*, master first.
+
+    Args:
+        keywords: The keywords of the deck, in deck order.
+        policy: See the module documentation.
+        filename: The master file to write.
+        read_from: The master file the deck was read from; include files
+            are placed relative to it for ``"include"``.
+        includes: For ``"include"``, where each include file was included,
+            as recorded by ``IncludeTree.includes``: the span of *keywords*
+            that came from it, the file that included it and the file.
+
+    Returns:
+        ``(path, keywords)`` for each file, the master's holding the
+        ``*INCLUDE`` keywords for the others.
+
+    Raises:
+        ValueError: *policy* is not one of the above.
+    """
+    if policy == "include":
+        return _by_include(keywords, filename, read_from, includes or [])
+    if policy == "type":
+        target = _family_file
+    elif policy == "part":
+        target = None
+    elif callable(policy):
+        target = lambda keyword, stem, ext: policy(keyword)
+    else:
+        raise ValueError(f"Unknown shard policy: {policy!r}")
+
+    stem, ext = _split_name(os.path.basename(filename))
+    directory = os.path.dirname(filename)
+    master: List[LSDynaKeyword] = []
+    files: Dict[str, List[LSDynaKeyword]] = {}
+    for keyword in keywords:
+        if target is None:
+            placed = [(name and f"{stem}_part{name}{ext}", kw) for name, kw in _by_part(keyword)]
+        else:
+            placed = [(target(keyword, stem, ext), keyword)]
+        for name, kw in placed:
+            if not name:
+                master.append(kw)
+                continue
+            path = os.path.join(directory, name)
+            if path not in files:
+                files[path] = []
+                master.append(_include(name))
+            files[path].append(kw)
+    return [(filename, _bracketed(master))] + list(files.items())
+
+
+def _split_name(name: str) -> Tuple[str, str]:
+    """*name* as ``(stem, extension)``; a compressed file's extension is
+    both suffixes, ``.k.gz``."""
+    stem, ext = os.path.splitext(name)
+    if compression_of(name, sniff=False) is not None:
+        stem, inner = os.path.splitext(stem)
+        ext = inner + ext
+    return stem, ext
+
+
+def _include(name: str) -> LSDynaKeyword:
+    """An ``*INCLUDE`` of the file *name*."""
+    return Unknown.skipped("*INCLUDE", ["*INCLUDE", name.replace(os.sep, '/')])
+
+
+def _family(keyword: LSDynaKeyword) -> str:
+    """The first word of *keyword*'s keyword, in lower case: ``"mat"`` for ``*MAT_ELASTIC``."""
+    words = keyword.full_keyword.lstrip('*').split('_')[0].split()
+    return words[0].lower() if words else ''
+
+
+def _family_file(keyword: LSDynaKeyword, stem: str, ext: str) -> Optional[str]:
+    """The file of *keyword* for ``"type"``: by the first word of its keyword."""
+    family = _family(keyword)
+    if family in _MASTER_FAMILIES or not family.isalnum():
+        return None
+    return f"{stem}_{family}{ext}"
+
+
+def _bracketed(master: List[LSDynaKeyword]) -> List[LSDynaKeyword]:
+    """*master* with its first ``*KEYWORD`` at the start, its last ``*END`` at
+    the end, and no other ``*KEYWORD`` or ``*END``."""
+    heads = [kw for kw in master if _family(kw) == 'keyword']
+    ends = [kw for kw in master if _family(kw) == 'end']
+    body = [kw for kw in master if _family(kw) not in ('keyword', 'end')]
+    return heads[:1] + body + ends[-1:]
+
+
+def _part_ids(card: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+    """The part ID of every row of *card*, as text, or None without a PID column."""
+    pids = card.get('PID') if isinstance(card, dict) else None
+    if not isinstance(pids, np.ndarray):
+        return None
+    return np.array([str(pid).strip() for pid in pids.tolist()], dtype=str)
+
+
+def _by_part(keyword: LSDynaKeyword) -> List[Tuple[Optional[str], LSDynaKeyword]]:
+    """
+    ``(part ID, keyword)`` for ``"part"``: the keyword itself when all its
+    rows are of one part, or one keyword per part cut from it.  The part ID
+    is None for a keyword without a ``PID`` column.
+
+    A card with a ``PID`` column is cut by its own column.  A card without
+    one is cut like the first card that has one when it has as many rows,
+    as the cards of an element are; otherwise every part gets all of it.
+    """
+    cards = keyword.cards
+    columns = {name: _part_ids(card) for name, card in cards.items()}
+    primary = next((ids for ids in columns.values() if ids is not None and len(ids)), None)
+    if primary is None:
+        return [(None, keyword)]
+    parts = list(dict.fromkeys(pid for ids in columns.values() if ids is not None
+                               for pid in ids[np.sort(np.unique(ids, return_index=True)[1])]))
+    if len(parts) == 1:
+        return [(parts[0], keyword)]
+    split = []
+    for pid in parts:
+        part_cards = {}
+        for name, card in cards.items():
+            ids = columns[name]
+            if ids is None and isinstance(card, dict) and card and all(
+                    isinstance(v, np.ndarray) and len(v) == len(primary) for v in card.values()):
+                ids = primary
+            if ids is None:
+                part_cards[name] = card
+                continue
+            rows = ids == pid
+            part_cards[name] = {field: values[rows] for field, values in card.items()}
+        part = copy.copy(keyword)
+        part.cards = part_cards
+        split.append((pid, part))
+    return split
+
+
+def _by_include(keywords: List[LSDynaKeyword], filename: str, read_from: Optional[str],
+                includes: List[Tuple[int, int, str, str]]
+                ) -> List[Tuple[str, List[LSDynaKeyword]]]:
+    """
+    The files for ``"include"``: each keyword back in the file it was read
+    from, and an ``*INCLUDE`` where each include file was included.
+
+    The deck is walked in order with the chain of files open at each point,
+    opening and closing include files at the spans of *includes*.  A file
+    included again gets its ``*INCLUDE`` but is written once, from where it
+    was first included.
+    """
+    master_key = os.path.abspath(read_from or filename)
+    base = os.path.dirname(master_key)
+    directory = os.path.dirname(os.path.abspath(filename))
+
+    def new_path(key: str) -> str:
+        if key == master_key:
+            return filename
+        return os.path.normpath(os.path.join(directory, os.path.relpath(key, base)))
+
+    files: Dict[str, List[LSDynaKeyword]] = {master_key: []}
+    # (file, end of its span, whether it was written before)
+    stack: List[Tuple[str, int, bool]] = [(master_key, len(keywords), False)]
+    p = 0
+    for ordinal in range(len(keywords) + 1):
+        while p < len(includes) and includes[p][0] < ordinal:
+            p += 1
+        while True:
+            if p < len(includes) and includes[p][0] == ordinal and includes[p][2] == stack[-1][0]:
+                _, end, parent, child = includes[p]
+                p += 1
+                repeated = stack[-1][2]
+                if not repeated:
+                    files[parent].append(_include(os.path.relpath(
+                        new_path(child), os.path.dirname(os.path.abspath(new_path(parent))))))
+                stack.append((child, end, repeated or child in files))
+                files.setdefault(child, [])
+            elif len(stack) > 1 and stack[-1][1] <= ordinal:
+                stack.pop()
+            else:
+                break
+        if ordinal < len(keywords) and not stack[-1][2]:
+            files[stack[-1][0]].append(keywords[ordinal])
+    return [(new_path(key), kws) for key, kws in files.items()]
@@ -0,0 +1,174 @@
+"""Where a reader's deck comes from.
+
+``DynaKeywordReader`` reads a deck from a file name, from bytes in memory
+(``bytes``, ``bytearray`` or ``memoryview``), or from a file object opened in
+binary or text mode -- a socket's ``makefile``, a pipe, an object-store blob::
+
+    DynaKeywordReader(blob_bytes)
+    DynaKeywordReader(sock.makefile('rb'))
+    DynaKeywordReader(io.StringIO(text))
+
+``deck_source`` wraps any of these in a ``DeckSource``, which the reader asks
+for a binary stream of the whole deck, from its start, each time it reads it.
+The deck is still split into blocks from large buffers and never held whole:
+memory is read through a ``memoryview`` without being copied, and a text
+stream is encoded to UTF-8 a buffer at a time.
+
+A file object is read from where it stands when the reader is made, and is
+not closed by the reader.  One that cannot seek -- a pipe or a socket -- can
+only be read once; a reader keeps what it read from it (see ``rereadable``).
+"""
+
+import io
+import os
+from typing import BinaryIO, Optional, Union
+
+from dynakw.core.compression import open_deck
+
+DeckInput = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+class DeckSource:
+    """A deck on disk: the base the other sources follow."""
+
+    rereadable = True
+    """Whether the deck can be read more than once, and a single block of it
+    read on its own by ``read_at``."""
+
+    def __init__(self, name: str, path: Optional[str] = None):
+        self.name = name
+        """The file name, or a name standing for the deck in logs and as
+        ``source_file``; relative include files are found from its directory."""
+        self.path = path
+        """The file name, when the deck is a file on disk; None otherwise."""
+
+    def open(self) -> BinaryIO:
+        """
+        A binary stream of the deck from its start, for the caller to close.
+
+        Raises:
+            OSError: The deck cannot be read (again).
+        """
+        return open_deck(self.path)
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        """The *length* bytes of the deck at byte *offset*."""
+        with open_deck(self.path, background=False) as f:
+            f.seek(offset)
+            return f.read(length)
+
+
+class MemorySource(DeckSource):
+    """A deck held in memory."""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview], name: str = "<bytes>"):
+        super().__init__(name)
+        self._view = memoryview(data).cast('B')
+
+    def open(self) -> BinaryIO:
+        return _MemoryReader(self._view)
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        return bytes(self._view[offset:offset + length])
+
+
+class StreamSource(DeckSource):
+    """A deck read from a file object, binary or text."""
+
+    def __init__(self, f, name: Optional[str] = None):
+        name = getattr(f, 'name', None) if name is None else name
+        super().__init__(name if isinstance(name, str) else "<stream>")
+        self._file = f
+        self._text = isinstance(f, io.TextIOBase) or 'b' not in getattr(f, 'mode', 'b')
+        self._start = None
+        try:
+            if f.seekable():
+                self._start = f.tell()
+        except (AttributeError, OSError, ValueError):
+            pass
+        # Only a binary stream can be read at a byte offset.
+        self.rereadable = self._start is not None and not self._text
+        self._read = False
+
+    def open(self) -> BinaryIO:
+        if self._start is not None:
+            self._file.seek(self._start)
+        elif self._read:
+            raise OSError(f"{self.name} cannot be read again")
+        self._read = True
+        return _TextReader(self._file) if self._text else _Unclosed(self._file)
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        if not self.rereadable:
+            raise OSError(f"{self.name} cannot be read at an offset")
+        self._file.seek(self._start + offset)
+        return self._file.read(length)
+
+
+def deck_source(deck: Union[DeckInput, DeckSource]) -> DeckSource:
+    """
+    The ``DeckSource`` for anything a reader accepts.
+
+    Raises:
+        TypeError: *deck* is none of the accepted kinds.
+    """
+    if isinstance(deck, DeckSource):
+        return deck
+    if isinstance(deck, (str, os.PathLike)):
+        path = os.fspath(deck)
+        return DeckSource(path, path)
+    if isinstance(deck, (bytes, bytearray, memoryview)):
+        return MemorySource(deck)
+    if hasattr(deck, 'read'):
+        return StreamSource(deck)
+    raise TypeError(f"Cannot read a keyword deck from {type(deck).__name__}")
+
+
+class _MemoryReader:
+    """``read`` over a memoryview, copying out only what is asked for."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else self._pos + size
+        data = bytes(self._view[self._pos:end])
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class _Unclosed:
+    """A binary file object that closing leaves open, for its owner to close."""
+
+    def __init__(self, f):
+        self._file = f
+        self.name = getattr(f, 'name', None)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class _TextReader(_Unclosed):
+    """A text file object read as UTF-8 bytes, a buffer at a time."""
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size).encode('utf-8')
@@ -0,0 +1,157 @@
+"""Parsed include files shared by the readers of one process.
+
+Batch jobs often read hundreds of master decks that all include the same mesh
+and material files.  A reader made with ``share_includes=True`` keeps the
+keywords it parses from include files here, and later readers in the same
+process use them instead of reading and parsing those files again; only their
+own master files are parsed::
+
+    for master in masters:
+        dkr = DynaKeywordReader(master, follow_include=True, share_includes=True)
+        ...
+
+An entry is keyed on the absolute path, size and modification time of the
+file, and on the reader settings that change what is parsed, so a file that
+has changed is read again.  The keywords kept here are never handed out:
+each reader gets ``shared_copy`` copies of them, which cost next to nothing
+until their cards are used and then become independent, so one reader's
+changes never show in another's.
+
+The cache holds at most ``set_limit`` bytes of include files, counted by file
+size, and drops the least recently used files first.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from dynakw.core.include_tree import TreeFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 2 << 30
+"""Bytes of include files kept by default."""
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Tuple, TreeFile]" = OrderedDict()
+_size = 0
+_limit = DEFAULT_LIMIT
+
+
+def set_limit(nbytes: int):
+    """Keep at most *nbytes* of include files, dropping the oldest now if need be."""
+    global _limit
+    with _lock:
+        _limit = nbytes
+        _evict()
+
+
+def clear():
+    """Forget every include file kept."""
+    global _size
+    with _lock:
+        _entries.clear()
+        _size = 0
+
+
+def cached_files() -> int:
+    """The number of include files kept."""
+    return len(_entries)
+
+
+def _key(path: str, stat: Tuple[int, int], options: Dict[str, Any]) -> Tuple:
+    return (os.path.abspath(path),) + tuple(stat) + tuple(sorted(options.items()))
+
+
+def lookup(path: str, options: Dict[str, Any]) -> Optional[TreeFile]:
+    """The kept ``TreeFile`` of *path*, with its keywords, if it has not changed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = _key(path, (st.st_size, st.st_mtime_ns), options)
+    with _lock:
+        tree_file = _entries.get(key)
+        if tree_file is not None:
+            _entries.move_to_end(key)
+    return tree_file
+
+
+def store(tree_file: TreeFile, keywords: Dict[int, Any], options: Dict[str, Any]):
+    """
+    Keeps the keywords parsed from *tree_file*.
+
+    The file is not kept if it changed after it was read, or if it is larger
+    than the limit on its own.
+    """
+    global _size
+    size = tree_file.stat[0]
+    try:
+        st = os.stat(tree_file.path)
+    except OSError:
+        return
+    if (st.st_size, st.st_mtime_ns) != tuple(tree_file.stat) or size > _limit:
+        return
+    entry = TreeFile(tree_file.path, tree_file.stat,
+                     [(None, line_offset, byte_offset)
+                      for _, line_offset, byte_offset in tree_file.blocks],
+                     tree_file.infos, dict(tree_file.includes), keywords)
+    key = _key(tree_file.path, tree_file.stat, options)
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _size -= old.stat[0]
+        _entries[key] = entry
+        _size += size
+        _evict()
+
+
+def _evict():
+    global _size
+    while _size > _limit and _entries:
+        _, tree_file = _entries.popitem(last=False)
+        _size -= tree_file.stat[0]
+        logger.debug(f"Dropped {tree_file.path} from the include cache")
+
+
+class Recorder:
+    """
+    Keeps the keywords of a tree's include files as a reader parses them.
+
+    Passed to ``IncludeTree.stitch`` as its *parsed* step: each keyword
+    parsed from an include file is kept, and the reader gets a shared copy
+    of it.  A file is stored once all its keywords have been seen.
+    """
+
+    def __init__(self, tree, options: Dict[str, Any]):
+        self._options = options
+        master = os.path.abspath(tree.path)
+        self._pending: Dict[int, Tuple[TreeFile, int, Dict[int, Any]]] = {}
+        for key, tree_file in tree.files.items():
+            if key == master or tree_file.keywords is not None:
+                continue
+            expected = len(tree_file.infos) - len(tree_file.includes)
+            if expected:
+                self._pending[id(tree_file)] = (tree_file, expected, {})
+            else:
+                store(tree_file, {}, options)
+
+    def __call__(self, tree_file: TreeFile, i: int, result):
+        pending = self._pending.get(id(tree_file))
+        if pending is None:
+            return result
+        keyword, place = result
+        _, expected, keywords = pending
+        keywords[i] = keyword
+        if len(keywords) == expected:
+            del self._pending[id(tree_file)]
+            store(tree_file, keywords, self._options)
+        return keyword.shared_copy(), place
+
+
+def known_keyword(tree_file: TreeFile, i: int):
+    """The reader's result for block *i* of a file whose keywords are kept."""
+    return (tree_file.keywords[i].shared_copy(),
+            (tree_file.infos[i].start_line, tree_file.path))
@@ -0,0 +1,395 @@
+"""A deck and the include files it pulls in.
+
+With ``follow_include`` the reader sees one deck made of the master file with
+each ``*INCLUDE`` block replaced by the blocks of the file it names.
+``load_tree`` works that deck out before anything is parsed: it scans every
+distinct file once, in a pool of threads so that files on a slow network
+mount are fetched side by side, and records the order their blocks come in::
+
+    tree = load_tree("master.k")
+    tree.include_files          # the include files read, once each
+    tree.includes               # where each of them is included
+    for data, (start_line, path, byte_offset) in tree.distinct_blocks():
+        ...
+
+A file included more than once, by the same parent or by several, is read once
+and its blocks appear at each place it is included.  ``distinct_blocks`` hands
+out each of its blocks once, and ``stitch`` puts whatever was made of them back
+at every place in deck order.
+
+The scan keeps where each block is, not its bytes.  ``distinct_blocks`` reads
+each file again as its blocks come up in deck order, in a memory map where it
+can, so that only the current block of each file being read is in memory
+however large the tree.  A master read from a stream that cannot be read
+twice is the exception: its blocks are kept from the scan.
+
+The file name of an ``*INCLUDE`` is on the line after the keyword, as LS-DYNA
+writes it, continued over further lines ending in `` +`` when it is long; a
+name on the keyword line itself (``*INCLUDE mesh.k``) is accepted too.  A
+relative name is taken relative to the directory of the file that includes
+it.  Other ``*INCLUDE_...`` keywords are not followed; they are blocks like any
+other.
+"""
+
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from dynakw.core.block_index import BlockInfo, block_info, map_split_blocks, split_blocks
+from dynakw.core.deck_source import DeckSource
+from dynakw.utils.block_text import decode_lines
+
+logger = logging.getLogger(__name__)
+
+IO_THREADS = 8
+"""Threads reading include files, unless the reader is told otherwise."""
+
+_QUOTED = re.compile(r'"([^"]+)"')
+
+
+def include_name(data: bytes) -> Optional[str]:
+    """
+    The file named by an ``*INCLUDE`` block, or None for any other block.
+
+    Args:
+        data: The bytes of the block, keyword line first.
+
+    Returns:
+        The file name as written, or ``""`` for an ``*INCLUDE`` that names
+        no file.
+    """
+    if not data[:8].upper().startswith(b'*INCLUDE'):
+        return None
+    lines = decode_lines(data)
+    first = lines[0].split(None, 1)
+    if first[0].upper() != '*INCLUDE':
+        return None
+    if len(first) > 1:
+        quoted = _QUOTED.match(first[1])
+        return quoted.group(1) if quoted else first[1].split()[0]
+
+    name = ""
+    for line in lines[1:]:
+        stripped = line.strip()
+        if not stripped or stripped.startswith('$'):
+            continue
+        if stripped.endswith(' +'):
+            name += stripped[:-2].rstrip()
+            continue
+        name += stripped
+        break
+    quoted = _QUOTED.match(name)
+    return quoted.group(1) if quoted else name
+
+
+@dataclass
+class TreeFile:
+    """One file of the tree: its blocks, and where its includes point."""
+
+    path: str
+    stat: Tuple[int, int] = (0, 0)
+    """Size and modification time (ns) of the file when it was read."""
+    blocks: List[Tuple[Optional[bytes], int, int]] = field(default_factory=list)
+    """``(block bytes, line offset, byte offset)`` of every block.  The bytes
+    are None for a file read again from *source*, once handed out, and for a
+    file whose keywords are known."""
+    infos: List[BlockInfo] = field(default_factory=list)
+    """The ``BlockInfo`` of every block, numbered within the file."""
+    includes: Dict[int, Optional[str]] = field(default_factory=dict)
+    """Path of the file included by the ``*INCLUDE`` block at each position;
+    None when it names no file or a missing one."""
+    keywords: Optional[Dict[int, Any]] = None
+    """The parsed keyword of every other block, when they are already known
+    (see ``dynakw.core.include_cache``); the blocks are then not read."""
+    source: Optional[DeckSource] = None
+    """Where the bytes of the blocks are read from again, or None when they
+    are kept in *blocks*."""
+
+
+@dataclass
+class IncludeTree:
+    """The blocks of a deck with its include files followed, in deck order."""
+
+    path: str
+    files: Dict[str, TreeFile]
+    """The files read, by absolute path."""
+    order: List[Tuple[str, int]]
+    """``(absolute path, block position)`` of every block of the deck, in order."""
+    include_files: List[str]
+    """The include files read, each once, in the order first included."""
+    includes: List[Tuple[int, int, str, str]] = field(default_factory=list)
+    """``(start, end, including file, included file)`` of every ``*INCLUDE``
+    followed, in deck order: the blocks of ``order`` from *start* up to
+    *end* come from the included file and the files it includes.  The files
+    are absolute paths."""
+    memory_map: bool = True
+    """Whether ``distinct_blocks`` reads files in a memory map where it can."""
+
+    def index(self) -> List[BlockInfo]:
+        """A ``BlockInfo`` for every block of the deck, in deck order."""
+        return [replace(self.files[key].infos[i], ordinal=ordinal, path=self.files[key].path)
+                for ordinal, (key, i) in enumerate(self.order)]
+
+    def distinct_blocks(self) -> Iterator[Tuple[bytes, Tuple[int, str, int]]]:
+        """
+        ``(block bytes, (start line, path, byte offset))`` for each block of the deck that
+        has to be parsed, in deck order, but only at the first place a block
+        appears.  Blocks of files whose keywords are known are left out.
+
+        Each file is read again as its blocks come up, a block at a time, and
+        closed after its last one; a block kept from the scan is let go once
+        handed out.  So only the current block of each file being read is
+        held, not the deck.
+        """
+        seen = set()
+        # The first place of a block comes in the walk of its file, so each
+        # file is read from start to end once.
+        readers: Dict[str, Iterator[Tuple[int, Tuple[bytes, int, int]]]] = {}
+        last = {key: max((i for i in range(len(tree_file.infos))
+                          if i not in tree_file.includes), default=-1)
+                for key, tree_file in self.files.items()}
+        try:
+            for key, i in self.order:
+                tree_file = self.files[key]
+                if (key, i) in seen or tree_file.keywords is not None:
+                    continue
+                seen.add((key, i))
+                data, line_offset, byte_offset = tree_file.blocks[i]
+                if data is None:
+                    if key not in readers:
+                        readers[key] = _numbered(_split(tree_file.source, self.memory_map))
+                    data = _read_block(tree_file, readers[key], i)
+                    if i == last[key]:
+                        readers.pop(key).close()
+                else:
+                    tree_file.blocks[i] = (None, line_offset, byte_offset)
+                yield data, (line_offset + 1, tree_file.path, byte_offset)
+        finally:
+            for reader in readers.values():
+                reader.close()
+
+    def stitch(self, results: Iterator[Any],
+               known: Optional[Callable[[TreeFile, int], Any]] = None,
+               parsed: Optional[Callable[[TreeFile, int, Any], Any]] = None
+               ) -> Iterator[Any]:
+        """
+        Puts *results*, one for each block of ``distinct_blocks`` in its
+        order, at every place in the deck their block appears.
+
+        Args:
+            results: What was made of the blocks of ``distinct_blocks``.
+            known: Gives the result for block ``i`` of a file whose keywords
+                are known; called once per distinct block.
+            parsed: Called with each result of *results*, and what it returns
+                is used in its place.
+
+        A result is kept only until the last place its block appears.
+        """
+        remaining: Dict[Tuple[str, int], int] = {}
+        for entry in self.order:
+            remaining[entry] = remaining.get(entry, 0) + 1
+        kept: Dict[Tuple[str, int], Any] = {}
+        for entry in self.order:
+            if entry in kept:
+                result = kept[entry]
+            else:
+                tree_file = self.files[entry[0]]
+                if tree_file.keywords is not None:
+                    result = known(tree_file, entry[1])
+                else:
+                    result = next(results)
+                    if parsed is not None:
+                        result = parsed(tree_file, entry[1], result)
+            remaining[entry] -= 1
+            if remaining[entry]:
+                kept[entry] = result
+            else:
+                kept.pop(entry, None)
+            yield result
+
+
+def load_tree(path: str, threads: int = IO_THREADS,
+              known: Optional[Callable[[str], Optional[TreeFile]]] = None,
+              master: Optional[DeckSource] = None, memory_map: bool = True) -> IncludeTree:
+    """
+    Scans the deck *path* and every file it includes.
+
+    Each distinct file is scanned once, by a pool of *threads* threads; a
+    file's includes are sent to the pool as soon as the file has been
+    scanned, so the whole tree is fetched at the rate the pool allows.  A
+    missing include is logged and left out, as is an include that would
+    include itself again.
+
+    A master file that cannot be read is logged and gives an empty tree.
+
+    Args:
+        path: The master file.
+        threads: Threads reading files.
+        known: Gives the ``TreeFile`` of an include file whose keywords are
+            already known, or None; such a file is not read.  The master file
+            is always read.
+        master: Where the master file is read from, when it is not the
+            file *path*; *path* is then its name, from whose directory
+            relative includes are found.
+        memory_map: Scan and read files in a memory map where they can be.
+    """
+    futures: Dict[str, Future] = {}
+    lock = threading.Lock()
+    master_key = os.path.abspath(path)
+
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        def submit(file_path: str):
+            key = os.path.abspath(file_path)
+            with lock:
+                if key not in futures:
+                    futures[key] = pool.submit(read_file, file_path)
+
+        def read_file(file_path: str) -> Optional[TreeFile]:
+            if known is not None and os.path.abspath(file_path) != master_key:
+                tree_file = known(file_path)
+                if tree_file is not None:
+                    for target in tree_file.includes.values():
+                        if target is not None:
+                            submit(target)
+                    return replace(tree_file, path=file_path)
+            if master is not None and os.path.abspath(file_path) == master_key:
+                source = master
+            else:
+                source = DeckSource(file_path, file_path)
+            tree_file = TreeFile(file_path, _file_stat(source.path),
+                                 source=source if source.rereadable else None)
+            try:
+                blocks = _split(source, memory_map)
+                for i, (data, line_offset, byte_offset) in enumerate(blocks):
+                    tree_file.blocks.append((None if source.rereadable else data,
+                                             line_offset, byte_offset))
+                    tree_file.infos.append(
+                        block_info(i, file_path, data, line_offset, byte_offset))
+                    follow(tree_file, i, data)
+            except FileNotFoundError:
+                logger.error(f"File not found: {file_path}")
+                return None
+            except OSError as e:
+                logger.error(f"Error reading file {file_path}: {e}")
+                return None
+            return tree_file
+
+        def follow(tree_file: TreeFile, i: int, data: bytes):
+            """Records the file included by block *i*, if any, and sends it to the pool."""
+            name = include_name(data)
+            if name is None:
+                return
+            if not name:
+                logger.warning(f"*INCLUDE without a file name in {tree_file.path}")
+                tree_file.includes[i] = None
+                return
+            full_path = os.path.normpath(os.path.join(os.path.dirname(tree_file.path), name))
+            if os.path.exists(full_path):
+                tree_file.includes[i] = full_path
+                submit(full_path)
+            else:
+                logger.warning(f"Include file not found: {full_path}")
+                tree_file.includes[i] = None
+
+        submit(path)
+        files: Dict[str, TreeFile] = {}
+        order: List[Tuple[str, int]] = []
+        include_files: List[str] = []
+        included = set()
+        includes: List[Tuple[int, int, str, str]] = []
+
+        def walk(file_path: str, stack: Tuple[str, ...]):
+            key = os.path.abspath(file_path)
+            with lock:
+                future = futures[key]
+            tree_file = future.result()
+            if tree_file is None:
+                return
+            files[key] = tree_file
+            for i in range(len(tree_file.infos)):
+                if i not in tree_file.includes:
+                    order.append((key, i))
+                    continue
+                target = tree_file.includes[i]
+                if target is None:
+                    continue
+                target_key = os.path.abspath(target)
+                if target_key in stack:
+                    logger.error(f"Include cycle: {target} includes itself")
+                    continue
+                if target_key not in included:
+                    included.add(target_key)
+                    include_files.append(target)
+                point = len(includes)
+                includes.append((len(order), len(order), key, target_key))
+                walk(target, stack + (target_key,))
+                includes[point] = (includes[point][0], len(order), key, target_key)
+
+        walk(path, (master_key,))
+
+    return IncludeTree(path, files, order, include_files, includes, memory_map)
+
+
+def _file_stat(path: Optional[str]) -> Tuple[int, int]:
+    """Size and modification time (ns) of the file *path*; zeros when it is no file."""
+    if path is None:
+        return (0, 0)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (0, 0)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def _split(source: DeckSource, memory_map: bool) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    ``(block bytes, line offset, byte offset)`` of every block of *source*,
+    found in a memory map if *memory_map* and the file can be mapped.
+
+    Raises:
+        OSError: The file cannot be opened; raised here, not while iterating.
+    """
+    if memory_map and source.path is not None:
+        try:
+            return map_split_blocks(source.path)
+        except FileNotFoundError:
+            raise
+        except (OSError, ValueError) as e:
+            logger.debug(f"Reading {source.path} without a memory map: {e}")
+    return _read_split(source.open())
+
+
+def _read_split(f) -> Iterator[Tuple[bytes, int, int]]:
+    with f:
+        yield from split_blocks(f)
+
+
+def _numbered(blocks: Iterator[Tuple[bytes, int, int]]
+              ) -> Iterator[Tuple[int, Tuple[bytes, int, int]]]:
+    """*blocks* with their positions, closing *blocks* when closed."""
+    try:
+        yield from enumerate(blocks)
+    finally:
+        close = getattr(blocks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _read_block(tree_file: TreeFile, reader: Iterator[Tuple[int, Tuple[bytes, int, int]]],
+                i: int) -> bytes:
+    """
+    The bytes of block *i* of *tree_file*, read on from *reader*, which is
+    before it.  A block that is not where the scan found it means the file
+    changed since; that is logged, and the block read is used.
+    """
+    for j, (data, line_offset, byte_offset) in reader:
+        if j == i:
+            if (byte_offset, len(data)) != (tree_file.infos[i].byte_offset,
+                                            tree_file.infos[i].byte_length):
+                logger.warning(f"{tree_file.path} changed while it was read")
+            return data
+    raise OSError(f"{tree_file.path} changed while it was read: block {i} is gone")
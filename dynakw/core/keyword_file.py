@@ -1,34 +1,134 @@
+import asyncio
+import io
 import os
-import re
-from typing import List, Iterator, Optional, Tuple, Dict, Any, Union
+import pickle
+import shutil
+import tempfile
+import zlib
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
 import logging
+import numpy as np
 from ..keywords.lsdyna_keyword import LSDynaKeyword
 from .enums import KeywordType
-from ..utils.format_parser import FormatParser
+from .block_copy import BlockCopier
+from .block_patch import FilePatch, PatchError
+from .mesh_tables import ELEMENT_TOPOLOGIES, ElementTable, NodeTable
+from .block_index import (BlockInfo, _classify, block_info, map_split_blocks,
+                          scan_blocks, scan_file, split_blocks)
+from .compression import open_for_writing
+from .deck_shards import ShardPolicy, plan_shards
+from .deck_source import DeckInput, DeckSource, deck_source
+from .include_tree import IO_THREADS, load_tree
+from . import deck_cache, include_cache
+from ..utils.format_parser import FormatParser, parallel_rows
 from ..keywords.UNKNOWN import Unknown
+from ..utils.block_text import block_lines, decode_lines, first_line
+
+
+_WORKER_BATCH_BYTES = 1 << 20
+"""Size of the batches of blocks sent to a worker process."""
+
+_ROW_SPLIT_BYTES = 8 << 20
+"""Blocks at least this large have their rows, not the block, spread over the workers."""
+
+_ROW_CHUNK_LINES = 50_000
+"""Lines per chunk when the rows of a block are spread over the workers."""
+
+ASYNC_BATCH = 64
+"""Keywords read at a time, in an executor thread, by ``aiter_keywords``."""
 
 
 class DynaKeywordReader:
     """Main class for reading and writing LS-DYNA keyword files"""
 
-    def __init__(self, filename: str, follow_include: bool = False, debug: bool = False):
+    def __init__(self, filename: DeckInput, follow_include: bool = False, debug: bool = False,
+                 lazy: bool = False, cache: bool = False, memory_map: bool = True,
+                 workers: int = 1, io_threads: int = IO_THREADS,
+                 share_includes: bool = False,
+                 only: Optional[Iterable[KeywordType]] = None):
         """
         Initializes the LSDynaKeyword object.
 
         Args:
-            filename (str): The path to the LS-DYNA file.
-            follow_include (bool): Read include files.
+            filename (str): The path to the LS-DYNA file.  A file compressed
+                with gzip, bzip2 or xz is inflated as it is read (see
+                ``dynakw.core.compression``), as are compressed include files.
+                The deck may also be given as ``bytes``, ``bytearray`` or
+                ``memoryview``, or as a file object opened in binary or text
+                mode (see ``dynakw.core.deck_source``); relative include files
+                are then found from the current directory, or from that of
+                the file object's ``name``.
+            follow_include (bool): Read include files, in place of their
+                ``*INCLUDE`` blocks (see ``dynakw.core.include_tree``).  Each
+                distinct file is read and parsed once, however often it is
+                included; a block of a file included twice gives the same
+                keyword object at both places.
             debug (bool): Whether to print debug statements.
+            lazy (bool): Keep each keyword block as text until its ``cards`` are
+                first accessed.  Keywords that are never touched cost only the
+                split into blocks, and ``write`` copies them out unchanged.
+            cache (bool): Load the keywords from the sidecar cache written
+                beside the file (see ``dynakw.core.deck_cache``) when it is up
+                to date, and write one after reading the file otherwise.
+            memory_map (bool): Split the file into keyword blocks in a memory
+                map of it, decoding each block only when it is parsed.  When
+                False, or when the file cannot be mapped, it is read in large
+                buffers that are split the same way, as files always are
+                when ``follow_include`` is set.
+            workers (int): Parse keyword blocks in this many processes.  The
+                file is still split in this process, and the keywords come back
+                in file order.  Not used with ``lazy``, which parses nothing
+                up front.  As for any process pool, a script using this must
+                guard its entry point with ``if __name__ == '__main__':`` on
+                platforms that spawn processes.
+            io_threads (int): Threads reading the files of the include tree
+                side by side, with ``follow_include``.
+            share_includes (bool): With ``follow_include``, take the keywords
+                of include files other readers in this process have already
+                parsed from ``dynakw.core.include_cache``, and put those this
+                reader parses there.  The master file is always parsed.
+            only (Iterable[KeywordType]): Parse only the keywords of these
+                types.  Every other block is kept as it was read, as an
+                ``Unknown`` that decodes nothing (see ``Unknown.skipped``), and
+                ``write`` writes it back byte for byte.  None, the default,
+                parses every keyword.
         """
-        self.filename = filename
+        self._source = deck_source(filename)
+        self.filename = self._source.name
+        self.lazy = lazy
+        if cache and self._source.path is None:
+            logging.getLogger(__name__).warning(
+                f"No cache for {self.filename}: it is not a file on disk")
+            cache = False
+        self.cache = cache
+        self.memory_map = memory_map
+        self.workers = workers
+        self.io_threads = io_threads
+        self.share_includes = share_includes
+        self.only: Optional[FrozenSet[KeywordType]] = None if only is None else frozenset(only)
+        # Each keyword pickled as it is parsed, by ordinal, before the caller
+        # can change it; None when no cache is to be written.
+        self._cache_records: Optional[Dict[int, bytes]] = {} if cache else None
+        self._cache_stat = None
         self._keywords: List[LSDynaKeyword] = []
         self.logger = logging.getLogger(__name__)
         self.format_parser = FormatParser()
         self._keyword_map = LSDynaKeyword.KEYWORD_MAP
         self._include_files: List[str] = []
+        # Where each include file is included, as ``IncludeTree.includes``.
+        self._includes: List[Tuple[int, int, str, str]] = []
         self.follow_include = follow_include
         self._keyword_generator: Optional[Iterator[LSDynaKeyword]] = None
         self._fully_parsed: bool = False
+        self._index: Optional[List[BlockInfo]] = None
+        # Keywords read on their own through the index, by ordinal, until the
+        # sequential reader reaches them and takes them over.
+        self._fetched: Dict[int, LSDynaKeyword] = {}
+        self._node_table: Optional[NodeTable] = None
+        self._element_tables: Dict[str, ElementTable] = {}
         self.debug = debug
         if self.debug:
             self.logger.setLevel(logging.DEBUG)
@@ -58,18 +158,45 @@ class DynaKeywordReader:
                 self.logger.warning(f"Unknown keyword: {line}")
             return None, line
 
-    def _parse_keyword_block(self, lines: List[str]) -> LSDynaKeyword:
-        """Parse a complete keyword block, ignoring comment lines."""
+    def _parse_keyword_block(self, lines: Union[List[str], bytes],
+                             only: Optional[FrozenSet[KeywordType]] = None) -> LSDynaKeyword:
+        """Parse a complete keyword block, ignoring comment lines.
+
+        The block is given as its lines, or as the bytes read from the file.
+        A block whose type is not in *only*, or in ``self.only`` when *only*
+        is None, is kept unparsed.
+        """
         if not lines:
-            return Unknown("", lines)
+            return Unknown("", [])
+
+        block = lines
+        first = first_line(block) if isinstance(block, bytes) else block[0]
+        only = self.only if only is None else only
 
         if self.debug:
-            self.logger.debug(f"Reading block start with: {lines[0]}")
+            self.logger.debug(f"Reading block start with: {first}")
 
         try:
-            # Filter out comment lines (starting with '$')
-            filtered_lines = [
-                line for line in lines if not line.strip().startswith("$")]
+            if only is not None and first.startswith('*'):
+                # Decided on the keyword line alone; the rest of a skipped
+                # block is never decoded.
+                keyword_line = first.strip().upper()
+                keyword_class, kw_type = _classify(keyword_line)
+                if keyword_class is None or kw_type not in only:
+                    return Unknown.skipped(keyword_line, block)
+
+            if self.lazy and first.startswith('*'):
+                # The keyword line is known without scanning the block, and
+                # decoding and comment filtering are left to the first access
+                # of cards.
+                keyword_line = first.upper()
+                keyword_class, _ = self._parse_keyword_name(keyword_line)
+                if keyword_class:
+                    return keyword_class.deferred(keyword_line, block)
+                return Unknown(keyword_line, self._block_lines(block)[1:])
+
+            # Decode and filter out comment lines (starting with '$')
+            lines, filtered_lines = block_lines(block)
 
             if not filtered_lines:
                 # The block may have only contained comments
@@ -84,77 +211,205 @@ class DynaKeywordReader:
                 #return Unknown(keyword_line, filtered_lines[1:])
                 return Unknown(keyword_line, lines[1:])
         except Exception as e:
-            self.logger.error(f"Error {e} reading: \"{lines[0]}\"")
+            self.logger.error(f"Error {e} reading: \"{first}\"")
             return Unknown("*UNKNOWN", [ 'Parsing failed' ])
 
+    @staticmethod
+    def _block_lines(block: Union[List[str], bytes]) -> List[str]:
+        """The lines of a block given as lines or as bytes."""
+        return decode_lines(block) if isinstance(block, bytes) else block
+
     def _create_keyword_generator(self):
         """Creates a generator that yields keywords from the file."""
-        def gen() -> Iterator[LSDynaKeyword]:
-            line_iterator = self._line_iterator(
-                self.filename, self.follow_include)
-            current_keyword_lines = []
-            for line in line_iterator:
-                if line.startswith('*') and not line.startswith('$'):
-                    if current_keyword_lines:
-                        yield self._parse_keyword_block(current_keyword_lines)
-                    current_keyword_lines = [line]
-                else:
-                    if current_keyword_lines:
-                        current_keyword_lines.append(line)
-            if current_keyword_lines:
-                yield self._parse_keyword_block(current_keyword_lines)
-            self._fully_parsed = True
+        if self.cache:
+            cached = deck_cache.load(self.filename, self._cache_options())
+            if cached is not None:
+                self._keyword_generator = self._cached_generator(cached)
+                return
+            try:
+                self._cache_stat = deck_cache.stat_key(self.filename)
+            except OSError:
+                self._cache_records = None
+        self._keyword_generator = self._block_generator(self._parse_keyword_block)
 
-        self._keyword_generator = gen()
+    def _cache_options(self) -> Dict[str, Any]:
+        """The reader settings a cache must have been written with."""
+        return {'follow_include': self.follow_include, 'lazy': self.lazy,
+                'only': self._only_key()}
 
-    def _create_keyword_generator_readlisted(self, keyword_type_list: List[KeywordType]):
-        """Creates a generator that yields keywords from the file, parsing only listed types."""
-        def gen() -> Iterator[LSDynaKeyword]:
-            line_iterator = self._line_iterator(
-                self.filename, self.follow_include)
-            current_keyword_lines = []
+    def _only_key(self) -> Optional[Tuple[str, ...]]:
+        """``only`` as it goes into cache keys."""
+        return None if self.only is None else tuple(sorted(t.name for t in self.only))
 
-            def _parse_block_if_listed(lines: List[str]) -> LSDynaKeyword:
-                if not lines:
-                    return Unknown("", lines)
+    def _cached_generator(self, cached: Dict[str, Any]) -> Iterator[LSDynaKeyword]:
+        """Yields the keywords of a loaded cache."""
+        self._index = cached['index']
+        self._include_files = list(cached['include_files'])
+        self._includes = list(cached.get('includes', []))
+        self._cache_records = None
+        for ordinal, record in enumerate(cached['keywords']):
+            keyword = self._fetched.pop(ordinal, None)
+            yield keyword if keyword is not None else pickle.loads(record)
+        self._fully_parsed = True
 
-                try:
-                    # Filter out comment lines (starting with '$')
-                    filtered_lines = [
-                        line for line in lines if not line.strip().startswith("$")]
+    def _record_for_cache(self, ordinal: int, keyword: LSDynaKeyword):
+        if self._cache_records is not None:
+            self._cache_records[ordinal] = pickle.dumps(
+                keyword, protocol=pickle.HIGHEST_PROTOCOL)
 
-                    if not filtered_lines:
-                        # The block may have only contained comments
-                        return Unknown("", lines)
+    def _block_generator(self, parse_block) -> Iterator[LSDynaKeyword]:
+        """Splits the file into keyword blocks and yields ``parse_block(block)`` for each."""
+        blocks, parse_block = self._deck_blocks(parse_block, self._include_files)
+        ordinal = 0
+        for block, place in blocks:
+            yield self._keyword_from_block(ordinal, block, place, parse_block)
+            ordinal += 1
+        self._fully_parsed = True
 
-                    keyword_line = filtered_lines[0].upper()
-                    keyword_class, _ = self._parse_keyword_name(keyword_line,warn=False)
-                    
-                    # Determine type from the keyword string
-                    kw_type, _ = LSDynaKeyword._parse_keyword_name(keyword_line)
-
-                    if keyword_class and kw_type in keyword_type_list:
-                        return keyword_class(keyword_line, filtered_lines)
-                    else:
-                        #return Unknown(keyword_line, filtered_lines[1:])
-                        return Unknown(keyword_line, lines[1:])
-                except Exception as e:
-                    self.logger.error(f"Error {e} reading: \"{lines[0]}\"")
-                    return Unknown("*UNKNOWN", [ 'Parsing failed' ])
-
-            for line in line_iterator:
-                if line.startswith('*') and not line.startswith('$'):
-                    if current_keyword_lines:
-                        yield _parse_block_if_listed(current_keyword_lines)
-                    current_keyword_lines = [line]
+        records = self._cache_records
+        if records is not None and len(records) == ordinal:
+            deck_cache.save(self.filename, self._cache_options(),
+                            [records[i] for i in range(ordinal)], self.index(),
+                            self._include_files, self._cache_stat, self._includes)
+            self._cache_records = None
+
+    def _parse_in_workers(self, blocks) -> Iterator[Tuple[LSDynaKeyword, Any]]:
+        """Parses *blocks* in a pool of ``workers`` processes.
+
+        Blocks are sent in batches of about ``_WORKER_BATCH_BYTES``, with a
+        few batches per worker in flight so that splitting, parsing and
+        collecting overlap.  Yields ``(keyword, place)`` in file order, for
+        the ``(block, place)`` pairs of *blocks*.
+
+        A block of ``_ROW_SPLIT_BYTES`` or more -- a whole mesh in one
+        ``*NODE`` or ``*ELEMENT_SHELL`` block -- would keep one worker busy
+        while the others idle.  It is parsed here instead, within
+        ``parallel_rows``, so that its repeating cards are parsed in chunks
+        of rows by the pool.
+        """
+        pending = deque()
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            for batch in _batches(blocks, _WORKER_BATCH_BYTES):
+                block = batch[0][0]
+                if len(batch) == 1 and _block_size(block) >= _ROW_SPLIT_BYTES:
+                    with parallel_rows(executor, _ROW_CHUNK_LINES):
+                        parsed = [self._parse_keyword_block(block)]
                 else:
-                    if current_keyword_lines:
-                        current_keyword_lines.append(line)
-            if current_keyword_lines:
-                yield _parse_block_if_listed(current_keyword_lines)
-            self._fully_parsed = True
+                    parsed = executor.submit(_parse_batch, [b for b, _ in batch], self.debug,
+                                             self.only)
+                pending.append((parsed, [(place, _span(b, place)) for b, place in batch]))
+                while pending and (len(pending) >= 2 * self.workers
+                                   or not isinstance(pending[0][0], Future)):
+                    yield from _placed(*pending.popleft())
+            while pending:
+                yield from _placed(*pending.popleft())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
-        self._keyword_generator = gen()
+    def _deck_blocks(self, parse_block, include_files: List[str]):
+        """
+        The blocks of the deck with where each is, and the parse step they
+        still need.
+
+        Returns ``(blocks, parse_block)``: *blocks* yields ``(block, (start
+        line, path, byte offset))`` in deck order.  Blocks sent to the worker
+        processes come back parsed, with ``_already_parsed`` as the step left.  With
+        ``follow_include`` each distinct block of the include tree is parsed
+        once, here or in the workers, and the keyword is handed out at every
+        place the block appears; the include files read are put in
+        *include_files*.
+        """
+        tree = None
+        share = self.share_includes and parse_block == self._parse_keyword_block
+        if self.follow_include:
+            options = {'lazy': self.lazy, 'only': self._only_key()}
+            tree = load_tree(self.filename, self.io_threads,
+                             (lambda path: include_cache.lookup(path, options)) if share else None,
+                             self._source, self.memory_map)
+            if self._index is None:
+                self._index = tree.index()
+            include_files[:] = tree.include_files
+            self._includes = tree.includes
+            blocks = tree.distinct_blocks()
+        else:
+            blocks = self._iter_blocks()
+        if self.workers > 1 and not self.lazy and parse_block == self._parse_keyword_block:
+            blocks = self._parse_in_workers(blocks)
+            parse_block = _already_parsed
+        if tree is not None:
+            if parse_block is not _already_parsed:
+                blocks = _parse_each(blocks, parse_block)
+                parse_block = _already_parsed
+            if share:
+                blocks = tree.stitch(blocks, include_cache.known_keyword,
+                                     include_cache.Recorder(tree, options))
+            else:
+                blocks = tree.stitch(blocks)
+        return blocks, parse_block
+
+    def _iter_blocks(self) -> Iterator[Tuple[bytes, Tuple[int, str, int]]]:
+        """The keyword blocks of the file, with the line number and byte offset
+        each starts at, and the file."""
+        try:
+            blocks = self._open_blocks()
+        except FileNotFoundError:
+            self.logger.error(f"File not found: {self.filename}")
+            return
+        except OSError as e:
+            self.logger.error(f"Error reading file {self.filename}: {e}")
+            return
+        for data, line_offset, byte_offset in blocks:
+            yield data, (line_offset + 1, self.filename, byte_offset)
+
+    def _open_blocks(self) -> Iterator[Tuple[bytes, int, int]]:
+        """Opens the file and splits it into blocks of bytes, in a memory map if possible."""
+        if self.memory_map and self._source.path is not None:
+            try:
+                return map_split_blocks(self.filename)
+            except FileNotFoundError:
+                raise
+            except (OSError, ValueError) as e:
+                self.logger.debug(f"Reading {self.filename} without a memory map: {e}")
+        return self._source_blocks(self._source.open())
+
+    def _source_blocks(self, f) -> Iterator[Tuple[bytes, int, int]]:
+        """
+        The blocks of the deck, read from *f*.
+
+        A deck that can only be read once has its index made on the way, as
+        it cannot be scanned for it later.
+        """
+        index = [] if not self._source.rereadable and self._index is None else None
+        with f:
+            for ordinal, (data, line_offset, byte_offset) in enumerate(split_blocks(f)):
+                if index is not None:
+                    index.append(block_info(ordinal, self.filename, data,
+                                            line_offset, byte_offset))
+                yield data, line_offset, byte_offset
+        if index is not None:
+            self._index = index
+
+    def _keyword_from_block(self, ordinal: int, lines: Union[List[str], bytes, LSDynaKeyword],
+                            place: Tuple[int, str, int], parse_block) -> LSDynaKeyword:
+        """The keyword for the block at *ordinal*, reusing one already read through the index."""
+        keyword = self._fetched.pop(ordinal, None)
+        if keyword is not None:
+            return keyword
+        keyword = parse_block(lines)
+        if parse_block is not _already_parsed:
+            _read_from(keyword, _span(lines, place))
+        keyword._start_line, keyword.source_file = place[:2]
+        self._record_for_cache(ordinal, keyword)
+        return keyword
+
+    def _create_keyword_generator_readlisted(self, keyword_type_list: List[KeywordType]):
+        """Creates a generator that yields keywords from the file, parsing only listed types."""
+        # Blocks of other types are not parsed, so this reading is not cached.
+        self._cache_records = None
+        only = frozenset(keyword_type_list)
+        self._keyword_generator = self._block_generator(
+            lambda block: self._parse_keyword_block(block, only))
 
     def _read_all(self, follow_include: any = None):
         """Read all keywords from the file"""
@@ -164,6 +419,10 @@ class DynaKeywordReader:
         if follow_include is not None and follow_include != self.follow_include:
             self._keywords.clear()
             self._include_files.clear()
+            self._includes = []
+            self._index = None
+            self._fetched.clear()
+            self._cache_records = {} if self.cache else None
             self.follow_include = follow_include
             self._keyword_generator = None
             self._fully_parsed = False
@@ -174,45 +433,6 @@ class DynaKeywordReader:
         for keyword in self._keyword_generator:
             self._keywords.append(keyword)
 
-    def _line_iterator(self, filepath: str, follow_include: bool) -> Iterator[str]:
-        """A generator that yields lines from a file, following *INCLUDE directives."""
-        try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    rstripped_line = line.rstrip()
-                    if follow_include and rstripped_line.strip().upper().startswith('*INCLUDE'):
-                        include_file = self._extract_include_filename(
-                            rstripped_line)
-                        if include_file:
-                            base_dir = os.path.dirname(filepath)
-                            full_path = os.path.join(base_dir, include_file)
-                            if os.path.exists(full_path):
-                                self._include_files.append(full_path)
-                                yield from self._line_iterator(full_path, follow_include)
-                            else:
-                                self.logger.warning(
-                                    f"Include file not found: {full_path}")
-                    else:
-                        yield rstripped_line
-        except FileNotFoundError:
-            self.logger.error(f"File not found: {filepath}")
-        except Exception as e:
-            self.logger.error(f"Error reading file {filepath}: {e}")
-
-    def _extract_include_filename(self, line: str) -> Optional[str]:
-        """Extract filename from *INCLUDE line"""
-        # Simple regex to extract filename
-        match = re.search(r'["\\](["\\][^"\\]+)["\\]', line)
-        if match:
-            return match.group(1)
-
-        # Try without quotes
-        parts = line.split()
-        if len(parts) > 1:
-            return parts[1]
-
-        return None
-
     def keywords(self) -> Iterator[LSDynaKeyword]:
         """Iterator over keywords, reading from the file as needed."""
         def iterator_gen():
@@ -233,24 +453,431 @@ class DynaKeywordReader:
                     break
         return iterator_gen()
 
-    def write(self, filename: str):
-        """Write all keywords to a file"""
+    def iter_keywords(self, retain: bool = True) -> Iterator[LSDynaKeyword]:
+        """Iterator over keywords, optionally without keeping them.
+
+        With ``retain=True`` this is ``keywords()``.  With ``retain=False``
+        the file is read again for this iteration and each keyword is only
+        referenced until the caller moves on, so memory use does not grow
+        with the size of the deck.  This suits scanners and converters that
+        look at every keyword once; the keywords are not available afterwards
+        to ``keywords()``, ``find_keywords`` or ``write``, and no cache is
+        written.  Keywords already read are yielded as they are.
+
+        With ``follow_include`` the include tree is scanned first and its
+        index kept, one ``BlockInfo`` per block; the files are then read a
+        block at a time as the keywords are yielded (see
+        ``dynakw.core.include_tree``).  A keyword of a file included more
+        than once is kept until its last place.  A master read from a stream
+        that cannot be read twice is the exception: its blocks are held from
+        the scan until they are parsed.
+        """
+        if retain:
+            return self.keywords()
+        if self._fully_parsed:
+            return iter(self._keywords)
+        return self._stream_keywords()
+
+    def _stream_keywords(self) -> Iterator[LSDynaKeyword]:
+        """Yields the keywords of the file without recording anything on the reader."""
+        if self.cache:
+            cached = deck_cache.load(self.filename, self._cache_options())
+            if cached is not None:
+                for ordinal, record in enumerate(cached['keywords']):
+                    keyword = self._fetched.get(ordinal)
+                    yield keyword if keyword is not None else pickle.loads(record)
+                return
+
+        blocks, parse_block = self._deck_blocks(self._parse_keyword_block, [])
+        for ordinal, (block, place) in enumerate(blocks):
+            keyword = self._fetched.get(ordinal)
+            if keyword is None:
+                keyword = parse_block(block)
+                keyword._start_line, keyword.source_file = place[:2]
+            yield keyword
+
+    def write(self, filename: str, reformat: bool = False, workers: int = 1,
+              shard: Optional[ShardPolicy] = None):
+        """Write all keywords to a file.
+
+        A keyword that was not changed since it was read (see
+        ``LSDynaKeyword.modified``) is copied byte for byte from the file it
+        was read from, without formatting its cards (see
+        ``dynakw.core.block_copy``); only changed keywords, and those made in
+        code, are written from their cards.  An unchanged deck is written
+        back exactly as it was read.  Writing over a file the deck was read
+        from is safe: the new file is written beside it and then takes its
+        place.  A file name ending in ``.gz``, ``.bz2``, ``.xz`` or
+        ``.lzma`` is written compressed.
+
+        Args:
+            filename (str): The file to write.
+            reformat (bool): Write every keyword from its cards, as if all
+                had been changed, to give the whole deck the library's layout.
+            workers (int): Format the keywords in this many processes (see
+                ``_write_in_workers``).  The file written is the same.  As
+                for reading with ``workers``, a script using this must guard
+                its entry point with ``if __name__ == '__main__':`` on
+                platforms that spawn processes.
+            shard: Write the deck as *filename* and include files it pulls
+                in with ``*INCLUDE``, split by ``"type"``, ``"part"``,
+                ``"include"`` -- the include files it was read from -- or a
+                callable giving each keyword's file (see
+                ``dynakw.core.deck_shards``).  The files are written side by
+                side, by up to ``io_threads`` threads.  None writes one file.
+
+        Raises:
+            ValueError: *shard* is not a known policy.
+        """
         if not self._fully_parsed:
             self._read_all()
-        with open(filename, 'w', encoding='utf-8') as f:
-            for keyword in self._keywords:
-                if self.debug:
-                    self.logger.debug(f"Writing block: {keyword.type}")
+        if shard is None:
+            files = [(filename, self._keywords)]
+        else:
+            files = plan_shards(self._keywords, shard, filename, self.filename,
+                                self._includes)
+        # Files the deck was read from are written beside themselves and
+        # replaced once every file is written, as their blocks are copied
+        # from them until then.
+        read_from = [self._source.path] + self._include_files
+        targets = {}
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            for path, _ in files:
+                if shard is not None:
+                    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                targets[path] = path
+                if _is_one_of(path, read_from):
+                    fd, targets[path] = tempfile.mkstemp(
+                        dir=os.path.dirname(os.path.abspath(path)),
+                        prefix='.', suffix='-' + os.path.basename(path))
+                    os.close(fd)
+            if len(files) == 1:
+                self._write_file(targets[filename], files[0][1], reformat, executor, workers)
+            else:
+                with ThreadPoolExecutor(max_workers=max(1, min(self.io_threads, len(files)))) as pool:
+                    for future in [pool.submit(self._write_file, targets[path], keywords,
+                                               reformat, executor, workers)
+                                   for path, keywords in files]:
+                        future.result()
+            for path, target in targets.items():
+                if target != path:
+                    shutil.copymode(path, target)
+                    os.replace(target, path)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            for path, target in targets.items():
+                if target != path and os.path.exists(target):
+                    os.remove(target)
+
+    def patch(self, pad: bool = True) -> int:
+        """Write the changes made to the keywords into the files they were read from.
+
+        Only the blocks of ``modified`` keywords are written (see
+        ``dynakw.core.block_patch``): in place when a block formats to its
+        old length, or shorter and *pad* is set, and otherwise by rewriting
+        its file from that block on.  Include files read with
+        ``follow_include`` are patched the same way.  Files are checked
+        before any is written; when one cannot be patched -- it is
+        compressed, or has changed since it was read -- the deck is written
+        whole with ``write`` instead, into the same files.
+
+        Args:
+            pad (bool): Pad a block that formats shorter than it was with
+                ``$`` comment lines, so that it is written in place.
+
+        Returns:
+            The number of blocks written; 0 when nothing had changed, or
+            when the deck was not read from a file.
+        """
+        if not self._fully_parsed:
+            self._read_all()
+        if self._source.path is None:
+            self.logger.error(f"Cannot patch {self.filename}: it was not read from a file")
+            return 0
+        by_file: Dict[str, Dict[int, LSDynaKeyword]] = {}
+        changed = False
+        for keyword in self._keywords:
+            if keyword._span is None:
+                if keyword.modified:
+                    return self._write_whole(f"a {keyword.type.name} keyword has no block to patch")
+                continue
+            blocks = by_file.setdefault(keyword._span[0], {})
+            blocks.setdefault(keyword._span[1], keyword)
+            changed = changed or keyword.modified
+        if not changed:
+            return 0
+        patches = []
+        try:
+            for path, blocks in by_file.items():
+                if any(kw.modified for kw in blocks.values()):
+                    patches.append(FilePatch(path, list(blocks.values()), pad))
+        except (PatchError, OSError) as e:
+            for file_patch in patches:
+                file_patch.close()
+            return self._write_whole(str(e))
+        for file_patch in patches:
+            file_patch.apply()
+        # Offsets and line numbers may have moved.
+        self._index = None
+        return sum(file_patch.changed for file_patch in patches)
+
+    def _write_whole(self, reason: str) -> int:
+        """``patch`` by writing the deck over the files it was read from."""
+        self.logger.info(f"Writing {self.filename} whole instead of patching it: {reason}")
+        self.write(self.filename, shard="include" if self._includes else None)
+        self._index = None
+        return sum(1 for kw in self._keywords if kw.modified)
+
+    def _write_file(self, filename: str, keywords: List[LSDynaKeyword], reformat: bool,
+                    executor: Optional[Executor], workers: int):
+        """Write *keywords* to the file *filename*, formatting them in
+        *executor*, a pool of *workers* processes, when there is one."""
+        with BlockCopier(self._source) as copier, open_for_writing(filename) as f:
+            # Blocks go to f.buffer, so text must not wait in f.
+            f.reconfigure(write_through=True)
+            if executor is not None:
+                self._write_in_workers(f, copier, keywords, reformat, executor, workers)
+            else:
+                for keyword in keywords:
+                    self._write_keyword(f, copier, keyword, reformat)
+
+    def _write_keyword(self, f, copier: BlockCopier, keyword: LSDynaKeyword, reformat: bool):
+        """Write one keyword to *f*: copied from its file if unchanged, else formatted."""
+        if self.debug:
+            self.logger.debug(f"Writing block: {keyword.type}")
+        try:
+            if reformat:
+                keyword.write(f)
+            elif not copier.copy(keyword, f.buffer):
+                keyword.write_source(f)
+        except Exception as e:
+            self.logger.error(f"Error {e} writing:\n{keyword.type}")
+
+    def _write_in_workers(self, f, copier: BlockCopier, keywords: List[LSDynaKeyword],
+                          reformat: bool, executor: Executor, workers: int):
+        """Formats *keywords* in *executor*, a pool of *workers* processes,
+        and writes them to *f*.
+
+        The keywords to format are sent in batches of about
+        ``_WORKER_BATCH_BYTES`` of text, with a few batches per worker in
+        flight, and each batch comes back as the text of its keywords.  The
+        text is written in deck order, between the blocks copied here, so the
+        file is the one the serial writer gives.
+
+        A keyword of ``_ROW_SPLIT_BYTES`` or more -- a whole mesh in one
+        ``*NODE`` or ``*ELEMENT_SHELL`` -- is formatted here instead, within
+        ``parallel_rows``, so that the pool writes its repeating cards in
+        chunks of rows.  A batch the pool cannot take, such as one holding a
+        keyword that does not pickle, is formatted here as well.
+        """
+        pending = deque()
+
+        def flush(item):
+            batch, texts = item
+            if isinstance(texts, Future):
                 try:
-                    keyword.write(f)
+                    texts = texts.result()
                 except Exception as e:
-                    self.logger.error(f"Error {e} writing:\n{keyword.type}")
+                    self.logger.debug(f"Formatting {len(batch)} keywords here: {e}")
+                    texts = _format_batch(batch, reformat)
+            elif texts is None:
+                # Blocks to copy, or failing that to write here.
+                for keyword in batch:
+                    self._write_keyword(f, copier, keyword, reformat)
+                return
+            for keyword, (text, error) in zip(batch, texts):
+                if self.debug:
+                    self.logger.debug(f"Writing block: {keyword.type}")
+                f.write(text)
+                if error is not None:
+                    self.logger.error(error)
+
+        for batch in _write_batches(keywords, reformat, _WORKER_BATCH_BYTES):
+            if batch[0] is None:
+                texts = None
+                batch = batch[1:]
+            elif len(batch) == 1 and _keyword_size(batch[0]) >= _ROW_SPLIT_BYTES:
+                with parallel_rows(executor, _ROW_CHUNK_LINES):
+                    texts = _format_batch(batch, reformat)
+            else:
+                texts = executor.submit(_format_batch, batch, reformat)
+            pending.append((batch, texts))
+            while pending and (len(pending) >= 2 * workers
+                               or not isinstance(pending[0][1], Future)):
+                flush(pending.popleft())
+        while pending:
+            flush(pending.popleft())
+
+    async def aiter_keywords(self, retain: bool = True,
+                             executor: Optional[Executor] = None) -> AsyncIterator[LSDynaKeyword]:
+        """Asynchronous ``iter_keywords``, for use in an event loop.
+
+        The file is read and its blocks parsed in *executor*, a thread pool
+        (the loop's default one when None), ``ASYNC_BATCH`` keywords at a
+        time, so the loop is never blocked on either.  One batch is read
+        ahead of the one being handed out and no more: a slow consumer holds
+        up the reading instead of letting keywords pile up.  With ``workers``
+        the parsing is further spread over processes, as for ``keywords()``.
+
+        Example::
+
+            async for kw in dkr.aiter_keywords(retain=False):
+                ...
+        """
+        loop = asyncio.get_running_loop()
+        keywords = self.iter_keywords(retain)
+        ahead = loop.run_in_executor(executor, _take, keywords, ASYNC_BATCH)
+        try:
+            while True:
+                batch = await ahead
+                if not batch:
+                    return
+                ahead = loop.run_in_executor(executor, _take, keywords, ASYNC_BATCH)
+                for keyword in batch:
+                    yield keyword
+        finally:
+            # The iterator must not be dropped while a thread is reading it.
+            await asyncio.wait([ahead])
+
+    async def awrite(self, filename: str, executor: Optional[Executor] = None,
+                     reformat: bool = False, workers: int = 1,
+                     shard: Optional[ShardPolicy] = None):
+        """Asynchronous ``write``: reads what is left of the file and writes
+        it in *executor*, a thread pool (the loop's default one when None)."""
+        await asyncio.get_running_loop().run_in_executor(executor, self.write, filename,
+                                                         reformat, workers, shard)
 
     def find_keywords(self, keyword_type: KeywordType) -> List[LSDynaKeyword]:
-        """Find all keywords of a specific type"""
-        if not self._fully_parsed:
+        """Find all keywords of a specific type.
+
+        Until the whole file has been read, only the blocks of that type are
+        read, located through ``index``.  A reader with ``cache`` set reads
+        everything instead, which is what it keeps in its cache.
+        """
+        if self._fully_parsed or self.cache or not self._source.rereadable:
+            # A cached reader has all keywords at hand, or soon will; a deck
+            # that can only be read once is read whole.
+            self._read_all()
+            candidates = self._keywords
+        else:
+            candidates = [self.keyword_at(block.ordinal)
+                          for block in self.index() if block.type == keyword_type]
+        return [kw for kw in candidates if kw.type == keyword_type]
+
+    def node_table(self) -> NodeTable:
+        """
+        All the nodes of the deck in one table: their IDs, their coordinates
+        as one ``(n, 3)`` array, and a lookup from node ID to row (see
+        ``dynakw.core.mesh_tables``).
+
+        The table is built on the first call and kept.  A later call builds
+        it again when a ``*NODE`` keyword was changed since, or the deck has
+        other ``*NODE`` keywords, and otherwise returns the same table.
+        """
+        keywords = self.find_keywords(KeywordType.NODE)
+        if self._node_table is None or not self._node_table.is_current(keywords):
+            self._node_table = NodeTable(keywords)
+        return self._node_table
+
+    def element_table(self, topology: str) -> ElementTable:
+        """
+        All the elements of one topology in the deck in one table: their
+        element and part IDs, their nodes as one ``(n, k)`` int32 array, and
+        the keyword and row each came from (see ``dynakw.core.mesh_tables``).
+
+        Args:
+            topology (str): ``"shell"`` for the ``*ELEMENT_SHELL`` keywords,
+                ``"solid"`` for the ``*ELEMENT_SOLID`` keywords.
+
+        The table is kept, and built again like ``node_table``'s.
+
+        Raises:
+            ValueError: *topology* is not one of these.
+        """
+        if topology not in ELEMENT_TOPOLOGIES:
+            raise ValueError(f"Unknown element topology: {topology!r}")
+        keywords = self.find_keywords(ELEMENT_TOPOLOGIES[topology][0])
+        table = self._element_tables.get(topology)
+        if table is None or not table.is_current(keywords):
+            table = self._element_tables[topology] = ElementTable(topology, keywords)
+        return table
+
+    def index(self) -> List[BlockInfo]:
+        """
+        The table of contents of the file: one ``BlockInfo`` per keyword block.
+
+        It is built by a single scan of the file that parses no cards, and
+        kept.  With ``follow_include`` the blocks of included files are listed
+        in reading order.  A deck that can only be read once is read whole, and
+        its index made on the way.
+        """
+        if self._index is None and not self._source.rereadable:
+            self._read_all()
+            return self._index if self._index is not None else []
+        if self._index is None:
+            if self.follow_include:
+                self._index = load_tree(self.filename, self.io_threads,
+                                        master=self._source,
+                                        memory_map=self.memory_map).index()
+            elif self._source.path is None:
+                with self._source.open() as f:
+                    self._index = scan_file(f, self.filename)
+            else:
+                self._index = scan_blocks(self.filename)
+        return self._index
+
+    def keyword_at(self, ordinal: int) -> LSDynaKeyword:
+        """
+        The keyword at position *ordinal* in reading order.
+
+        A keyword not read yet is read on its own, from its place in the file.
+        Asking again, or iterating over ``keywords()`` later, gives the same
+        object, so changes made to it are written.
+
+        Raises:
+            IndexError: There is no block at *ordinal*.
+        """
+        if ordinal < len(self._keywords):
+            return self._keywords[ordinal]
+        if not self._source.rereadable:
             self._read_all()
-        return [kw for kw in self._keywords if kw.type == keyword_type]
+            return self._keywords[ordinal]
+        keyword = self._fetched.get(ordinal)
+        if keyword is None:
+            keyword = self._read_block(self.index()[ordinal])
+            self._record_for_cache(ordinal, keyword)
+            self._fetched[ordinal] = keyword
+        return keyword
+
+    def keyword_at_line(self, line: int, path: Optional[str] = None) -> Optional[LSDynaKeyword]:
+        """
+        The keyword whose block contains line number *line* (counting from 1).
+
+        Args:
+            line (int): The line number, as shown by an editor.
+            path (str, optional): The file the line is in, for an include file.
+                Defaults to the file being read.
+
+        Returns:
+            The keyword, or None when the line is before the first keyword.
+        """
+        path = os.path.abspath(path or self.filename)
+        for block in self.index():
+            if block.contains_line(line) and os.path.abspath(block.path) == path:
+                return self.keyword_at(block.ordinal)
+        return None
+
+    def _read_block(self, block: BlockInfo) -> LSDynaKeyword:
+        """Read and parse one block, at the place the index gives for it."""
+        source = self._source if block.path == self.filename else DeckSource(block.path, block.path)
+        data = source.read_at(block.byte_offset, block.byte_length)
+        keyword = self._parse_keyword_block(data)
+        _read_from(keyword, (block.path, block.byte_offset, len(data), zlib.crc32(data)))
+        keyword._start_line = block.start_line
+        keyword.source_file = block.path
+        return keyword
         
     def _substitute_parameters_in_card(self, card: Dict[str, Any], updates_normalized: Dict[str, Any], key_pairs: List[Tuple[str, str]], context_name: str = "PARAMETER"):
         """
@@ -390,3 +1017,149 @@ class DynaKeywordReader:
                 # *PARAMETER_EXPRESSION has PRMR1 and EXPRESSION1
                 key_pairs = [("PRMR1", "EXPRESSION1")]
                 self._substitute_parameters_in_card(card1, updates_normalized, key_pairs, "PARAMETER_EXPRESSION")
+
+
+def _is_one_of(path: str, paths: List[Optional[str]]) -> bool:
+    """Whether *path* names an existing file that is one of *paths*."""
+    if not os.path.exists(path):
+        return False
+    for other in paths:
+        try:
+            if other is not None and os.path.samefile(path, other):
+                return True
+        except OSError:
+            pass
+    return False
+
+
+def _already_parsed(keyword: LSDynaKeyword) -> LSDynaKeyword:
+    """The parse step for blocks a worker process has already parsed."""
+    return keyword
+
+
+def _take(iterator: Iterator[Any], n: int) -> List[Any]:
+    """The next *n* items of *iterator*, fewer at its end."""
+    return list(islice(iterator, n))
+
+
+def _parse_each(blocks, parse_block):
+    """``(parse_block(block), place)`` for each ``(block, place)`` of *blocks*."""
+    for block, place in blocks:
+        keyword = parse_block(block)
+        _read_from(keyword, _span(block, place))
+        yield keyword, place
+
+
+def _span(block: Union[List[str], bytes],
+          place: Tuple[int, str, Optional[int]]) -> Optional[Tuple[str, int, int, int]]:
+    """``(path, byte offset, length, CRC-32)`` of *block*, found at *place*;
+    None when it is not known where in its file the block is."""
+    if not isinstance(block, bytes) or place[2] is None:
+        return None
+    return place[1], place[2], len(block), zlib.crc32(block)
+
+
+def _read_from(keyword: LSDynaKeyword, span: Optional[Tuple[str, int, int, int]]):
+    """Record the block *keyword* was read from, for ``write`` to copy while it is unchanged."""
+    if span is not None:
+        keyword._read_from(span)
+
+
+def _placed(parsed, places) -> Iterator[Tuple[LSDynaKeyword, Any]]:
+    """``(keyword, place)`` for a batch parsed by ``_parse_in_workers``,
+    given with the ``(place, span)`` of each of its blocks."""
+    for keyword, (place, span) in zip(_result(parsed), places):
+        _read_from(keyword, span)
+        yield keyword, place
+
+
+def _block_size(block: Union[List[str], bytes]) -> int:
+    """The size of a block in characters, near enough its size in bytes."""
+    return len(block) if isinstance(block, bytes) else sum(map(len, block))
+
+
+def _batches(blocks, limit: int):
+    """Groups ``(block, place)`` pairs into lists of about *limit* bytes.
+
+    A block of *limit* bytes or more is always a batch of its own.
+    """
+    batch, size = [], 0
+    for block, place in blocks:
+        block_size = _block_size(block)
+        if block_size >= limit and batch:
+            yield batch
+            batch, size = [], 0
+        batch.append((block, place))
+        size += block_size
+        if size >= limit:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def _keyword_size(keyword: LSDynaKeyword) -> int:
+    """About the size of *keyword* written, in bytes: its block while it is
+    unparsed, else 80 bytes for each row of its cards."""
+    if keyword._pending:
+        return _block_size(keyword._source)
+    rows = 1
+    for card in (keyword.__dict__.get('_cards') or {}).values():
+        if isinstance(card, dict):
+            rows += max((len(v) for v in card.values() if isinstance(v, np.ndarray)), default=1)
+    return 80 * rows
+
+
+def _write_batches(keywords: List[LSDynaKeyword], reformat: bool, limit: int):
+    """Groups *keywords* for ``_write_in_workers``, in order.
+
+    Keywords to format are grouped into lists of about *limit* bytes, as
+    ``_batches`` groups blocks.  Runs of keywords whose blocks can be copied
+    are lists of their own, led by None; they are not worth sending to a
+    worker.
+    """
+    batch, size = [], 0
+    for keyword in keywords:
+        copied = not reformat and keyword._span is not None and not keyword.modified
+        if batch and (copied != (batch[0] is None)
+                      or not copied and (size >= limit or _keyword_size(keyword) >= limit)):
+            yield batch
+            batch, size = [], 0
+        if not batch and copied:
+            batch.append(None)
+        batch.append(keyword)
+        if not copied:
+            size += _keyword_size(keyword)
+    if batch:
+        yield batch
+
+
+def _format_batch(keywords: List[LSDynaKeyword], reformat: bool) -> List[Tuple[str, Optional[str]]]:
+    """``(text, error)`` for each of *keywords*, written as ``write`` writes
+    those it does not copy; run in a worker process, or here.  The text is
+    what was written up to an error, as the serial writer leaves it."""
+    texts = []
+    for keyword in keywords:
+        out = io.StringIO()
+        error = None
+        try:
+            if reformat:
+                keyword.write(out)
+            else:
+                keyword.write_source(out)
+        except Exception as e:
+            error = f"Error {e} writing:\n{keyword.type}"
+        texts.append((out.getvalue(), error))
+    return texts
+
+
+def _result(parsed) -> List[LSDynaKeyword]:
+    """The keywords of a batch, parsed by a worker or here."""
+    return parsed.result() if isinstance(parsed, Future) else parsed
+
+
+def _parse_batch(blocks: List[Union[List[str], bytes]], debug: bool,
+                 only: Optional[FrozenSet[KeywordType]] = None) -> List[LSDynaKeyword]:
+    """Parses blocks in a worker process."""
+    reader = DynaKeywordReader("", debug=debug, only=only)
+    return [reader._parse_keyword_block(block) for block in blocks]
@@ -0,0 +1,446 @@
+"""Deck-wide tables of the mesh.
+
+A deck spreads its mesh over any number of keywords, each with columns of its
+own.  The tables here put them together once, in deck order, each with an
+index from ID to row that looks up whole arrays of IDs at a time:
+
+``NodeTable``
+    The nodes of every ``*NODE`` keyword: the node IDs in one array and the
+    coordinates in one contiguous ``(n, 3)`` array.
+``ElementTable``
+    The elements of one topology, ``"shell"`` (``*ELEMENT_SHELL``) or
+    ``"solid"`` (``*ELEMENT_SOLID``): element and part IDs, and the node IDs
+    of each element as one contiguous ``(n, k)`` int32 array, with the
+    keyword and row each element came from.
+
+::
+
+    nodes = dkr.node_table()
+    shells = dkr.element_table("shell")
+    corners = nodes.coords[shells.node_rows(nodes)[:, :4]]    # (n, 4, 3)
+
+An index is a dense array over the range of the IDs when they are compact,
+as they mostly are, and a sorted copy of the IDs searched with
+``numpy.searchsorted`` otherwise.  An ID defined more than once maps to the
+row of its first definition.
+
+Tables are read-only.  The mesh is changed in its keywords, and
+``is_current`` tells whether a table still shows them.  The element keywords
+keep their node columns as the columns of one 2-D block (``pack_columns``),
+so an element table of a single keyword uses that block and the keyword's
+ID columns as they are, without copying them.
+"""
+
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dynakw.core.enums import KeywordType
+from dynakw.keywords.lsdyna_keyword import LSDynaKeyword
+
+logger = logging.getLogger(__name__)
+
+_NODE_COLUMNS = ('NID', 'X', 'Y', 'Z')
+
+ELEMENT_TOPOLOGIES: Dict[str, Tuple[KeywordType, str]] = {
+    "shell": (KeywordType.ELEMENT_SHELL, "Card 1"),
+    "solid": (KeywordType.ELEMENT_SOLID, "nodes"),
+}
+"""The keyword type of each element topology, and the card of its node columns."""
+
+_DENSE_SPREAD = 4
+"""Largest ratio of the range of the IDs to their number for a dense index."""
+
+
+class _IdIndex:
+    """Rows of IDs, for a table whose IDs are *ids*; *what* names them in messages."""
+
+    def __init__(self, ids: np.ndarray, what: str):
+        self.what = what
+        self.n = n = len(ids)
+        self.low = int(ids.min()) if n else 0
+        spread = int(ids.max()) - self.low + 1 if n else 0
+        self.dense: Optional[np.ndarray] = None
+        self.sorted: Optional[np.ndarray] = None
+        self.order: Optional[np.ndarray] = None
+        if spread <= _DENSE_SPREAD * n:
+            self.dense = np.full(spread, -1, dtype=np.intp)
+            # Written last to first, so that the first row of an ID is kept.
+            self.dense[ids[::-1].astype(np.int64) - self.low] = np.arange(n - 1, -1, -1)
+            distinct = int(np.count_nonzero(self.dense >= 0))
+        else:
+            self.order = np.argsort(ids, kind='stable')
+            self.sorted = ids[self.order]
+            distinct = n - int(np.count_nonzero(self.sorted[1:] == self.sorted[:-1]))
+        if distinct < n:
+            logger.warning(f"{n - distinct} {what} IDs are defined more than once; "
+                           f"lookups give their first definition")
+
+    def rows(self, ids, default: Optional[int]) -> np.ndarray:
+        ids = np.asarray(ids)
+        rows = np.full(ids.shape, -1, dtype=np.intp)
+        if self.n:
+            if self.dense is not None:
+                at = ids.astype(np.int64) - self.low
+                inside = (at >= 0) & (at < len(self.dense))
+                rows[inside] = self.dense[at[inside]]
+            else:
+                at = np.searchsorted(self.sorted, ids).clip(max=self.n - 1)
+                found = self.sorted[at] == ids
+                rows[found] = self.order[at[found]]
+        missing = rows < 0
+        if missing.any():
+            if default is None:
+                unknown = np.unique(ids[missing])
+                raise KeyError(f"{self.what.capitalize()} IDs not in the deck: "
+                               f"{unknown[:10].tolist()}"
+                               + (f" and {len(unknown) - 10} more" if len(unknown) > 10 else ""))
+            rows[missing] = default
+        return rows
+
+
+class NodeTable:
+    """
+    The nodes of a deck, in deck order, one row per node.
+
+    Args:
+        keywords: The ``*NODE`` keywords of the deck, in deck order.  A
+            keyword without the node columns, one that failed to parse for
+            instance, is left out with a warning.
+
+    Attributes:
+        ids: The node IDs, ``(n,)``.
+        coords: The coordinates, ``(n, 3)`` float64, C-contiguous.
+        keywords: The keywords the table was built from.
+        offsets: The row of the first node of each keyword, and the number
+            of nodes last: the nodes of ``keywords[i]`` are rows
+            ``offsets[i]`` to ``offsets[i + 1]``.
+    """
+
+    def __init__(self, keywords: List[LSDynaKeyword]):
+        self.keywords = list(keywords)
+        columns = [_node_columns(kw) for kw in self.keywords]
+        self._stamps = [_stamp(c) for c in columns]
+        columns = [_numeric(c, kw) for c, kw in zip(columns, self.keywords)]
+        self.offsets = _offsets(columns)
+        n = int(self.offsets[-1])
+        id_dtype = np.result_type(*[c[0] for c in columns if c is not None]) if n else np.int32
+        self.ids = np.empty(n, dtype=id_dtype)
+        self.coords = np.empty((n, 3), dtype=np.float64)
+        for c, start, stop in zip(columns, self.offsets[:-1], self.offsets[1:]):
+            if c is None:
+                continue
+            self.ids[start:stop] = c[0]
+            for axis in range(3):
+                self.coords[start:stop, axis] = c[axis + 1]
+        self.ids.flags.writeable = False
+        self.coords.flags.writeable = False
+        self._index: Optional[_IdIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self):
+        return f"NodeTable({len(self)} nodes from {len(self.keywords)} keywords)"
+
+    def is_current(self, keywords: Optional[List[LSDynaKeyword]] = None) -> bool:
+        """
+        Whether the table still shows its keywords' nodes: none of their
+        ``NID``, ``X``, ``Y`` or ``Z`` columns was changed or replaced since.
+
+        Args:
+            keywords: The ``*NODE`` keywords of the deck now; the table is
+                not current either if they are not the ones it was built from.
+        """
+        return _is_current(self.keywords, self._stamps, keywords,
+                           lambda kw: _node_columns(kw, warn=False))
+
+    def rows(self, ids, default: Optional[int] = None) -> np.ndarray:
+        """
+        The rows of the nodes *ids*, an array of the same shape.
+
+        Args:
+            ids: Node IDs, an array of any shape or a single ID.
+            default: The row given for an ID that is not in the table.
+
+        Raises:
+            KeyError: An ID is not in the table and *default* is None.
+        """
+        if self._index is None:
+            self._index = _IdIndex(self.ids, "node")
+        return self._index.rows(ids, default)
+
+    def coordinates(self, ids) -> np.ndarray:
+        """
+        The coordinates of the nodes *ids*, shaped ``ids.shape + (3,)``.
+
+        Raises:
+            KeyError: An ID is not in the table.
+        """
+        return self.coords[self.rows(ids)]
+
+
+class ElementTable:
+    """
+    The elements of one topology in a deck, in deck order, one row per element.
+
+    Args:
+        topology: ``"shell"`` or ``"solid"``, see ``ELEMENT_TOPOLOGIES``.
+        keywords: The keywords of that topology in the deck, in deck order.
+            A keyword without the element and node columns, or with node IDs
+            given by parameters, is left out with a warning.
+
+    Attributes:
+        topology: The topology.
+        eids: The element IDs, ``(n,)``.
+        pids: The part IDs, ``(n,)``.
+        connectivity: The node IDs of each element, ``(n, k)`` int32,
+            C-contiguous, 0 where an element has no node.  ``k`` is the
+            largest number of node columns of the keywords: as read, 8 for
+            shells, ``N1`` to ``N8``, and 8 or 10 for solids, more with the
+            higher-order options.
+        keywords: The keywords the table was built from.
+        offsets: The row of the first element of each keyword, and the
+            number of elements last.
+        keyword_index: For each element, the position in ``keywords`` of its
+            keyword.
+        keyword_rows: For each element, its row in its keyword's cards.
+
+    Raises:
+        ValueError: *topology* is not one of ``ELEMENT_TOPOLOGIES``.
+    """
+
+    def __init__(self, topology: str, keywords: List[LSDynaKeyword]):
+        if topology not in ELEMENT_TOPOLOGIES:
+            raise ValueError(f"Unknown element topology: {topology!r}")
+        self.topology = topology
+        self.keywords = list(keywords)
+        columns = [_element_columns(kw, topology) for kw in self.keywords]
+        self._stamps = [_stamp(c) for c in columns]
+        self.offsets = _offsets(columns)
+        n = int(self.offsets[-1])
+        k = max([len(c) - 2 for c in columns if c is not None], default=0)
+        counts = np.diff(self.offsets)
+        self.keyword_index = np.repeat(np.arange(len(self.keywords), dtype=np.intp), counts)
+        self.keyword_rows = np.arange(n, dtype=np.intp) - np.repeat(self.offsets[:-1], counts)
+
+        filled = [c for c in columns if c is not None and len(c[0])]
+        block = _column_block(filled[0][2:]) if len(filled) == 1 else None
+        if block is not None and block.shape[1] == k:
+            # One keyword, whose node columns are one block: its arrays as
+            # they are.
+            self.eids, self.pids = (_read_only(c.view()) for c in filled[0][:2])
+            self.connectivity = _read_only(block.view())
+        else:
+            self.eids = np.empty(n, dtype=np.int32)
+            self.pids = np.empty(n, dtype=np.int32)
+            self.connectivity = np.zeros((n, k), dtype=np.int32)
+            for c, start, stop in zip(columns, self.offsets[:-1], self.offsets[1:]):
+                if c is None:
+                    continue
+                self.eids[start:stop] = c[0]
+                self.pids[start:stop] = c[1]
+                for j, col in enumerate(c[2:]):
+                    self.connectivity[start:stop, j] = col
+            for a in (self.eids, self.pids, self.connectivity):
+                _read_only(a)
+        _read_only(self.keyword_index)
+        _read_only(self.keyword_rows)
+        self._index: Optional[_IdIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.eids)
+
+    def __repr__(self):
+        return (f"ElementTable({self.topology!r}, {len(self)} elements "
+                f"from {len(self.keywords)} keywords)")
+
+    def is_current(self, keywords: Optional[List[LSDynaKeyword]] = None) -> bool:
+        """
+        Whether the table still shows its keywords' elements: none of their
+        ``EID``, ``PID`` or node columns was changed or replaced since.
+
+        Args:
+            keywords: The keywords of the topology in the deck now; the table
+                is not current either if they are not the ones it was built
+                from.
+        """
+        return _is_current(self.keywords, self._stamps, keywords,
+                           lambda kw: _element_columns(kw, self.topology, warn=False))
+
+    def rows(self, eids, default: Optional[int] = None) -> np.ndarray:
+        """
+        The rows of the elements *eids*, an array of the same shape.
+
+        Args:
+            eids: Element IDs, an array of any shape or a single ID.
+            default: The row given for an ID that is not in the table.
+
+        Raises:
+            KeyError: An ID is not in the table and *default* is None.
+        """
+        if self._index is None:
+            self._index = _IdIndex(self.eids, "element")
+        return self._index.rows(eids, default)
+
+    def node_rows(self, nodes: NodeTable) -> np.ndarray:
+        """
+        ``connectivity`` as rows of *nodes*, ``(n, k)``, -1 where an element
+        has no node.
+
+        Raises:
+            KeyError: An element has a node that is not in *nodes*.
+        """
+        rows = nodes.rows(self.connectivity, default=-1)
+        unknown = (rows < 0) & (self.connectivity != 0)
+        if unknown.any():
+            # Raises the KeyError naming them.
+            nodes.rows(self.connectivity[unknown])
+        return rows
+
+
+def pack_columns(card: Dict[str, np.ndarray], names: Optional[List[str]] = None):
+    """
+    Store the columns *names* of *card*, by default its node columns ``N1``,
+    ``N2``, ..., as the columns of one C-contiguous 2-D int32 block, in that
+    order, so that ``ElementTable`` can take the block as it is.  *card* is
+    left alone unless the columns are all int32, of one length.
+    """
+    if names is None:
+        names = _node_names(card)
+    columns = [card.get(name) for name in names]
+    if not columns or any(not isinstance(c, np.ndarray) or c.dtype != np.int32 or c.ndim != 1
+                          or len(c) != len(columns[0]) for c in columns):
+        return
+    block = np.empty((len(columns[0]), len(columns)), dtype=np.int32)
+    for j, c in enumerate(columns):
+        block[:, j] = c
+    for j, name in enumerate(names):
+        card[name] = block[:, j]
+
+
+def _offsets(columns: List[Optional[List[np.ndarray]]]) -> np.ndarray:
+    """The first row of each keyword's *columns* in a table, and the rows in all."""
+    counts = [len(c[0]) if c is not None else 0 for c in columns]
+    return np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+
+
+def _read_only(a: np.ndarray) -> np.ndarray:
+    a.flags.writeable = False
+    return a
+
+
+def _is_current(built_from: List[LSDynaKeyword], stamps: List[Optional[bytes]],
+                keywords: Optional[List[LSDynaKeyword]], columns_of) -> bool:
+    if keywords is not None and (len(keywords) != len(built_from) or any(
+            a is not b for a, b in zip(keywords, built_from))):
+        return False
+    return all(_stamp(columns_of(kw)) == stamp for kw, stamp in zip(built_from, stamps))
+
+
+def _node_columns(keyword: LSDynaKeyword, warn: bool = True) -> Optional[List[np.ndarray]]:
+    """The ``NID``, ``X``, ``Y`` and ``Z`` columns of *keyword*, or None
+    when it does not have them all, of one length."""
+    card = keyword.cards.get('Card 1')
+    columns = _columns(card, _NODE_COLUMNS)
+    if columns is None and warn:
+        logger.warning(f"Leaving out of the node table: {keyword.full_keyword} "
+                       f"without its node columns")
+    return columns
+
+
+def _element_columns(keyword: LSDynaKeyword, topology: str,
+                     warn: bool = True) -> Optional[List[np.ndarray]]:
+    """The ``EID`` and ``PID`` columns of *keyword* and its node columns,
+    ``N1`` on, or None when it does not have them, of one length, or has a
+    node ID given by a parameter."""
+    cards = keyword.cards
+    card1 = cards.get('Card 1')
+    card = cards.get(ELEMENT_TOPOLOGIES[topology][1])
+    ids = _columns(card1, ('EID', 'PID'))
+    names = _node_names(card)
+    nodes = _columns(card, names) if names else None
+    if ids is None or nodes is None or len(ids[0]) != len(nodes[0]):
+        if warn:
+            logger.warning(f"Leaving out of the {topology} table: {keyword.full_keyword} "
+                           f"without its element columns")
+        return None
+    columns = ids + nodes
+    if any(c.dtype.hasobject for c in columns):
+        if warn:
+            logger.warning(f"Leaving out of the {topology} table: {keyword.full_keyword} "
+                           f"with parameters for IDs")
+        return None
+    return columns
+
+
+def _node_names(card: Optional[Dict[str, np.ndarray]]) -> List[str]:
+    """The node columns of an element card: ``N1``, ``N2``, ... as far as
+    they go."""
+    names = []
+    while isinstance(card, dict) and f"N{len(names) + 1}" in card:
+        names.append(f"N{len(names) + 1}")
+    return names
+
+
+def _columns(card, names) -> Optional[List[np.ndarray]]:
+    """The columns *names* of *card*, or None unless they are all there,
+    1-D and of one length."""
+    if not isinstance(card, dict):
+        return None
+    columns = [card.get(name) for name in names]
+    if any(not isinstance(c, np.ndarray) or c.ndim != 1 or len(c) != len(columns[0])
+           for c in columns):
+        return None
+    return columns
+
+
+def _column_block(columns: List[np.ndarray]) -> Optional[np.ndarray]:
+    """The C-contiguous int32 block whose columns *columns* are, in order, or None."""
+    base = columns[0].base if columns else None
+    if not (isinstance(base, np.ndarray) and base.ndim == 2 and base.dtype == np.int32
+            and base.flags.c_contiguous and base.shape == (len(columns[0]), len(columns))):
+        return None
+    address = base.__array_interface__['data'][0]
+    for j, c in enumerate(columns):
+        if (c.base is not base or c.dtype != np.int32 or c.strides != base.strides[:1]
+                or c.__array_interface__['data'][0] != address + j * base.itemsize):
+            return None
+    return base
+
+
+def _numeric(columns: Optional[List[np.ndarray]],
+             keyword: LSDynaKeyword) -> Optional[List[np.ndarray]]:
+    """*columns* as numbers.  A coordinate given by a ``*PARAMETER`` is
+    NaN; a keyword with a node ID given by one is left out."""
+    if columns is None:
+        return None
+    if columns[0].dtype.hasobject:
+        logger.warning(f"Leaving out of the node table: {keyword.full_keyword} "
+                       f"with parameters for node IDs")
+        return None
+    converted = [columns[0]]
+    for c in columns[1:]:
+        if c.dtype.hasobject:
+            logger.warning(f"Coordinates given by parameters are NaN in the node table: "
+                           f"{keyword.full_keyword}")
+            c = np.array([v if isinstance(v, (int, float, np.number)) else np.nan
+                          for v in c.tolist()], dtype=np.float64)
+        converted.append(c)
+    return converted
+
+
+def _stamp(columns: Optional[List[np.ndarray]]) -> Optional[bytes]:
+    """A digest of *columns*: which arrays they are and what they hold."""
+    if columns is None:
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    for c in columns:
+        digest.update(f"{id(c)}{c.dtype.str}{c.shape}".encode())
+        if c.dtype.hasobject:
+            digest.update(repr(c.tolist()).encode())
+        else:
+            digest.update(np.ascontiguousarray(c).view(np.uint8))
+    return digest.digest()
@@ -204,10 +204,6 @@ class BoundaryPrescribedMotion(LSDynaKeyword):
 
         s1 = self._CARD1_SCHEMA
         s3 = self._CARD3_SCHEMA
-        f1_types = [f.type for f in s1.fields]
-        f1_lens  = [f.width for f in s1.fields]
-        f3_types = [f.type for f in s3.fields]
-        f3_lens  = [f.width for f in s3.fields]
 
         active = self._active_optional_schemas()
 
@@ -220,8 +216,7 @@ class BoundaryPrescribedMotion(LSDynaKeyword):
         # Card 3 (selected by DOF/VAD), Card 4 (SET_LINE), Card 5
         # (BNDOUT2DYNAIN), Card 6 (the UVW/XYZ options).
         while line_idx < len(card_lines):
-            vals = self.parser.parse_line(
-                card_lines[line_idx], f1_types, field_len=f1_lens)
+            vals = s1.codec.parse_line(card_lines[line_idx])
             card1_rows.append(vals)
             line_idx += 1
 
@@ -231,8 +226,7 @@ class BoundaryPrescribedMotion(LSDynaKeyword):
                     vad = vals[2]
                     if (dof is not None and abs(int(dof)) in {9, 10, 11}) or vad == 4:
                         if line_idx < len(card_lines):
-                            card3_rows.append(self.parser.parse_line(
-                                card_lines[line_idx], f3_types, field_len=f3_lens))
+                            card3_rows.append(s3.codec.parse_line(card_lines[line_idx]))
                             line_idx += 1
                         else:
                             card3_rows.append([None] * len(s3.fields))
@@ -282,18 +276,12 @@ class BoundaryPrescribedMotion(LSDynaKeyword):
             """Emit a card's header once, before its first data row."""
             if schema.name in headers_written:
                 return
-            file_obj.write(self.parser.format_header(
-                [f.header_name or f.name for f in schema.fields],
-                field_len=[f.width for f in schema.fields],
-            ))
+            file_obj.write(schema.codec.header)
             headers_written.add(schema.name)
 
         def _write_row(schema: CardSchema, card, i: int):
-            parts = [
-                self.parser.format_field(card[f.name][i], f.type, field_len=f.width)
-                for f in schema.fields
-            ]
-            file_obj.write(''.join(parts) + '\n')
+            file_obj.write(schema.codec.format_row(
+                [card[f.name][i] for f in schema.fields]) + '\n')
 
         _write_header(s1)
 
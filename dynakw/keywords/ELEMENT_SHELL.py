@@ -6,6 +6,7 @@ import numpy as np
 
 from dynakw.keywords.lsdyna_keyword import LSDynaKeyword
 from dynakw.core.card_schema import CardField, CardSchema
+from dynakw.core.mesh_tables import pack_columns
 
 
 class ElementShell(LSDynaKeyword):
@@ -17,6 +18,8 @@ class ElementShell(LSDynaKeyword):
     Card storage
     ------------
     Card 1  : EID, PID, N1-N8                 (int32, width=8)
+              N1-N8 as read are the columns of one (n_elems × 8) block,
+              see ``mesh_tables.pack_columns``
     Card 2  : THIC1-4 + BETA or MCID          (float64/int32, width=16)
     Card 3  : THIC5-8 for midside nodes        (float64, width=16)
     Card 4  : OFFSET                           (float64, width=16)
@@ -258,6 +261,7 @@ class ElementShell(LSDynaKeyword):
         # Fast path: basic case — fully schema-driven
         if not opt.any_option:
             self._parse_grouped_lines(card_lines, [self._CARD1_SCHEMA])
+            pack_columns(self.cards["Card 1"])
             return
 
         # General case: per-element loop
@@ -267,9 +271,7 @@ class ElementShell(LSDynaKeyword):
         s5 = self._CARD5_SCHEMA
 
         def _parse(schema, line):
-            return self.parser.parse_line(
-                line, [f.type for f in schema.fields],
-                field_len=[f.width for f in schema.fields])
+            return schema.codec.parse_line(line)
 
         c1_rows, c2_rows, c3_rows = [], [], []
         c4_vals, c5_rows = [], []
@@ -334,6 +336,7 @@ class ElementShell(LSDynaKeyword):
                 f.name: arr[:, j].astype(self._DTYPE_MAP[f.type], copy=False)
                 for j, f in enumerate(s1.fields)
             }
+            pack_columns(self.cards["Card 1"])
 
         # --- Store Card 2 ---
         if c2_rows:
@@ -423,9 +426,11 @@ class ElementShell(LSDynaKeyword):
 
         # Write all headers first
         def _write_header(schema):
-            file_obj.write(self.parser.format_header(
-                [f.header_name or f.name for f in schema.fields],
-                field_len=[f.width for f in schema.fields]))
+            file_obj.write(schema.codec.header)
+
+        def _write_row(schema, card, i):
+            file_obj.write(schema.codec.format_row(
+                [card[f.name][i] for f in schema.fields]) + '\n')
 
         _write_header(self._CARD1_SCHEMA)
         if has_card2:
@@ -457,23 +462,17 @@ class ElementShell(LSDynaKeyword):
 
         for i in range(n_elem):
             # Card 1
-            parts = [self.parser.format_field(card1[f.name][i], f.type, field_len=f.width)
-                     for f in self._CARD1_SCHEMA.fields]
-            file_obj.write(''.join(parts) + '\n')
+            _write_row(self._CARD1_SCHEMA, card1, i)
 
             # Card 2
             if card2 is not None:
-                parts = [self.parser.format_field(card2[f.name][i], f.type, field_len=f.width)
-                         for f in s2.fields]
-                file_obj.write(''.join(parts) + '\n')
+                _write_row(s2, card2, i)
 
             # Card 3 — only for elements with midside nodes
             if card3 is not None:
                 has_mid = any(int(card1[f"N{j}"][i]) > 0 for j in range(5, 9))
                 if has_mid:
-                    parts = [self.parser.format_field(card3[f.name][i], f.type, field_len=f.width)
-                             for f in self._CARD3_SCHEMA.fields]
-                    file_obj.write(''.join(parts) + '\n')
+                    _write_row(self._CARD3_SCHEMA, card3, i)
 
             # Card 4
             if card4 is not None:
@@ -482,9 +481,7 @@ class ElementShell(LSDynaKeyword):
 
             # Card 5
             if card5 is not None:
-                parts = [self.parser.format_field(card5[f.name][i], f.type, field_len=f.width)
-                         for f in self._CARD5_SCHEMA.fields]
-                file_obj.write(''.join(parts) + '\n')
+                _write_row(self._CARD5_SCHEMA, card5, i)
 
             # Card 6 (COMPOSITE): two layers per output line, column 4 blank
             if card6 is not None:
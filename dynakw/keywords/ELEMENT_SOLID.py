@@ -4,12 +4,15 @@ from typing import TextIO, List
 import numpy as np
 from dynakw.keywords.lsdyna_keyword import LSDynaKeyword
 from dynakw.core.card_schema import CardField, CardSchema
+from dynakw.core.mesh_tables import pack_columns
 
 
 class ElementSolid(LSDynaKeyword):
     """
     Implements the *ELEMENT_SOLID keyword.
-    Supports standard, legacy, and option-based formats.
+    Supports standard, legacy, and option-based formats.  The N columns of
+    the ``nodes`` card as read are the columns of one block, see
+    ``mesh_tables.pack_columns``.
     """
     keyword_string = "*ELEMENT_SOLID"
 
@@ -139,6 +142,8 @@ class ElementSolid(LSDynaKeyword):
                 self._parse_standard_format(data_lines)
             else:
                 self._parse_grouped_lines(data_lines, self._STANDARD_SCHEMAS)
+        if "nodes" in self.cards:
+            pack_columns(self.cards["nodes"])
 
     def _is_complex(self) -> bool:
         """True when the keyword uses options that need more than 1 node card,
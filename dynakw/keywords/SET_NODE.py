@@ -229,16 +229,14 @@ class SetNode(LSDynaKeyword):
             return
 
         schema = self._CARD_2B
-        field_types = [f.type for f in schema.fields]
-        field_lens = [f.width for f in schema.fields]
+        codec = schema.codec
 
         n_rows = len(card2["NID"])
         blank_rows = {i: [] for i in range(1, 5)}
         for row, line in enumerate(node_lines):
             if row >= n_rows:
                 break
-            values = self.parser.parse_line(
-                line, field_types, field_len=field_lens, default_value=None)
+            values = codec.parse_line(line, default_value=None)
             for i in range(1, 5):
                 if values[i] is None:
                     blank_rows[i].append(row)
@@ -269,10 +267,7 @@ class SetNode(LSDynaKeyword):
             return
 
         if schema.write_header:
-            file_obj.write(self.parser.format_header(
-                [f.header_name or f.name for f in schema.fields],
-                field_len=[f.width for f in schema.fields],
-            ))
+            file_obj.write(schema.codec.header)
 
         n_rows = len(card[schema.fields[0].name])
         for idx in range(n_rows):
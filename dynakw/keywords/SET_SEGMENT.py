@@ -168,16 +168,14 @@ class SetSegment(LSDynaKeyword):
 
         schema = next(s for s in self.card_schemas
                       if s.name == "Card 2" and s.repeating and s.condition(self))
-        field_types = [f.type for f in schema.fields]
-        field_lens = [f.width for f in schema.fields]
+        codec = schema.codec
 
         n_rows = len(card2["N1"])
         blank_rows = {i: [] for i in range(1, 5)}
         for row, line in enumerate(segment_lines):
             if row >= n_rows:
                 break
-            values = self.parser.parse_line(
-                line, field_types, field_len=field_lens, default_value=None)
+            values = codec.parse_line(line, default_value=None)
             for i in range(1, 5):
                 if values[3 + i] is None:
                     blank_rows[i].append(row)
@@ -191,10 +191,7 @@ class SetSolid(LSDynaKeyword):
             return
 
         if schema.write_header:
-            file_obj.write(self.parser.format_header(
-                [f.header_name or f.name for f in schema.fields],
-                field_len=[f.width for f in schema.fields],
-            ))
+            file_obj.write(schema.codec.header)
 
         n_rows = len(card[schema.fields[0].name])
         for idx in range(n_rows):
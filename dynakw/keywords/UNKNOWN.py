@@ -2,7 +2,9 @@
 
 from .lsdyna_keyword import LSDynaKeyword
 from ..core.enums import KeywordType
-from typing import List
+from typing import List, Union
+
+from ..utils.block_text import block_lines
 
 
 class Unknown(LSDynaKeyword):
@@ -31,6 +33,34 @@ class Unknown(LSDynaKeyword):
         # so reporting it under that type would make find_keywords() return it.
         self.type = self._keyword
 
+    @classmethod
+    def skipped(cls, keyword_line: str, block: Union[List[str], bytes]) -> "Unknown":
+        """
+        A block the reader was told not to parse, kept as it was read.
+
+        Nothing is decoded: the block costs what its bytes cost, and
+        ``write_source`` writes them back unchanged.  ``raw_data`` is filled
+        in from the block when it is first used.
+        """
+        return cls.deferred(keyword_line, block)
+
+    @property
+    def raw_data(self) -> str:
+        """The lines of the block after the keyword line, comments included."""
+        if self._pending:
+            self._materialize()
+        return self._raw_data
+
+    @raw_data.setter
+    def raw_data(self, value: str):
+        self._raw_data = value
+        self._pending = False
+        self._read_as = None
+
+    def _materialize(self):
+        self._pending = False
+        self._raw_data = "\n".join(block_lines(self._source)[0][1:])
+
     def __repr__(self) -> str:
         return f"Unknown(keyword='data='{self.raw_data[:20]}...')"
 
@@ -2,15 +2,49 @@
 
 from collections import OrderedDict
 from abc import ABC, abstractmethod
-from typing import TextIO, List, Dict, Optional, Tuple
+from typing import TextIO, List, Dict, Optional, Tuple, Union
 import numpy as np
 from dynakw.core.enums import KeywordType
 from dynakw.core.card_schema import CardField, CardGroup, CardSchema
 from dynakw.core.parameter_ref import ParameterRef
 from dynakw.utils.format_parser import FormatParser
+from dynakw.utils.block_text import block_lines, decode_lines
+import copy
+import hashlib
+import logging
+import pickle
 import os
 import importlib
 
+logger = logging.getLogger(__name__)
+
+# Upper bound on the entries of each dispatch memo.  Decks repeat a small set
+# of keyword lines many times over, so the memos stay far below this; it only
+# stops a file of unique lines from growing them without limit.
+_MEMO_LIMIT = 4096
+
+# KeywordType members by name, for lookups without raising KeyError.
+_KEYWORD_TYPES: Dict[str, KeywordType] = dict(KeywordType.__members__)
+
+
+def _fingerprint_into(digest, value):
+    """Feed *value*, cards or anything in them, to *digest*."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            digest.update(repr(key).encode())
+            _fingerprint_into(digest, item)
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype.str}{value.shape}".encode())
+        if value.dtype.hasobject:
+            _fingerprint_into(digest, value.tolist())
+        else:
+            digest.update(np.ascontiguousarray(value).view(np.uint8))
+    else:
+        try:
+            digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            digest.update(repr(value).encode())
+
 
 class LSDynaKeyword(ABC):
     """
@@ -28,6 +62,15 @@ class LSDynaKeyword(ABC):
 
     Attributes:
         cards ( Dict[str, Dict[str, np.ndarray]] = {} ): The cards content as described in the LS-DYNA manual; e.g. kw.cards['Card 1']['SF']
+
+    A keyword can also be created *deferred* (see ``deferred``): it keeps the
+    text of its block and parses it the first time ``cards`` is touched.  Until
+    then ``materialized`` is False and ``write_source`` reproduces the block
+    exactly as it was read.
+
+    A keyword read from a file knows whether it has been changed since (see
+    ``modified``); ``DynaKeywordReader.write`` copies the blocks of those that
+    have not, instead of formatting their cards.
     """
 
     KEYWORD_MAP: Dict[str, "LSDynaKeyword"] = OrderedDict()
@@ -90,6 +133,30 @@ class LSDynaKeyword(ABC):
     a longer line is then treated as a different keyword and falls through to
     ``Unknown``, which preserves it verbatim instead of mis-parsing it."""
 
+    source_file: Optional[str] = None
+    """The file the keyword was read from; an include file when includes are
+    followed.  None for a keyword that was not read from a file."""
+
+    # Block of a deferred keyword, as lines or as the bytes read from the file;
+    # None when built eagerly.  Class-level defaults so that subclasses touching
+    # ``cards`` before calling ``super().__init__`` still see a consistent state.
+    _source: Union[List[str], bytes, None] = None
+    _pending: bool = False
+    # Where the block was read from: (path, byte offset, length, CRC-32).
+    _span: Optional[Tuple[str, int, int, int]] = None
+    # The keyword line as read; None for a keyword made in code, or one whose
+    # block no longer stands for it.
+    _read_as: Optional[str] = None
+    # Digest of the cards when they were first handed out since reading.
+    _fingerprint: Optional[bytes] = None
+    # The keyword a ``shared_copy`` shares its state with until it is used.
+    _shared: Optional["LSDynaKeyword"] = None
+
+    # Dispatch memos: the class resolved for a cleaned keyword line, and the
+    # (type, options) parsed from a keyword name.  Shared by all subclasses.
+    _resolved: Dict[str, Optional[type]] = {}
+    _parsed_names: Dict[str, Tuple[KeywordType, Tuple[str, ...]]] = {}
+
     def __init_subclass__(cls, **kwargs):
         """This method is called when a subclass of LSDynaKeyword is defined."""
         super().__init_subclass__(**kwargs)
@@ -101,6 +168,8 @@ class LSDynaKeyword(ABC):
         if hasattr(cls, 'keyword_aliases'):
             for alias in cls.keyword_aliases:
                 cls.KEYWORD_MAP[alias] = cls
+        # A new name can change what an already resolved line dispatches to.
+        LSDynaKeyword._resolved.clear()
 
     def __init__(self, keyword_name: str, raw_lines: List[str] = None, start_line: int = None):
         """
@@ -113,33 +182,203 @@ class LSDynaKeyword(ABC):
         """
         self.full_keyword = keyword_name.strip()
         self.type, self.options = self._parse_keyword_name(self.full_keyword)
-        self.cards: Dict[str, Dict[str, np.ndarray]] = {}
+        self._cards: Dict[str, Dict[str, np.ndarray]] = {}
         self.parser = FormatParser()
         self._start_line = start_line
 
         if raw_lines:
             self._parse_raw_data(raw_lines)
 
+    @classmethod
+    def deferred(cls, keyword_name: str, block: Union[List[str], bytes],
+                 start_line: int = None) -> "LSDynaKeyword":
+        """
+        Creates a keyword that parses its block only when ``cards`` is first used.
+
+        Args:
+            keyword_name (str): The keyword line, as passed to the constructor.
+            block (List[str] or bytes): The complete block as read, keyword line
+                and comment lines included, either as lines or as the bytes of
+                the file; bytes are decoded only when needed.  It is what
+                ``write_source`` writes back.
+            start_line (int, optional): The line number where the keyword starts in the file.
+        """
+        kw = cls(keyword_name)
+        kw._start_line = start_line
+        kw._source = block
+        kw._pending = True
+        kw._read_as = kw.full_keyword
+        return kw
+
+    def _read_from(self, span: Tuple[str, int, int, int]):
+        """Record that the keyword is the block at *span*, ``(path, byte
+        offset, length, CRC-32)``, as read."""
+        self._span = span
+        self._read_as = self.full_keyword
+        self._fingerprint = None
+
+    def _rewritten(self, span: Tuple[str, int, int, int], block: bytes):
+        """Record that the keyword was written back to its file as *block*,
+        at *span*: from now on it is unchanged from there."""
+        self._read_from(span)
+        if self._source is not None:
+            self._source = block
+        if not self._pending:
+            self._fingerprint = self._cards_fingerprint()
+
+    def shared_copy(self) -> "LSDynaKeyword":
+        """
+        A copy of this keyword that shares its state until it is used.
+
+        Making the copy costs no more than a shallow copy.  The first time the
+        copy's ``cards`` are accessed it takes a deep copy of this keyword's
+        state, so changes made through it never reach this keyword or its
+        other copies; until then ``write_source`` writes this keyword.  This
+        keyword must not be changed while copies of it are in use.
+        """
+        clone = copy.copy(self)
+        clone.options = list(self.options)
+        clone._shared = self._shared if self._shared is not None else self
+        return clone
+
+    def _unshare(self):
+        """Give a shared copy state of its own, keeping attributes set on it since."""
+        origin = self._shared
+        self._shared = None
+        state = {k: v for k, v in origin.__dict__.items() if k != '_shared'}
+        own = {k: v for k, v in self.__dict__.items()
+               if k != '_shared' and (k not in state or v is not state[k])}
+        state = copy.deepcopy(state)
+        state.update(own)
+        self.__dict__.update(state)
+
+    @property
+    def cards(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """The cards content, parsed from the block on first access if deferred."""
+        if self._shared is not None:
+            self._unshare()
+        if self._pending:
+            self._materialize()
+        if self._fingerprint is None and self._read_as is not None:
+            # Handed out for the first time since reading: what the cards are
+            # now tells ``modified`` later whether they were changed.
+            self._fingerprint = self._cards_fingerprint()
+        return self._cards
+
+    @cards.setter
+    def cards(self, value: Dict[str, Dict[str, np.ndarray]]):
+        if self._shared is not None:
+            self._unshare()
+        self._pending = False
+        self._read_as = None
+        self._cards = value
+
+    @property
+    def materialized(self) -> bool:
+        """False while a deferred keyword has not parsed its block yet."""
+        return not self._pending
+
+    @property
+    def modified(self) -> bool:
+        """
+        Whether the keyword may differ from the block it was read from.
+
+        True for a keyword made in code, and for one whose ``cards`` were
+        assigned, changed in place, or whose ``full_keyword`` was changed.
+        Changes in place are found by comparing a digest of the cards with
+        the one taken when they were first accessed, so keywords whose cards
+        were never accessed cost nothing to check.  Other attributes are not
+        looked at; assigning ``cards`` (``kw.cards = kw.cards``) marks the
+        keyword modified after changing one of those.
+        """
+        if self._shared is not None:
+            return self._shared.modified
+        if self._read_as is None or self.full_keyword != self._read_as:
+            return True
+        return (self._fingerprint is not None
+                and self._fingerprint != self._cards_fingerprint())
+
+    def _cards_fingerprint(self) -> bytes:
+        """A digest of the cards: names, dtypes, shapes and values."""
+        digest = hashlib.blake2b(digest_size=16)
+        _fingerprint_into(digest, self._cards)
+        return digest.digest()
+
+    def _materialize(self):
+        """Parse the deferred block into ``cards``.
+
+        A block that fails to parse is logged and leaves ``cards`` empty; the
+        keyword then keeps writing its original text through ``write_source``.
+        """
+        self._pending = False
+        lines, data_lines = block_lines(self._source)
+        # The cards are built through ``cards``, which must not take their
+        # digest before they are complete.
+        read_as, self._read_as = self._read_as, None
+        try:
+            self._parse_raw_data(data_lines)
+        except Exception as e:
+            logger.error(f"Error {e} reading: \"{lines[0]}\"")
+            self._cards = {}
+        finally:
+            self._read_as = read_as
+
+    def write_source(self, file_obj: TextIO):
+        """
+        Writes the block as it was read, when that text is still authoritative.
+
+        This is the case for a deferred keyword that was not ``modified``,
+        parsed or not, and for one whose block could not be parsed.  Otherwise
+        the keyword is written from its cards with ``write``.
+
+        Args:
+            file_obj (TextIO): The file object to write to.
+        """
+        if self._shared is not None:
+            self._shared.write_source(file_obj)
+        elif self._source is not None and not self.modified:
+            if isinstance(self._source, bytes):
+                # Byte for byte, line ends and trailing blanks included.
+                text = self._source.decode('utf-8', 'ignore')
+                file_obj.write(text if text.endswith('\n') else text + '\n')
+            else:
+                file_obj.write("\n".join(self._source))
+                file_obj.write("\n")
+        else:
+            self.write(file_obj)
+
+    def _source_lines(self) -> List[str]:
+        """The lines of the deferred block."""
+        if isinstance(self._source, bytes):
+            return decode_lines(self._source)
+        return self._source
+
     @staticmethod
     def _parse_keyword_name(keyword_name: str) -> Tuple[KeywordType, List[str]]:
         """
         Parses the keyword name to extract the base type and options.
         Example: "*BOUNDARY_PRESCRIBED_MOTION_NODE" -> (KeywordType.BOUNDARY_PRESCRIBED_MOTION, ["NODE"])
         """
-        # Remove leading '*' and split by '_'
-        parts = keyword_name.strip()[1:].split('_')
-
-        # Find the longest matching enum name
-        for i in range(len(parts), 0, -1):
-            base_keyword_str = '_'.join(parts[:i])
-            try:
-                type = KeywordType[base_keyword_str]
-                options = parts[i:]
-                return type, options
-            except KeyError:
-                continue
-
-        return KeywordType.UNKNOWN, parts
+        keyword_name = keyword_name.strip()
+        parsed = LSDynaKeyword._parsed_names.get(keyword_name)
+        if parsed is None:
+            # Remove leading '*' and split by '_'
+            parts = keyword_name[1:].split('_')
+
+            # Find the longest matching enum name
+            parsed = KeywordType.UNKNOWN, tuple(parts)
+            for i in range(len(parts), 0, -1):
+                type = _KEYWORD_TYPES.get('_'.join(parts[:i]))
+                if type is not None:
+                    parsed = type, tuple(parts[i:])
+                    break
+
+            if len(LSDynaKeyword._parsed_names) >= _MEMO_LIMIT:
+                LSDynaKeyword._parsed_names.clear()
+            LSDynaKeyword._parsed_names[keyword_name] = parsed
+
+        # A fresh list each time: callers keep it as ``self.options``.
+        return parsed[0], list(parsed[1])
 
     @classmethod
     def resolve(cls, keyword_line: str) -> "Optional[type]":
@@ -163,17 +402,27 @@ class LSDynaKeyword(ABC):
             The handling class, or None when nothing matches.
         """
         clean_line = keyword_line.strip().rstrip('+-% ').upper()
-
+        try:
+            return cls._resolved[clean_line]
+        except KeyError:
+            pass
+
+        # The registered names that can match are prefixes of the line, so
+        # look those up from the longest down: the first one found that is
+        # allowed to match is the longest match.
         best_match = None
-        best_length = 0
-        for keyword_str, keyword_class in cls.KEYWORD_MAP.items():
-            if not clean_line.startswith(keyword_str):
+        for end in range(len(clean_line), 0, -1):
+            keyword_class = cls.KEYWORD_MAP.get(clean_line[:end])
+            if keyword_class is None:
                 continue
-            if keyword_class.exact_match and clean_line != keyword_str:
+            if keyword_class.exact_match and end != len(clean_line):
                 continue
-            if len(keyword_str) > best_length:
-                best_match = keyword_class
-                best_length = len(keyword_str)
+            best_match = keyword_class
+            break
+
+        if len(cls._resolved) >= _MEMO_LIMIT:
+            cls._resolved.clear()
+        cls._resolved[clean_line] = best_match
         return best_match
 
     def has_option(self, option: str) -> bool:
@@ -270,62 +519,34 @@ class LSDynaKeyword(ABC):
 
     def _parse_single_card(self, line: str, schema: CardSchema) -> Dict[str, np.ndarray]:
         """Parse one fixed-width line into a dict of single-element numpy arrays."""
-        field_types = [f.type for f in schema.fields]
-        field_lens  = [f.width for f in schema.fields]
-        values = self.parser.parse_line(line, field_types, field_len=field_lens)
+        codec = schema.codec
+        values = codec.parse_line(line)
         return {
             f.name: np.array(
                 [values[i]],
-                dtype=object if isinstance(values[i], ParameterRef) else self._DTYPE_MAP[f.type],
+                dtype=object if isinstance(values[i], ParameterRef) else codec.dtypes[i],
             )
             for i, f in enumerate(schema.fields)
         }
 
     def _parse_repeating_card(self, lines: List[str], schema: CardSchema) -> Dict[str, np.ndarray]:
-        """Parse multiple fixed-width lines into a dict of numpy arrays (one row per line)."""
-        field_types = [f.type for f in schema.fields]
-        field_lens  = [f.width for f in schema.fields]
-        col_dtypes  = [self._DTYPE_MAP[f.type] for f in schema.fields]
-        columns     = [f.name for f in schema.fields]
-
-        parsed_data = []
-        for line in lines:
-            values = self.parser.parse_line(line, field_types, field_len=field_lens)
-            if any(v is not None for v in values):
-                parsed_data.append(values[:len(schema.fields)])
-
-        if parsed_data:
-            arr = np.array(parsed_data, dtype=object)
-            result = {}
-            for i, col in enumerate(columns):
-                col_arr = arr[:, i]
-                has_ref = any(isinstance(v, ParameterRef) for v in col_arr)
-                result[col] = col_arr.astype(object if has_ref else col_dtypes[i], copy=False)
-            return result
-        else:
-            return {col: np.array([], dtype=col_dtypes[i]) for i, col in enumerate(columns)}
+        """Parse multiple fixed-width lines into a dict of numpy arrays (one row per line).
+
+        All lines are parsed together by ``LineCodec.parse_columns``, which
+        converts whole columns at once rather than one field at a time.
+        """
+        values = schema.codec.parse_columns(lines)
+        return {f.name: values[i] for i, f in enumerate(schema.fields)}
 
     def _write_card(self, file_obj: TextIO, card: Dict[str, np.ndarray], schema: CardSchema):
         """Write one card (single or repeating) to file_obj."""
+        codec = schema.codec
         if schema.write_header:
-            file_obj.write(self.parser.format_header(
-                [f.header_name or f.name for f in schema.fields],
-                field_len=[f.width for f in schema.fields],
-            ))
+            file_obj.write(codec.header)
         if schema.repeating:
-            n_rows = len(card[schema.fields[0].name])
-            for idx in range(n_rows):
-                parts = [
-                    self.parser.format_field(card[f.name][idx], f.type, field_len=f.width)
-                    for f in schema.fields
-                ]
-                file_obj.write(''.join(parts) + '\n')
+            file_obj.write(codec.format_block([card[f.name] for f in schema.fields]))
         else:
-            parts = [
-                self.parser.format_field(card[f.name][0], f.type, field_len=f.width)
-                for f in schema.fields
-            ]
-            file_obj.write(''.join(parts) + '\n')
+            file_obj.write(codec.format_row([card[f.name][0] for f in schema.fields]) + '\n')
 
     def _parse_grouped_lines(self, data_lines: List[str], schemas: List[CardSchema]):
         """Parse interleaved data lines into self.cards.
@@ -351,10 +572,7 @@ class LSDynaKeyword(ABC):
         # 1. Headers
         for schema in schemas:
             if schema.write_header:
-                file_obj.write(self.parser.format_header(
-                    [f.header_name or f.name for f in schema.fields],
-                    field_len=[f.width for f in schema.fields],
-                ))
+                file_obj.write(schema.codec.header)
 
         if not schemas:
             return
@@ -365,21 +583,22 @@ class LSDynaKeyword(ABC):
             return
         n_rows = len(first_card[schemas[0].fields[0].name])
 
-        # 2. Interleaved data rows
-        for idx in range(n_rows):
-            for schema in schemas:
-                card = self.cards.get(schema.name)
-                if card is None:
-                    continue
-                parts = [
-                    self.parser.format_field(
-                        card[f.name][idx] if f.name in card else None,
-                        f.type,
-                        field_len=f.width,
-                    )
-                    for f in schema.fields
-                ]
-                file_obj.write(''.join(parts) + '\n')
+        # 2. Interleaved data rows, formatted a schema at a time
+        blocks = []
+        for schema in schemas:
+            card = self.cards.get(schema.name)
+            if card is None:
+                continue
+            rows = schema.codec.format_rows([
+                card[f.name] if f.name in card else [None] * n_rows
+                for f in schema.fields
+            ])
+            if len(rows) < n_rows:
+                raise IndexError(
+                    f"{schema.name} has {len(rows)} rows, {schemas[0].name} has {n_rows}")
+            blocks.append(rows[:n_rows])
+        for rows in zip(*blocks):
+            file_obj.writelines(rows)
 
     def __repr__(self):
         return f"LSDynaKeyword(type={self.type.name}, options={self.options})"
@@ -0,0 +1,44 @@
+"""Turning the bytes of a keyword block into lines."""
+
+from typing import List, Tuple, Union
+
+
+def decode_lines(data: bytes) -> List[str]:
+    """
+    The lines of *data*, as the reader has always presented them.
+
+    The text is decoded as UTF-8, dropping undecodable bytes, split at
+    newlines and stripped of trailing whitespace (which removes the ``\\r`` of
+    a ``\\r\\n`` line end).  A final newline does not start another line.
+    """
+    lines = [line.rstrip() for line in data.decode('utf-8', 'ignore').split('\n')]
+    if data.endswith(b'\n'):
+        lines.pop()
+    return lines
+
+
+def first_line(data: bytes) -> str:
+    """The first line of *data*, decoded as by ``decode_lines``."""
+    end = data.find(b'\n')
+    return data[:end if end >= 0 else len(data)].decode('utf-8', 'ignore').rstrip()
+
+
+def drop_comments(lines: List[str]) -> List[str]:
+    """*lines* without the comment lines, those starting with ``$`` once indentation is removed."""
+    return [line for line in lines if not line.lstrip().startswith('$')]
+
+
+def block_lines(block: Union[List[str], bytes]) -> Tuple[List[str], List[str]]:
+    """
+    The lines of a block, given as lines or as bytes, and those of them that
+    are not comments.
+
+    A block of bytes without a ``$`` anywhere has no comment line, so its
+    lines are not looked at one by one, and both lists are the same list.
+    """
+    if isinstance(block, bytes):
+        lines = decode_lines(block)
+        if b'$' not in block:
+            return lines, lines
+        return lines, drop_comments(lines)
+    return block, drop_comments(block)
@@ -1,13 +1,72 @@
 """Parser for LS-DYNA fixed format fields"""
 
+import contextlib
+import contextvars
+import itertools
 import re
-from typing import List, Any
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
 from dynakw.core.parameter_ref import ParameterRef
 
 
+_row_pool: contextvars.ContextVar = contextvars.ContextVar('dynakw_row_pool', default=None)
+"""The ``(executor, chunk_rows)`` installed by ``parallel_rows``, if any."""
+
+
+@contextlib.contextmanager
+def parallel_rows(executor: Executor, chunk_rows: int = 50_000) -> Iterator[None]:
+    """
+    Spread the rows of large repeating cards over *executor* while active.
+
+    Inside the context, ``LineCodec.parse_columns`` splits any card of at least
+    ``2 * chunk_rows`` lines into chunks of ``chunk_rows``, parses the chunks
+    on *executor* and joins their columns; smaller cards are parsed in place.
+    The result is the same as parsing the card whole.  Every card parsed
+    through ``parse_columns`` benefits, including the interleaved layouts
+    of ``CardGroup`` and ``_parse_grouped_lines``, whose lines are separated
+    per card before they are parsed.
+
+    Writing works the same way: ``LineCodec.format_rows`` and ``format_block``
+    format a card of that many rows a chunk of rows at a time on *executor*,
+    and join the text in row order.
+
+    Args:
+        executor: A thread or process pool.
+        chunk_rows: Lines per chunk.
+    """
+    token = _row_pool.set((executor, chunk_rows))
+    try:
+        yield
+    finally:
+        _row_pool.reset(token)
+
+
 class FormatParser:
     """Parser for LS-DYNA fixed format card fields"""
 
+    _COLUMN_DTYPES = {'I': np.int32, 'F': np.float64, 'A': object}
+    """Column dtype for each field type; anything else is kept as strings."""
+
+    _codecs: Dict[tuple, "LineCodec"] = {}
+    """Compiled layouts, shared by every parser; see ``codec``."""
+
+    _formatters: Dict[tuple, Callable[[Any], str]] = {}
+    """Compiled single-field writers, shared by every parser; see ``format_field``."""
+
+    _float_layouts: Dict[tuple, tuple] = {}
+    """Per ``(width, long_format)``: the magnitudes ``_format_float`` decides
+    on without comparing candidates."""
+
+    _float_memo: Dict[tuple, str] = {}
+    """Floats written by the full search of ``_format_float``, by
+    ``(value, width, long_format)``; shared by every parser."""
+
+    float_memo_size = 4096
+    """How many floats ``_float_memo`` keeps; 0 turns it off.  It is emptied
+    when full.  Values that need the search tend to recur -- a density or a
+    modulus on every material card -- and the search is the slow part."""
+
     def __init__(self):
         self.field_width = 10  # Standard field width
         self.long_field_width = 20  # Long format field width
@@ -25,6 +84,48 @@ class FormatParser:
                 return float(reconstructed_str)
         return float(field_str)
 
+    def _field_widths(self, field_types: List[str], field_len: Optional[List[int]],
+                      long_format: bool) -> List[int]:
+        """*field_len*, or the default width for every field when it is None."""
+        default_width = self.long_field_width if long_format else self.field_width
+        if field_len is None:
+            return [default_width] * len(field_types)
+        if len(field_len) != len(field_types):
+            raise ValueError(
+                "field_len must be the same length as field_types")
+        return list(field_len)
+
+    def codec(
+        self,
+        field_types: List[str],
+        field_len: List[int] = None,
+        long_format: bool = False,
+        header_names: List[str] = None
+    ) -> "LineCodec":
+        """
+        The compiled form of one card layout, for reading and writing its lines.
+
+        A layout is compiled once and the result kept, so every caller with the
+        same layout -- the schema-driven keywords through ``CardSchema.codec``,
+        and custom parsers through ``parse_line`` -- shares one codec, and
+        none of them works out slice offsets or field converters per line.
+
+        Args:
+            field_types: List of field types ('I' for int, 'F' for float, 'A' for string)
+            field_len: List of field widths (same length as field_types). If None, uses default widths.
+            long_format: Whether to use long format (20 char fields vs 10)
+            header_names: Column labels for the ``$`` header line, if the
+                codec is to provide one.
+        """
+        widths = self._field_widths(field_types, field_len, long_format)
+        key = (tuple(field_types), tuple(widths), long_format,
+               None if header_names is None else tuple(header_names))
+        codec = self._codecs.get(key)
+        if codec is None:
+            codec = LineCodec(self, field_types, widths, long_format, header_names)
+            self._codecs[key] = codec
+        return codec
+
     def parse_line(
         self,
         line: str,
@@ -43,55 +144,35 @@ class FormatParser:
             long_format: Whether to use long format (20 char fields vs 10)
             default_value: Default value to use if field is empty.
         """
-        if ',' in line:
-            return self.parse_line_by_comma(line, field_types, default_value=default_value)
+        return self.codec(field_types, field_len, long_format).parse_line(
+            line, default_value=default_value)
 
-        default_width = self.long_field_width if long_format else self.field_width
-        if field_len is None:
-            field_len = [default_width] * len(field_types)
-        elif len(field_len) != len(field_types):
-            raise ValueError(
-                "field_len must be the same length as field_types")
-
-        fields = []
-        pos = 0
-
-        for i, field_type in enumerate(field_types):
-            this_width = field_len[i]
-            start = pos
-            end = start + this_width
-
-            if start >= len(line):
-                fields.append(default_value)
-                pos = end
-                continue
-
-            field_str = line[start:end].strip()
-
-            if not field_str:
-                fields.append(default_value)
-                pos = end
-                continue
+    def parse_columns(
+        self,
+        lines: List[str],
+        field_types: List[str],
+        field_len: List[int] = None,
+        long_format: bool = False,
+        default_value: Any = 0
+    ) -> List[np.ndarray]:
+        """
+        Parse many lines of one card layout into typed columns at once.
 
-            if field_str.startswith('&'):
-                fields.append(ParameterRef(field_str[1:]))
-                pos = end
-                continue
+        See ``LineCodec.parse_columns``.
 
-            try:
-                if field_type == 'I':
-                    # Use int(float(...)) so that float-formatted integers
-                    # like "0.0000000" or "4.000E+00" are handled correctly.
-                    fields.append(int(float(field_str)))
-                elif field_type == 'F':
-                    fields.append(self._parse_float_str(field_str))
-                else:  # 'A' or anything else
-                    fields.append(field_str)
-            except ValueError:
-                fields.append(field_str)
-            pos = end
+        Args:
+            lines: Input lines, one row each.
+            field_types: List of field types ('I' for int, 'F' for float, 'A' for string)
+            field_len: List of field widths (same length as field_types). If None, uses default widths.
+            long_format: Whether to use long format (20 char fields vs 10)
+            default_value: Default value to use if field is empty.
 
-        return fields
+        Raises:
+            ValueError: A numeric column holds text that is not a number, as
+                casting the ``parse_line`` results would.
+        """
+        return self.codec(field_types, field_len, long_format).parse_columns(
+            lines, default_value=default_value)
 
     def parse_line_by_comma(
         self,
@@ -107,35 +188,21 @@ class FormatParser:
             field_types: List of field types ('I' for int, 'F' for float, 'A' for string).
             default_value: Default value to use if field is empty.
         """
-        values = [v.strip() for v in line.split(',')]
-        parsed_fields = []
+        return self.codec(field_types).parse_comma_line(line, default_value=default_value)
 
-        for i, field_type in enumerate(field_types):
-            if i < len(values):
-                field_str = values[i]
-                if not field_str:
-                    parsed_fields.append(default_value)
-                    continue
+    def _converter(self, field_type: str) -> Optional[Callable[[str], Any]]:
+        """The function turning a non-blank field of *field_type* into its value.
 
-                if field_str.startswith('&'):
-                    parsed_fields.append(ParameterRef(field_str[1:]))
-                    continue
-
-                try:
-                    if field_type == 'I':
-                        parsed_fields.append(int(float(field_str)))
-                    elif field_type == 'F':
-                        parsed_fields.append(self._parse_float_str(field_str))
-                    else:  # 'A' or anything else
-                        parsed_fields.append(field_str)
-                except ValueError:
-                    # Keep as string if conversion fails
-                    parsed_fields.append(field_str)
-            else:
-                # Pad with default_value if not enough values
-                parsed_fields.append(default_value)
-
-        return parsed_fields
+        None for string fields, which are kept as they are.  A converter raises
+        ValueError for text it cannot read, and the field is then kept as text.
+        """
+        if field_type == 'I':
+            # Use int(float(...)) so that float-formatted integers
+            # like "0.0000000" or "4.000E+00" are handled correctly.
+            return lambda field_str: int(float(field_str))
+        if field_type == 'F':
+            return self._parse_float_str
+        return None  # 'A' or anything else
 
     def _is_integer(self, s: str) -> bool:
         """Check if string represents an integer"""
@@ -231,8 +298,85 @@ class FormatParser:
         *short* string.  So the candidates are compared on the value they read
         back as, and the closest wins.  Fixed-point wins a tie, which keeps the
         familiar form for ordinary values.
+
+        Comparing candidates is slow, and for most values the outcome follows
+        from the magnitude alone: ``_float_layout`` gives the range where
+        fixed-point is certain to win and the one where it reads back as zero.
+        Only values outside both are searched, and remembered in
+        ``_float_memo``.
         """
-        decimals = 6 if long_format else 4
+        decimals, lowest, highest, tiny = self._float_layout(width, long_format)
+        magnitude = abs(value)
+        if lowest <= magnitude < highest[value < 0]:
+            return self._fixed_point(value, width, decimals)
+        if 0.0 < magnitude < tiny:
+            # Fixed-point reads back as zero, so scientific notation wins
+            # whenever the field has room for it.
+            return self._scientific(value, width) or self._fixed_point(value, width, decimals)
+
+        if value == 0.0 or value != value or not self.float_memo_size:
+            return self._search_float(value, width, decimals)
+        key = (value, width, long_format)
+        text = self._float_memo.get(key)
+        if text is None:
+            text = self._search_float(value, width, decimals)
+            if len(self._float_memo) >= self.float_memo_size:
+                self._float_memo.clear()
+            self._float_memo[key] = text
+        return text
+
+    def _float_layout(self, width: int, long_format: bool) -> tuple:
+        """
+        The decision table of ``_format_float`` for one field:
+        ``(decimals, lowest, highest, tiny)``.
+
+        Fixed-point with ``precision`` decimals is off by at most half a unit
+        in its last place, so from ``lowest`` up it holds the value to
+        ``decimals`` digits with a factor two to spare; below ``highest`` --
+        indexed by whether the value is negative -- its whole part still fits
+        the field after rounding.  Between the two the fixed-point form is the
+        answer.  Below ``tiny`` it rounds to zero and scientific notation is.
+        Everything else, and the edges themselves, is left to the search.
+        """
+        key = (width, long_format)
+        layout = self._float_layouts.get(key)
+        if layout is None:
+            decimals = 6 if long_format else 4
+            precision = decimals + max(0, width - 10)
+            highest = []
+            for sign in (0, 1):
+                digits = width - 1 - precision - sign
+                highest.append(10.0 ** digits - 1.0 if digits >= 1 else 0.0)
+            layout = (decimals, 10.0 ** (decimals - precision), tuple(highest),
+                      0.4 * 10.0 ** -precision)
+            self._float_layouts[key] = layout
+        return layout
+
+    @staticmethod
+    def _scientific(value: float, width: int) -> Optional[str]:
+        """
+        *value* in scientific notation with as many digits as fit, or None.
+
+        As many significant digits as the field can hold, keeping one column
+        free so that adjacent fields do not run together -- a full-width
+        2.1000E+11 beside 7.8500 reads as "7.85002.1000E+11".  The exponent
+        costs four characters ("E+dd"), the decimal point one, and a minus
+        sign one more; step down from there until it fits, which also covers
+        the three-digit exponents of very large and very small magnitudes.
+        """
+        start = width - 5 - (1 if value < 0 else 0)
+        for limit in (width - 1, width):
+            scientific = next(
+                (s for s in (f"{value:.{p}E}"
+                             for p in range(max(start, 0), -1, -1))
+                 if len(s) <= limit),
+                None)
+            if scientific is not None:
+                return scientific
+        return None
+
+    def _search_float(self, value: float, width: int, decimals: int) -> str:
+        """``_format_float`` by comparing the candidate forms."""
         fixed = self._fixed_point(value, width, decimals)
 
         # Keep the fixed-point form whenever it holds the value to the
@@ -245,23 +389,9 @@ class FormatParser:
         candidates = []
         if len(fixed) <= width:
             candidates.append(fixed)
-
-        # As many significant digits as the field can hold, keeping one column
-        # free so that adjacent fields do not run together -- a full-width
-        # 2.1000E+11 beside 7.8500 reads as "7.85002.1000E+11".  The exponent
-        # costs four characters ("E+dd"), the decimal point one, and a minus
-        # sign one more; step down from there until it fits, which also covers
-        # the three-digit exponents of very large and very small magnitudes.
-        start = width - 5 - (1 if value < 0 else 0)
-        for limit in (width - 1, width):
-            scientific = next(
-                (s for s in (f"{value:.{p}E}"
-                             for p in range(max(start, 0), -1, -1))
-                 if len(s) <= limit),
-                None)
-            if scientific is not None:
-                candidates.append(scientific)
-                break
+        scientific = self._scientific(value, width)
+        if scientific is not None:
+            candidates.append(scientific)
 
         if not candidates:
             # The field is too narrow for any representation; the fixed-point
@@ -270,6 +400,47 @@ class FormatParser:
 
         return min(candidates, key=lambda s: self._relative_error(value, s))
 
+    def _float_field_bytes(self, values: np.ndarray, width: int,
+                           long_format: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """``format_field`` of every value of a float64 column, as ``_field_matrix`` gives it.
+
+        The fixed-point form of each value is made, trimmed and read back for
+        the whole column at once.  Where it holds the value to the precision
+        it offers -- nearly always -- it is what ``_format_float`` returns
+        too; only the other values go through ``_format_float`` one by one.
+        """
+        decimals = 6 if long_format else 4
+        precision = decimals + max(0, width - 10)
+        pattern = f"%.{precision}f"
+        value_list = values.tolist()
+        raw = np.array([pattern % v for v in value_list], dtype=bytes)
+        chars = raw.view(np.uint8).reshape(len(raw), raw.itemsize)
+        lengths = np.count_nonzero(chars, axis=1)
+        if precision > decimals:
+            # ``_fixed_point``'s trimming: trailing zeros go, down to ``decimals``.
+            # 'nan' and 'inf' are shorter than the digits trimmed, and have
+            # no zeros to trim.
+            rows = np.arange(len(raw))
+            zeros = np.ones(len(raw), dtype=bool)
+            trimmed = np.zeros(len(raw), dtype=lengths.dtype)
+            for k in range(1, precision - decimals + 1):
+                zeros &= ((lengths > k)
+                          & (chars[rows, np.maximum(lengths - k, 0)] == ord('0')))
+                trimmed += zeros
+            lengths = lengths - trimmed
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            written = raw.astype(np.float64)
+            error = np.where(written == values, 0.0,
+                             np.where(values == 0.0, np.abs(written),
+                                      np.abs(written - values) / np.abs(values)))
+        out, fits = _right_justify(chars, lengths, width)
+        careful = np.flatnonzero(~((error <= 10.0 ** -decimals) & fits))
+        if careful.size:
+            texts = [self._format_float(value_list[i], width, long_format)
+                     for i in careful.tolist()]
+            out[careful], fits[careful] = _text_field_bytes(texts, width)
+        return out, fits
+
     def format_field(self, value: Any, field_type: str, long_format: bool = False, field_len: int = None) -> str:
         """
         Format a value according to field type
@@ -282,21 +453,509 @@ class FormatParser:
         width = self.long_field_width if long_format else self.field_width
         if field_len is not None:
             width = field_len
+        return self._formatter(field_type, width, long_format)(value)
 
-        if value is None:
-            return ' ' * width
+    def _formatter(self, field_type: str, width: int, long_format: bool) -> Callable[[Any], str]:
+        """The writer for one field of *field_type* and *width*, compiled once."""
+        key = (field_type, width, long_format)
+        formatter = self._formatters.get(key)
+        if formatter is not None:
+            return formatter
 
-        if isinstance(value, ParameterRef):
-            return f"{str(value):>{width}}"
+        blank = ' ' * width
 
         if field_type == 'I':
-            return f"{int(value):>{width}d}"
+            def formatter(value: Any) -> str:
+                if value is None:
+                    return blank
+                if isinstance(value, ParameterRef):
+                    return f"{str(value):>{width}}"
+                return f"{int(value):>{width}d}"
         elif field_type == 'F':
-            return f"{self._format_float(float(value), width, long_format):>{width}}"
-
+            format_float = self._format_float
+
+            def formatter(value: Any) -> str:
+                if value is None:
+                    return blank
+                if isinstance(value, ParameterRef):
+                    return f"{str(value):>{width}}"
+                return f"{format_float(float(value), width, long_format):>{width}}"
         else:  # 'A'
-            return f"{str(value):>{width}}"
+            def formatter(value: Any) -> str:
+                if value is None:
+                    return blank
+                return f"{str(value):>{width}}"
+
+        self._formatters[key] = formatter
+        return formatter
+
+
+class LineCodec:
+    """One card layout, compiled for reading and writing its lines.
+
+    Everything that depends only on the layout is worked out here once: where
+    each field starts and ends, how its text is converted, the dtype of its
+    column, how its value is written, and the ``$`` header line.  Parsing or
+    writing a line is then a loop over those precomputed pieces.
+
+    Codecs are built by ``FormatParser.codec`` and shared by every caller with
+    the same layout; ``CardSchema.codec`` is the one for a declared card.  A
+    codec holds no per-call state, so sharing it is safe.
+
+    Attributes:
+        field_types: Field types, ``'I'``, ``'F'`` or ``'A'``.
+        field_len: Field widths.
+        spans: ``(start, end)`` character offsets of each field.
+        width: Total width of a line.
+        dtypes: Column dtype of each field.
+        converters: Per field, the function reading a non-blank field, or None
+            for a string field.
+        formatters: Per field, the function writing a value; together they are
+            the line's writer template.
+        header: The ``$`` comment header line, newline included, or None when
+            the codec was built without column labels.
+    """
+
+    def __init__(self, parser: FormatParser, field_types: List[str], field_len: List[int],
+                 long_format: bool = False, header_names: List[str] = None):
+        self.parser = parser
+        self.field_types = tuple(field_types)
+        self.field_len = tuple(field_len)
+        ends = list(itertools.accumulate(field_len))
+        self.spans = tuple(zip([0] + ends[:-1], ends))
+        self.width = ends[-1] if ends else 0
+        self.dtypes = tuple(parser._COLUMN_DTYPES.get(t, object) for t in field_types)
+        self.converters = tuple(parser._converter(t) for t in field_types)
+        self.formatters = tuple(parser._formatter(t, w, long_format)
+                                for t, w in zip(field_types, field_len))
+        self.header = (parser.format_header(list(header_names), field_len=list(field_len))
+                       if header_names is not None else None)
+        self._layout = (self.field_types, self.field_len, long_format)
+        self._long_format = long_format
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _convert(field_str: str, converter, default_value: Any) -> Any:
+        """The value of one stripped field."""
+        if not field_str:
+            return default_value
+        if field_str[0] == '&':
+            return ParameterRef(field_str[1:])
+        if converter is None:
+            return field_str
+        try:
+            return converter(field_str)
+        except ValueError:
+            return field_str
+
+    def parse_line(self, line: str, default_value: Any = 0) -> List[Any]:
+        """
+        Parse a line into one value per field.
+
+        A blank or missing field gives *default_value*, ``&VAR`` gives a
+        ``ParameterRef``, and a field that does not convert to its type is
+        kept as text.  A line containing a comma is read as comma-separated.
+        """
+        if ',' in line:
+            return self.parse_comma_line(line, default_value)
+        n = len(line)
+        convert = self._convert
+        return [convert(line[start:end].strip(), converter, default_value)
+                if start < n else default_value
+                for (start, end), converter in zip(self.spans, self.converters)]
+
+    def parse_comma_line(self, line: str, default_value: Any = 0) -> List[Any]:
+        """Parse a comma-separated line; missing trailing fields give *default_value*."""
+        values = [v.strip() for v in line.split(',')]
+        convert = self._convert
+        return [convert(values[i], converter, default_value)
+                if i < len(values) else default_value
+                for i, converter in enumerate(self.converters)]
+
+    def parse_columns(self, lines: List[str], default_value: Any = 0) -> List[np.ndarray]:
+        """
+        Parse many lines into typed columns at once.
+
+        The result is what calling ``parse_line`` on every line and casting
+        each column would give: one array per field, of the field's dtype,
+        widened to ``object`` when the column holds a ``ParameterRef``.
+        Every line yields a row.
+
+        Rather than converting field by field, the lines are copied into one
+        fixed-width character buffer, each column is sliced out of it, and the
+        slice is converted with a single numpy cast.  Lines the buffer cannot
+        represent -- comma-separated lines, &VAR references and exponents
+        written without their E -- go through ``parse_line`` and are merged
+        back in place.
+
+        Within ``parallel_rows``, a large card is parsed in chunks of lines on
+        the given executor.
+
+        Raises:
+            ValueError: A numeric column holds text that is not a number, as
+                casting the ``parse_line`` results would.
+        """
+        pool = _row_pool.get()
+        if pool is not None and len(lines) >= 2 * pool[1]:
+            return self._parse_chunks(lines, default_value, *pool)
+        return self._parse_block(lines, default_value)
+
+    def _parse_chunks(self, lines: List[str], default_value: Any,
+                      executor: Executor, chunk_rows: int) -> List[np.ndarray]:
+        """``parse_columns`` a chunk of lines at a time on *executor*.
+
+        Joining the chunk columns gives what parsing the whole card gives: a
+        column is ``object`` when any chunk of it is, and numpy converts the
+        numbers of the other chunks to Python scalars on joining, exactly as
+        ``parse_columns`` does when it widens a column -- except for the
+        blank fields of a float chunk, which would join as 0.0 rather than
+        *default_value*.  A card with a ``ParameterRef`` in some chunks of a
+        numeric column and not in others is therefore parsed whole.
+
+        So is a card with a chunk that raises ValueError: text in a numeric
+        column is an error only when no ``ParameterRef`` in another chunk
+        widens the column to object, which only the whole card tells.
+        """
+        chunks = [lines[i:i + chunk_rows] for i in range(0, len(lines), chunk_rows)]
+        try:
+            parts = list(executor.map(_parse_chunk, itertools.repeat(self._layout),
+                                      chunks, itertools.repeat(default_value)))
+        except ValueError:
+            return self._parse_block(lines, default_value)
+        for j, dtype in enumerate(self.dtypes):
+            widened = [part[j].dtype == object for part in parts]
+            if dtype != object and any(widened) and not all(widened):
+                return self._parse_block(lines, default_value)
+        return [np.concatenate([part[j] for part in parts])
+                for j in range(len(self.dtypes))]
+
+    def _parse_block(self, lines: List[str], default_value: Any) -> List[np.ndarray]:
+        """``parse_columns`` for lines parsed in this thread."""
+        if not lines:
+            return [np.array([], dtype=dtype) for dtype in self.dtypes]
+
+        # Comma-separated lines and &VAR references are left to parse_line.
+        # One scan over the whole block settles the common case, a block with
+        # neither; only otherwise is each line tested.
+        joined = '\n'.join(lines)
+        if ',' in joined or '&' in joined:
+            text_rows = [i for i, line in enumerate(lines)
+                         if ',' in line or '&' in line]
+        else:
+            text_rows = []
+
+        if len(text_rows) == len(lines):
+            bulk = None
+        elif text_rows:
+            skip = set(text_rows)
+            bulk_rows = np.array([i for i in range(len(lines)) if i not in skip])
+            bulk = self._bulk_columns([lines[i] for i in bulk_rows], default_value)
+        else:
+            bulk_rows = None
+            bulk = self._bulk_columns(lines, default_value)
+
+        if bulk is None:
+            # Nothing could be done in bulk: parse and cast line by line.
+            return self.rows_to_columns(
+                [self.parse_line(line, default_value) for line in lines])
+
+        columns, redo, blanks = bulk
+        if not text_rows and not redo.any():
+            return columns
+
+        # Parse the remaining lines one at a time and merge them back into
+        # their rows.  A column a ParameterRef widens to object keeps its
+        # values as they are, so a blank field of a bulk row has to be
+        # *default_value* there, as parse_line gives it, not the 0.0 of a
+        # float column.
+        in_bulk = np.zeros(len(lines), dtype=bool)
+        in_bulk[bulk_rows if bulk_rows is not None else slice(None)] = ~redo
+        by_line = np.flatnonzero(~in_bulk)
+        rows = [self.parse_line(lines[i], default_value) for i in by_line]
+        merged = []
+        for j, dtype in enumerate(self.dtypes):
+            col = np.empty(len(lines), dtype=object)
+            col[in_bulk] = columns[j][~redo]
+            if blanks[j] is not None:
+                col[np.flatnonzero(in_bulk)[blanks[j][~redo]]] = default_value
+            col[by_line] = [row[j] for row in rows]
+            merged.append(self._cast_column(col, dtype))
+        return merged
+
+    def _bulk_columns(
+        self,
+        lines: List[str],
+        default_value: Any
+    ) -> Optional[Tuple[List[np.ndarray], np.ndarray, List[Optional[np.ndarray]]]]:
+        """Typed columns for *lines* sliced from one character buffer.
+
+        Returns the columns, a mask of the rows they do not hold correctly:
+        rows with a number whose exponent is written without its E
+        (``"8.9-3"``), which parse_line understands and a numpy cast does not,
+        and per numeric column the mask of its blank fields (None for a
+        string column, whose blanks already hold *default_value*).
+
+        Returns None when the lines cannot be handled in bulk at all -- a
+        non-ASCII character, or a field that does not convert to its type -- so
+        that the caller falls back to ``parse_line``, which decides what such a
+        field becomes.
+        """
+        try:
+            # Lines are truncated or null-padded to the card width, and a
+            # trailing null is not part of a numpy bytes value: a field past
+            # the end of its line reads as empty, as parse_line treats it.
+            buf = np.array(lines, dtype=f'S{max(self.width, 1)}')
+        except UnicodeEncodeError:
+            return None
+        chars = buf.view('S1').reshape(len(lines), -1)
+
+        columns = []
+        blanks = []
+        redo = np.zeros(len(lines), dtype=bool)
+        for field_type, (start, end) in zip(self.field_types, self.spans):
+            col = np.ascontiguousarray(chars[:, start:end]).view(f'S{end - start}').ravel()
+            col = np.char.strip(col)
+            blank = col == b''
+            try:
+                if field_type in ('I', 'F'):
+                    if blank.any() and default_value != 0:
+                        return None
+                    blanks.append(blank)
+                    # A sign past the first character of a number with no E
+                    # in it is an exponent: "8.9-3" means 8.9E-3.
+                    signed = ((np.char.find(col, b'-', 1) > 0)
+                              | (np.char.find(col, b'+', 1) > 0))
+                    if signed.any():
+                        no_e = ((np.char.find(col, b'E') < 0)
+                                & (np.char.find(col, b'e') < 0))
+                        exponent = signed & no_e
+                        redo |= exponent
+                        blank = blank | exponent
+                    values = np.where(blank, b'0', col).astype(np.float64)
+                    if field_type == 'I':
+                        # int(float(...)), as parse_line does, so that
+                        # float-formatted integers like "4.000E+00" read too.
+                        if not (np.isfinite(values).all()
+                                and np.abs(values).max(initial=0) < 2 ** 31):
+                            return None
+                        values = values.astype(np.int32)
+                else:
+                    values = np.char.decode(col, 'ascii').astype(object)
+                    values[blank] = default_value
+                    blanks.append(None)
+            except ValueError:
+                return None
+            columns.append(values)
+        return columns, redo, blanks
+
+    def rows_to_columns(self, rows: List[List[Any]]) -> List[np.ndarray]:
+        """Cast ``parse_line`` results, one list per row, into typed columns."""
+        arr = np.array(rows, dtype=object).reshape(len(rows), len(self.dtypes))
+        return [self._cast_column(arr[:, j], dtype) for j, dtype in enumerate(self.dtypes)]
+
+    @staticmethod
+    def _cast_column(col: np.ndarray, dtype) -> np.ndarray:
+        """Cast an object column to *dtype*, unless it holds a ParameterRef."""
+        has_ref = any(isinstance(v, ParameterRef) for v in col)
+        return col.astype(object if has_ref else dtype, copy=False)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def format_row(self, values) -> str:
+        """One line for *values*, one per field, without the newline.
 
+        Each value is written as ``FormatParser.format_field`` writes it;
+        None leaves its field blank.
+        """
+        return ''.join([fmt(v) for fmt, v in zip(self.formatters, values)])
+
+    def format_rows(self, columns: List[np.ndarray]) -> List[str]:
+        """One line per row of *columns*, one column per field, newlines included.
+
+        Within ``parallel_rows``, a large card is formatted in chunks of rows
+        on the given executor.
+
+        Raises:
+            ValueError: The columns differ in length.
+        """
+        n = _rows(columns)
+        pool = _row_pool.get()
+        if pool is not None and n >= 2 * pool[1]:
+            return list(itertools.chain.from_iterable(self._format_chunks(columns, *pool)))
+        block = self._format_matrix(columns)
+        if block is None:
+            fmts = self.formatters
+            return [''.join([fmt(v) for fmt, v in zip(fmts, row)]) + '\n'
+                    for row in zip(*[_row_values(col) for col in columns])]
+        text, row_length, redo = block
+        lines = [text[i:i + row_length] for i in range(0, len(text), row_length)]
+        for i in redo:
+            lines[i] = self.format_row([col[i] for col in columns]) + '\n'
+        return lines
+
+    def format_block(self, columns: List[np.ndarray]) -> str:
+        """The lines of ``format_rows`` as one string.
+
+        Raises:
+            ValueError: The columns differ in length.
+        """
+        n = _rows(columns)
+        pool = _row_pool.get()
+        if pool is not None and n >= 2 * pool[1]:
+            return ''.join(''.join(lines) for lines in self._format_chunks(columns, *pool))
+        block = self._format_matrix(columns)
+        if block is None or len(block[2]):
+            return ''.join(self.format_rows(columns))
+        return block[0]
+
+    def _format_chunks(self, columns: List[np.ndarray], executor: Executor,
+                       chunk_rows: int) -> Iterator[List[str]]:
+        """``format_rows`` of *chunk_rows* rows at a time on *executor*, in row order.
+
+        Each row is written on its own, so the lines of the chunks are the
+        lines of the whole card.
+        """
+        n = _rows(columns)
+        chunks = [[col[i:i + chunk_rows] for col in columns] for i in range(0, n, chunk_rows)]
+        return executor.map(_format_chunk, itertools.repeat(self._layout), chunks)
+
+    def _format_matrix(self, columns: List[np.ndarray]):
+        """
+        The rows of *columns* written a column at a time, as ``format_row``
+        writes them.
+
+        Each field of every row is put into a byte matrix with one row per
+        line, right-justified in its width: numeric columns by
+        ``_field_matrix``, anything else from its values formatted one by
+        one.  The matrix is then decoded to the text of all lines at once.
+
+        Returns:
+            ``(text, line length, rows to redo)``: the rows to redo have a
+            field wider than its width, which shifts the fields after it, and
+            have to be written by ``format_row``.  None when the columns do
+            not suit the matrix: they differ in length, or a field holds
+            anything but ASCII.
+        """
+        n = len(columns[0]) if columns else 0
+        if n == 0 or any(len(col) != n for col in columns):
+            return None
+        fields = []
+        fits = np.ones(n, dtype=bool)
+        for j, col in enumerate(columns):
+            field = self._field_matrix(j, col)
+            if field is None:
+                return None
+            fields.append(field[0])
+            fits &= field[1]
+        fields.append(np.full((n, 1), ord('\n'), dtype=np.uint8))
+        matrix = np.hstack(fields)
+        return matrix.tobytes().decode('ascii'), matrix.shape[1], np.flatnonzero(~fits).tolist()
+
+    def _field_matrix(self, j: int, column) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Field *j* of every row of *column*, as an ``(n, width)`` byte matrix,
+        and which rows it fits in its width.
+
+        Floats of an ``'F'`` field and integers of an ``'I'`` field are
+        formatted a column at a time; other columns value by value.  None
+        when a value is not ASCII.
+        """
+        field_type, width = self.field_types[j], self.field_len[j]
+        kind = column.dtype.kind if isinstance(column, np.ndarray) else None
+        if field_type == 'F' and kind is not None and kind in 'iubf':
+            return self.parser._float_field_bytes(
+                column.astype(np.float64, copy=False), width, self._long_format)
+        if field_type == 'I' and kind is not None and kind in 'iub':
+            return _int_field_bytes(column.astype(np.int64, copy=False), width)
+        fmt = self.formatters[j]
+        return _text_field_bytes([fmt(v) for v in _row_values(column)], width)
+
+
+def _right_justify(chars: np.ndarray, lengths: np.ndarray,
+                   width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The first *lengths* bytes of each row of *chars*, right-justified in
+    *width* columns, and which rows fit; rows that do not are left blank."""
+    out = np.full((len(chars), width), ord(' '), dtype=np.uint8)
+    fits = lengths <= width
+    for length in np.unique(lengths[fits]).tolist():
+        if length:
+            rows = np.flatnonzero(lengths == length)
+            out[rows, width - length:] = chars[rows, :length]
+    return out, fits
+
+
+def _text_field_bytes(texts: List[str], width: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Already formatted *texts* as ``LineCodec._field_matrix`` gives them; None if not ASCII."""
+    try:
+        raw = np.array(texts, dtype=bytes)
+    except UnicodeEncodeError:
+        return None
+    chars = raw.view(np.uint8).reshape(len(raw), raw.itemsize)
+    return _right_justify(chars, np.fromiter(map(len, texts), np.int64, len(texts)), width)
+
+
+def _int_field_bytes(values: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """``f"{v:>{width}d}"`` of every value of an int64 column, as a byte matrix, digit by digit."""
+    out = np.full((len(values), width), ord(' '), dtype=np.uint8)
+    rest = np.abs(values).astype(np.uint64)     # exact for the most negative int64 too
+    digits = np.zeros(len(values), dtype=np.int64)
+    for k in range(width - 1, -1, -1):
+        more = (rest > 0) | (digits == 0)
+        out[:, k] = np.where(more, ord('0') + rest % 10, ord(' '))
+        digits += more
+        rest //= 10
+    negative = values < 0
+    fits = (rest == 0) & (digits + negative <= width)
+    signed = np.flatnonzero(negative & fits)
+    out[signed, width - 1 - digits[signed]] = ord('-')
+    return out, fits
+
+
+def _parse_chunk(layout: tuple, lines: List[str], default_value: Any) -> List[np.ndarray]:
+    """Parse one chunk of a card; run by ``LineCodec._parse_chunks``, possibly in another process."""
+    field_types, field_len, long_format = layout
+    codec = FormatParser().codec(list(field_types), list(field_len), long_format)
+    return codec._parse_block(lines, default_value)
+
+
+def _format_chunk(layout: tuple, columns: List[np.ndarray]) -> List[str]:
+    """Write one chunk of a card; run by ``LineCodec._format_chunks``, possibly in another process."""
+    field_types, field_len, long_format = layout
+    codec = FormatParser().codec(list(field_types), list(field_len), long_format)
+    return codec.format_rows(columns)
+
+
+def _rows(columns) -> int:
+    """The rows of *columns*, which must all have as many.
+
+    ``zip`` would write as many rows as the shortest column has and drop the
+    rest of the others without a word, losing elements of a card whose
+    columns were changed unevenly.
+    """
+    lengths = {len(col) for col in columns}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns of a card differ in length: {sorted(lengths)}")
+    return lengths.pop() if lengths else 0
+
+
+def _row_values(column) -> list:
+    """*column*'s values for formatting, as plain Python scalars where that is safe.
+
+    Iterating a numpy array yields numpy scalars, which are slower to format
+    than the Python int and float ``tolist`` gives.  Both are written the same
+    by every field formatter, except that ``str`` of a float32 differs from
+    ``str`` of the float64 it converts to, so only 64-bit floats and integers
+    are converted.
+    """
+    if isinstance(column, np.ndarray) and (
+            column.dtype.kind in 'iub' or column.dtype == np.float64):
+        return column.tolist()
+    return column
 
 if __name__ == '__main__':
 
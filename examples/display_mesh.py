@@ -5,110 +5,67 @@ import pyvista as pv
 from vtk import VTK_TRIANGLE, VTK_QUAD, VTK_TETRA, VTK_HEXAHEDRON, VTK_WEDGE
 
 sys.path.append('.')
-from dynakw import DynaKeywordReader, KeywordType
+from dynakw import DynaKeywordReader
 
 # Add project root to path to allow importing dynakw
 sys.path.insert(0, os.path.abspath(
     os.path.join(os.path.dirname(__file__), '..')))
 
 
+def _cells(rows: np.ndarray, vtk_type: int):
+    """VTK cells of the elements whose node rows are *rows*, one per row."""
+    n, k = rows.shape
+    cells = np.hstack((np.full((n, 1), k), rows)).ravel()
+    return cells, np.full(n, vtk_type, np.uint8)
+
+
 def create_unstructured_grid(dyna_file: DynaKeywordReader) -> pv.UnstructuredGrid:
     """
     Create a PyVista UnstructuredGrid from a DynaKeywordReader object.
     """
     # Extract nodes
-    node_keywords = dyna_file.find_keywords(KeywordType.NODE)
-    if not node_keywords:
+    nodes = dyna_file.node_table()
+    if not len(nodes):
         raise ValueError("File does not contain *NODE keyword.")
 
-    node_ids_list = []
-    points_list = []
-    for node_keyword in node_keywords:
-        node_ids_list.append(node_keyword.cards['Card 1']['NID'])
-        points_list.append(np.vstack((
-            node_keyword.cards['Card 1']['X'],
-            node_keyword.cards['Card 1']['Y'],
-            node_keyword.cards['Card 1']['Z']
-        )).T)
-
-    node_ids = np.concatenate(node_ids_list)
-    points = np.concatenate(points_list)
-
-    node_id_to_point_index = {node_id: i for i, node_id in enumerate(node_ids)}
+    points = nodes.coords
 
     cells_list = []
     cell_types_list = []
 
+    def add(rows, vtk_type):
+        if len(rows):
+            cells, cell_types = _cells(rows, vtk_type)
+            cells_list.append(cells)
+            cell_types_list.append(cell_types)
+
     # Shell elements (triangles and quads)
-    shell_keywords = dyna_file.find_keywords(KeywordType.ELEMENT_SHELL)
-    if shell_keywords:
-        for shell_keyword in shell_keywords:
-            card1 = shell_keyword.cards['Card 1']
-            n1, n2, n3 = card1['N1'], card1['N2'], card1['N3']
-            # N4 is optional for triangles
-            n4 = card1.get('N4', np.zeros_like(n1))
-
-            for i in range(len(n1)):
-                # Check for Quad (4 nodes) vs Triangle (3 nodes)
-                # A triangle can have N4=0 or N4=N3
-                if n4[i] > 0 and n4[i] != n3[i]:
-                    points_indices = [
-                        node_id_to_point_index[n1[i]
-                                               ], node_id_to_point_index[n2[i]],
-                        node_id_to_point_index[n3[i]
-                                               ], node_id_to_point_index[n4[i]]
-                    ]
-                    cells_list.extend([4] + points_indices)
-                    cell_types_list.append(VTK_QUAD)
-                else:
-                    points_indices = [
-                        node_id_to_point_index[n1[i]
-                                               ], node_id_to_point_index[n2[i]],
-                        node_id_to_point_index[n3[i]]
-                    ]
-                    cells_list.extend([3] + points_indices)
-                    cell_types_list.append(VTK_TRIANGLE)
+    shells = dyna_file.element_table("shell")
+    if len(shells):
+        n = shells.connectivity
+        rows = shells.node_rows(nodes)
+        # A triangle can have N4=0 or N4=N3
+        quad = (n[:, 3] > 0) & (n[:, 3] != n[:, 2])
+        add(rows[quad, :4], VTK_QUAD)
+        add(rows[~quad, :3], VTK_TRIANGLE)
 
     # Solid elements (tets, hexas, wedges)
-    solid_keywords = dyna_file.find_keywords(KeywordType.ELEMENT_SOLID)
-    if solid_keywords:
-        for solid_keyword in solid_keywords:
-            card1 = solid_keyword.cards['Card 1']
-            num_elements = len(card1['N1'])
-
-            def get_node_col(name):
-                return card1.get(name, np.zeros(num_elements, dtype=int))
-
-            n1, n2, n3, n4 = card1['N1'], card1['N2'], card1['N3'], card1['N4']
-            n5, n6, n7, n8 = get_node_col('N5'), get_node_col(
-                'N6'), get_node_col('N7'), get_node_col('N8')
-
-            for i in range(num_elements):
-                # Check for Hexahedron (8 nodes)
-                if n8[i] > 0:
-                    points_indices = [node_id_to_point_index[nid] for nid in [
-                        n1[i], n2[i], n3[i], n4[i], n5[i], n6[i], n7[i], n8[i]]]
-                    cells_list.extend([8] + points_indices)
-                    cell_types_list.append(VTK_HEXAHEDRON)
-                # Check for Wedge (6 nodes)
-                elif n6[i] > 0:
-                    points_indices = [node_id_to_point_index[nid] for nid in [
-                        n1[i], n2[i], n3[i], n4[i], n5[i], n6[i]]]
-                    cells_list.extend([6] + points_indices)
-                    cell_types_list.append(VTK_WEDGE)
-                # Check for Tetrahedron (4 nodes)
-                else:
-                    points_indices = [node_id_to_point_index[nid]
-                                      for nid in [n1[i], n2[i], n3[i], n4[i]]]
-                    cells_list.extend([4] + points_indices)
-                    cell_types_list.append(VTK_TETRA)
+    solids = dyna_file.element_table("solid")
+    if len(solids):
+        n = solids.connectivity
+        rows = solids.node_rows(nodes)
+        hexa = n[:, 7] > 0
+        wedge = ~hexa & (n[:, 5] > 0)
+        add(rows[hexa, :8], VTK_HEXAHEDRON)
+        add(rows[wedge, :6], VTK_WEDGE)
+        add(rows[~hexa & ~wedge, :4], VTK_TETRA)
 
     if not cells_list:
         raise ValueError(
             "No supported element types (*ELEMENT_SHELL, *ELEMENT_SOLID) found or parsed in the file.")
 
-    cells = np.array(cells_list)
-    cell_types = np.array(cell_types_list, np.uint8)
+    cells = np.concatenate(cells_list)
+    cell_types = np.concatenate(cell_types_list)
 
     grid = pv.UnstructuredGrid(cells, cell_types, points)
     return grid
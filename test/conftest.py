@@ -0,0 +1,20 @@
+"""Helpers shared by the test modules.
+
+pytest puts this directory on ``sys.path``, so the test modules import these
+with ``from conftest import ...``.
+"""
+
+import io
+
+
+def node_line(i, x=0.5):
+    """A ``*NODE`` data line for node *i* at ``(x, 0, 0)``."""
+    return f"{i:8d}{x:16.6f}{0.0:16.6f}{0.0:16.6f}{0:8d}{0:8d}"
+
+
+def source_text(keywords):
+    """*keywords* written as they were read, one after the other."""
+    out = io.StringIO()
+    for kw in keywords:
+        kw.write_source(out)
+    return out.getvalue()
@@ -0,0 +1,161 @@
+"""Reading and writing from an event loop.
+
+``aiter_keywords`` and ``awrite`` do the reading, parsing and writing in an
+executor, so that the event loop stays free, and read only a batch ahead of
+the consumer.
+
+Covers:
+- The same keywords as ``keywords()``, kept or not
+- The event loop keeps running while a deck is parsed
+- Back-pressure: a slow consumer holds the reading up
+- Stopping early, errors, several decks at once
+- ``awrite`` writes what ``write`` writes
+"""
+
+import asyncio
+import glob
+import time
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core import keyword_file
+from conftest import node_line, source_text
+
+
+async def _collect(dkr, **kwargs):
+    return [kw async for kw in dkr.aiter_keywords(**kwargs)]
+
+
+@pytest.fixture
+def plain():
+    return sorted(glob.glob("test/full_files/*.k"))[0]
+
+
+@pytest.fixture
+def many(tmp_path, monkeypatch):
+    """A deck of 50 *NODE blocks, read 4 keywords at a time."""
+    monkeypatch.setattr(keyword_file, "ASYNC_BATCH", 4)
+    path = tmp_path / "many.k"
+    path.write_text("".join(f"*NODE\n{node_line(i)}\n" for i in range(1, 51)))
+    return str(path)
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Counts the blocks parsed, each taking a little while."""
+    count = [0]
+    original = keyword_file.DynaKeywordReader._parse_keyword_block
+    def slow(self, block, only=None):
+        time.sleep(0.002)
+        count[0] += 1
+        return original(self, block, only)
+    monkeypatch.setattr(keyword_file.DynaKeywordReader, "_parse_keyword_block", slow)
+    return count
+
+
+# ---------------------------------------------------------------------------
+# The keywords
+# ---------------------------------------------------------------------------
+
+class TestKeywords:
+
+    def test_same_as_keywords(self, plain):
+        dkr = DynaKeywordReader(plain)
+        keywords = asyncio.run(_collect(dkr))
+        assert source_text(keywords) == source_text(DynaKeywordReader(plain).keywords())
+        assert list(dkr.keywords()) == keywords
+
+    def test_not_retained(self, many):
+        dkr = DynaKeywordReader(many)
+        keywords = asyncio.run(_collect(dkr, retain=False))
+        assert len(keywords) == 50
+        assert dkr._keywords == []
+
+    def test_missing_file(self, tmp_path, caplog):
+        assert asyncio.run(_collect(DynaKeywordReader(str(tmp_path / "none.k")))) == []
+        assert "File not found" in caplog.text
+
+
+# ---------------------------------------------------------------------------
+# The event loop
+# ---------------------------------------------------------------------------
+
+class TestLoop:
+
+    def test_loop_not_blocked(self, many, parsed):
+        async def main():
+            ticks = 0
+            done = asyncio.Event()
+            async def tick():
+                nonlocal ticks
+                while not done.is_set():
+                    ticks += 1
+                    await asyncio.sleep(0)
+            ticker = asyncio.create_task(tick())
+            keywords = await _collect(DynaKeywordReader(many))
+            done.set()
+            await ticker
+            return keywords, ticks
+        keywords, ticks = asyncio.run(main())
+        assert len(keywords) == 50
+        assert ticks > 10
+
+    def test_back_pressure(self, many, parsed):
+        async def main():
+            seen = []
+            async for kw in DynaKeywordReader(many).aiter_keywords():
+                seen.append(parsed[0] - len(seen))
+                await asyncio.sleep(0.001)
+            return seen
+        ahead = asyncio.run(main())
+        assert max(ahead) <= 2 * keyword_file.ASYNC_BATCH
+
+    def test_stop_early(self, many, parsed):
+        async def main():
+            agen = DynaKeywordReader(many).aiter_keywords()
+            async for kw in agen:
+                break
+            await agen.aclose()
+        asyncio.run(main())
+        assert parsed[0] <= 2 * keyword_file.ASYNC_BATCH
+
+    def test_error(self, many, monkeypatch):
+        def fail(*args):
+            raise RuntimeError("disk gone")
+        monkeypatch.setattr(keyword_file.DynaKeywordReader, "_keyword_from_block", fail)
+        with pytest.raises(RuntimeError, match="disk gone"):
+            asyncio.run(_collect(DynaKeywordReader(many)))
+
+    def test_several_decks(self, many, plain):
+        async def main():
+            return await asyncio.gather(*(_collect(DynaKeywordReader(p))
+                                          for p in [many, plain, many]))
+        a, b, c = asyncio.run(main())
+        assert len(a) == len(c) == 50
+        assert source_text(b) == source_text(DynaKeywordReader(plain).keywords())
+
+
+# ---------------------------------------------------------------------------
+# awrite
+# ---------------------------------------------------------------------------
+
+class TestWrite:
+
+    def test_same_as_write(self, plain, tmp_path):
+        a, b = str(tmp_path / "a.k"), str(tmp_path / "b.k")
+        DynaKeywordReader(plain).write(a)
+        asyncio.run(DynaKeywordReader(plain).awrite(b))
+        assert open(a).read() == open(b).read()
+
+    def test_after_reading(self, many, tmp_path):
+        dkr = DynaKeywordReader(many)
+        async def main():
+            async for kw in dkr.aiter_keywords():
+                if kw.type == KeywordType.NODE:
+                    kw.cards['Card 1']['X'][0] = 2.0
+            await dkr.awrite(str(tmp_path / "out.k"))
+        asyncio.run(main())
+        nodes = DynaKeywordReader(str(tmp_path / "out.k")).find_keywords(KeywordType.NODE)
+        assert {kw.cards['Card 1']['X'][0] for kw in nodes} == {2.0}
@@ -0,0 +1,157 @@
+"""Block table of contents.
+
+``DynaKeywordReader.index()`` lists every keyword block of a deck from one scan
+that parses no cards.  ``find_keywords``, ``keyword_at`` and
+``keyword_at_line`` use it to read only the blocks asked for.
+
+Covers:
+- The index agrees with sequential reading: same blocks, types, line numbers
+- Byte and line offsets locate each block in the file
+- ``find_keywords`` reads only the blocks of the requested type
+- A keyword read through the index is the one later iterated and written
+- Lookup by ordinal and by line number, ``_start_line`` filled in
+- Blocks of followed include files
+"""
+
+import glob
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core.block_index import scan_blocks
+from dynakw.keywords.NODE import Node
+
+
+DECK = """\
+$ a leading comment
+*KEYWORD
+*NODE
+$#   nid               x               y               z      tc      rc
+       1             0.0             0.0             0.0       0       0
+       2             1.0             0.0             0.0       0       0
+*MAT_ELASTIC
+         1    7.85-9  210000.0       0.3       0.0       0.0         0
+*NODE
+       3             2.0             0.0             0.0       0       0
+*END
+"""
+
+
+@pytest.fixture
+def deck(tmp_path):
+    path = tmp_path / "deck.k"
+    path.write_text(DECK)
+    return str(path)
+
+
+# ---------------------------------------------------------------------------
+# The index
+# ---------------------------------------------------------------------------
+
+class TestIndex:
+
+    def test_blocks(self, deck):
+        blocks = DynaKeywordReader(deck).index()
+        assert [b.keyword_line for b in blocks] == [
+            "*KEYWORD", "*NODE", "*MAT_ELASTIC", "*NODE", "*END"]
+        assert [b.start_line for b in blocks] == [2, 3, 7, 9, 11]
+        assert [b.line_count for b in blocks] == [1, 4, 2, 2, 1]
+        assert blocks[1].keyword_class is Node
+        assert blocks[1].type == KeywordType.NODE
+        assert blocks[0].type == KeywordType.UNKNOWN
+
+    def test_byte_offsets(self, deck):
+        data = open(deck, 'rb').read()
+        for b in scan_blocks(deck):
+            text = data[b.byte_offset:b.byte_offset + b.byte_length].decode()
+            assert text.startswith(b.keyword_line)
+            assert text.count("\n") == b.line_count
+
+    @pytest.mark.parametrize("path", sorted(glob.glob("test/full_files/*.k")))
+    def test_agrees_with_reading(self, path):
+        dkr = DynaKeywordReader(path)
+        blocks = dkr.index()
+        keywords = list(dkr.keywords())
+        assert len(blocks) == len(keywords)
+        for b, kw in zip(blocks, keywords):
+            assert kw._start_line == b.start_line
+            if kw.type != KeywordType.UNKNOWN:
+                assert (b.keyword_line, b.type) == (kw.full_keyword, kw.type)
+
+    def test_missing_file(self, tmp_path):
+        assert scan_blocks(str(tmp_path / "missing.k")) == []
+
+
+# ---------------------------------------------------------------------------
+# Random access
+# ---------------------------------------------------------------------------
+
+class TestRandomAccess:
+
+    def test_find_keywords_reads_only_those_blocks(self, deck):
+        dkr = DynaKeywordReader(deck)
+        nodes = dkr.find_keywords(KeywordType.NODE)
+        assert [list(n.cards['Card 1']['NID']) for n in nodes] == [[1, 2], [3]]
+        assert dkr._keywords == [] and sorted(dkr._fetched) == [1, 3]
+
+    def test_same_object_when_iterated(self, deck):
+        dkr = DynaKeywordReader(deck)
+        node = dkr.find_keywords(KeywordType.NODE)[1]
+        assert dkr.keyword_at(3) is node
+        assert list(dkr.keywords())[3] is node
+
+    def test_edit_survives_write(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck)
+        dkr.find_keywords(KeywordType.NODE)[1].cards['Card 1']['X'][0] = 5.0
+        out = str(tmp_path / "out.k")
+        dkr.write(out)
+        again = DynaKeywordReader(out).find_keywords(KeywordType.NODE)
+        assert again[1].cards['Card 1']['X'][0] == 5.0
+
+    def test_keyword_at(self, deck):
+        dkr = DynaKeywordReader(deck)
+        assert dkr.keyword_at(2).full_keyword == "*MAT_ELASTIC"
+        with pytest.raises(IndexError):
+            dkr.keyword_at(5)
+
+    def test_keyword_at_line(self, deck):
+        dkr = DynaKeywordReader(deck)
+        assert dkr.keyword_at_line(5) is dkr.keyword_at(1)
+        assert dkr.keyword_at_line(9).cards['Card 1']['NID'][0] == 3
+        assert dkr.keyword_at_line(1) is None
+
+    def test_start_line(self, deck):
+        dkr = DynaKeywordReader(deck)
+        assert dkr.keyword_at(3)._start_line == 9
+        assert [kw._start_line for kw in DynaKeywordReader(deck).keywords()] == [2, 3, 7, 9, 11]
+
+
+# ---------------------------------------------------------------------------
+# Include files
+# ---------------------------------------------------------------------------
+
+class TestInclude:
+
+    @pytest.fixture
+    def master(self, tmp_path):
+        (tmp_path / "mesh.k").write_text(
+            "*NODE\n       1             0.0             0.0             0.0\n")
+        path = tmp_path / "master.k"
+        path.write_text("*KEYWORD\n*INCLUDE mesh.k\n*END\n")
+        return str(path)
+
+    def test_include_blocks(self, master, tmp_path):
+        blocks = DynaKeywordReader(master, follow_include=True).index()
+        assert [b.keyword_line for b in blocks] == ["*KEYWORD", "*NODE", "*END"]
+        assert blocks[1].path.endswith("mesh.k") and blocks[1].start_line == 1
+
+    def test_not_followed(self, master):
+        blocks = DynaKeywordReader(master).index()
+        assert [b.keyword_line for b in blocks] == ["*KEYWORD", "*INCLUDE MESH.K", "*END"]
+
+    def test_line_in_include(self, master, tmp_path):
+        dkr = DynaKeywordReader(master, follow_include=True)
+        node = dkr.keyword_at_line(2, path=str(tmp_path / "mesh.k"))
+        assert node.type == KeywordType.NODE and node._start_line == 1
+        assert [kw._start_line for kw in dkr.keywords()] == [1, 1, 3]
@@ -0,0 +1,131 @@
+"""Splitting a file into blocks from read buffers.
+
+``read_blocks`` and ``buffered_blocks`` find keyword blocks by searching
+large buffers read from the file, and ``scan_blocks`` builds the index the
+same way.  They have to find the blocks ``map_blocks`` finds, wherever the
+buffer boundaries fall.  ``block_lines`` decodes a block and drops its
+comment lines in one go.
+
+Covers:
+- Agreement with ``map_blocks`` for every buffer size on crafted decks, and on
+  the full files
+- Reading without a memory map agrees with reading through the include tree
+- Index entries point at the bytes of their block
+- ``block_lines`` with and without comments
+"""
+
+import glob
+import io
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader
+from dynakw.core import block_index
+from dynakw.core.block_index import buffered_blocks, map_blocks, read_blocks, scan_blocks
+from dynakw.utils.block_text import block_lines
+
+
+NODE = b"       1             0.0             0.0             0.0       0       0"
+
+DECKS = {
+    "plain": b"*KEYWORD\n*NODE\n" + NODE + b"\n*END\n",
+    "first_line": b"*NODE\n" + NODE,
+    "leading_text": b"title\n$ comment\n\n*NODE\n" + NODE + b"\n*NODE\n*NODE\n",
+    "crlf": b"*KEYWORD\r\n*NODE\r\n$ c\r\n" + NODE + b"\r\n*END\r\n",
+    "star_inside_line": b"*TITLE\na *b\n *c\n*END",
+    "no_keywords": b"text\nmore text\n",
+    "newline_only": b"\n",
+    "empty": b"",
+}
+
+
+def _write(tmp_path, data):
+    path = tmp_path / "deck.k"
+    path.write_bytes(data)
+    return str(path)
+
+
+def _mapped(path):
+    return list(map_blocks(path))
+
+
+# ---------------------------------------------------------------------------
+# Agreement with map_blocks
+# ---------------------------------------------------------------------------
+
+class TestBuffered:
+
+    @pytest.mark.parametrize("name", sorted(DECKS))
+    def test_every_buffer_size(self, tmp_path, name):
+        path = _write(tmp_path, DECKS[name])
+        expected = _mapped(path)
+        for size in range(1, len(DECKS[name]) + 2):
+            assert list(buffered_blocks(io.BytesIO(DECKS[name]), size)) == expected, size
+
+    @pytest.mark.parametrize("path", sorted(glob.glob("test/full_files/*.k")))
+    def test_full_files(self, path):
+        expected = _mapped(path)
+        assert list(read_blocks(path)) == expected
+        assert list(read_blocks(path, buffer_size=100)) == expected
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            read_blocks(str(tmp_path / "missing.k"))
+
+
+class TestReader:
+
+    @pytest.mark.parametrize("path", sorted(glob.glob("test/full_files/*.k")))
+    def test_same_as_tree(self, path):
+        def read(**kwargs):
+            out = io.StringIO()
+            keywords = list(DynaKeywordReader(path, **kwargs).keywords())
+            for kw in keywords:
+                kw.write_source(out)
+            return out.getvalue(), [kw._start_line for kw in keywords]
+
+        tree = read(follow_include=True) if "INCLUDE" not in open(path).read() else None
+        buffered = read(memory_map=False)
+        assert buffered == read()
+        if tree is not None:
+            assert buffered == tree
+
+
+# ---------------------------------------------------------------------------
+# scan_blocks
+# ---------------------------------------------------------------------------
+
+class TestScan:
+
+    @pytest.mark.parametrize("name", sorted(DECKS))
+    def test_offsets(self, tmp_path, monkeypatch, name):
+        monkeypatch.setattr(block_index, "BUFFER_SIZE", 3)
+        path = _write(tmp_path, DECKS[name])
+        blocks = scan_blocks(path)
+        assert len(blocks) == len(_mapped(path))
+        for block, (data, line_offset) in zip(blocks, _mapped(path)):
+            assert DECKS[name][block.byte_offset:block.byte_offset + block.byte_length] == data
+            assert block.line_offset == line_offset
+            assert block.line_count == len(data.splitlines())
+
+
+# ---------------------------------------------------------------------------
+# block_lines
+# ---------------------------------------------------------------------------
+
+class TestBlockLines:
+
+    def test_without_comments(self):
+        lines, data = block_lines(b"*NODE\n" + NODE + b"\n")
+        assert lines == ["*NODE", NODE.decode()]
+        assert data is lines
+
+    def test_with_comments(self):
+        lines, data = block_lines(b"*NODE\n  $ indented\n$x\n" + NODE + b" $ trailing\n")
+        assert len(lines) == 4
+        assert data == ["*NODE", NODE.decode() + " $ trailing"]
+
+    def test_lines(self):
+        lines, data = block_lines(["*NODE", "$ c", "1"])
+        assert data == ["*NODE", "1"]
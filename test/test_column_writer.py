@@ -0,0 +1,184 @@
+"""Writing repeating cards a column at a time.
+
+``LineCodec.format_rows`` and ``format_block`` format whole columns at once
+into a byte matrix, and fall back to ``format_field`` for the values that
+need it.  The text has to be exactly what writing each field with
+``format_field`` gives.
+
+Covers:
+- Floats: ordinary, small, large, negative zero, inf and nan, every width
+- Integers: signs, zero, values wider than their field, the int64 extremes
+- Strings, float32, bool and integer columns in float fields
+- Object columns with None and ``ParameterRef``, non-ASCII text
+- Columns of different lengths, which are an error
+- Keywords written through ``_write_card`` and grouped cards; nan curves
+"""
+
+import glob
+import io
+import os
+import numpy as np
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core.parameter_ref import ParameterRef
+from dynakw.keywords.NODE import Node
+from dynakw.utils.format_parser import FormatParser
+
+
+@pytest.fixture
+def fp():
+    return FormatParser()
+
+
+def _expected(fp, codec, columns, long_format=False):
+    """Each row written field by field with ``format_field``."""
+    lines = []
+    for row in zip(*columns):
+        lines.append(''.join(
+            fp.format_field(None if v is None else v, t, long_format=long_format, field_len=w)
+            for v, t, w in zip(row, codec.field_types, codec.field_len)) + '\n')
+    return lines
+
+
+def _check(fp, types, widths, columns, long_format=False):
+    codec = fp.codec(types, widths, long_format)
+    expected = _expected(fp, codec, columns, long_format)
+    assert codec.format_rows(columns) == expected
+    assert codec.format_block(columns) == ''.join(expected)
+
+
+FLOATS = np.array([
+    0.0, -0.0, 1.0, -1.0, 0.5, 7.13, 7.13000011, 123.456, -123.456, 2.1e11, -2.1e11,
+    7.85e-9, -7.85e-9, 1e-300, 5e-324, 1e300, 99999.99995, 9999999999.0, -99999999.0,
+    0.00005, -0.00015, 1.0 / 3.0, np.pi * 1e5, np.inf, -np.inf, np.nan,
+])
+
+
+# ---------------------------------------------------------------------------
+# Agreement with format_field
+# ---------------------------------------------------------------------------
+
+class TestFloats:
+
+    @pytest.mark.parametrize("width", [1, 5, 8, 10, 16, 20])
+    @pytest.mark.parametrize("long_format", [False, True])
+    def test_edge_values(self, fp, width, long_format):
+        _check(fp, ["F"], [width], [FLOATS], long_format)
+
+    @pytest.mark.parametrize("width", [10, 16, 20])
+    def test_random(self, fp, width):
+        rng = np.random.default_rng(width)
+        values = np.concatenate([
+            rng.uniform(-1e3, 1e3, 2000),
+            np.round(rng.uniform(-1e3, 1e3, 2000), 3),
+            rng.standard_normal(2000) * 10.0 ** rng.integers(-30, 30, 2000),
+        ])
+        _check(fp, ["F", "F"], [width, 10], [values, values[::-1]])
+
+    def test_float32(self, fp):
+        _check(fp, ["F"], [16], [FLOATS[np.abs(FLOATS) < 1e30].astype(np.float32)])
+
+    @pytest.mark.parametrize("width", [10, 18, 20])
+    def test_only_inf_and_nan(self, fp, width):
+        _check(fp, ["F", "F"], [width, width], [np.array([np.nan, np.inf, -np.inf]),
+                                                np.array([np.nan] * 3)], long_format=True)
+
+    def test_integers_in_float_field(self, fp):
+        _check(fp, ["F"], [10], [np.array([0, 1, -7, 10**12])])
+
+
+class TestIntegers:
+
+    @pytest.mark.parametrize("width", [1, 3, 8, 10, 20])
+    def test_values(self, fp, width):
+        info = np.iinfo(np.int64)
+        values = np.array([0, 1, -1, 9, 10, -10, 12345678, -1234567, 123456789,
+                           info.max, info.min, info.min + 1])
+        _check(fp, ["I"], [width], [values])
+
+    def test_int32_and_bool(self, fp):
+        _check(fp, ["I", "I"], [8, 8], [np.arange(-5, 5, dtype=np.int32),
+                                        np.arange(10) % 2 == 0])
+
+
+class TestOther:
+
+    def test_strings(self, fp):
+        _check(fp, ["A", "I"], [10, 8], [np.array(["a", "", "0123456789", "longer than ten"]),
+                                         np.arange(4)])
+
+    def test_objects(self, fp):
+        _check(fp, ["I", "F", "A"], [8, 16, 10], [
+            np.array([1, None, ParameterRef("&N")], dtype=object),
+            np.array([None, 1.5, ParameterRef("-&T")], dtype=object),
+            np.array([None, "x", 3], dtype=object)])
+
+    def test_non_ascii(self, fp):
+        _check(fp, ["A", "F"], [10, 10], [np.array(["stahl", "größe"]), np.array([1.0, 2.0])])
+
+    def test_uneven_columns(self, fp):
+        codec = fp.codec(["I", "I"], [8, 8])
+        with pytest.raises(ValueError, match="differ in length"):
+            codec.format_rows([np.arange(3), np.arange(2)])
+        with pytest.raises(ValueError, match="differ in length"):
+            codec.format_block([np.arange(2), np.arange(3)])
+
+    def test_empty(self, fp):
+        codec = fp.codec(["I", "F"], [8, 16])
+        assert codec.format_rows([np.array([], dtype=int), np.array([])]) == []
+        assert codec.format_block([np.array([], dtype=int), np.array([])]) == ""
+
+
+# ---------------------------------------------------------------------------
+# Keywords
+# ---------------------------------------------------------------------------
+
+class TestKeywords:
+
+    def test_node(self):
+        node = Node("*NODE", ["*NODE",
+                              "       1             0.0             0.0             0.0       0       0"])
+        card = node.cards['Card 1']
+        rng = np.random.default_rng(0)
+        card['NID'] = np.arange(1, 1001)
+        for name in ('X', 'Y', 'Z'):
+            card[name] = rng.standard_normal(1000) * 10.0 ** rng.integers(-12, 12, 1000)
+        card['TC'] = np.zeros(1000, dtype=int)
+        card['RC'] = np.zeros(1000, dtype=int)
+        out = io.StringIO()
+        node.write(out)
+        codec = Node.card_schemas[0].codec
+        columns = [card[f.name] for f in Node.card_schemas[0].fields]
+        assert out.getvalue().split('\n', 1)[1].endswith(
+            ''.join(_expected(FormatParser(), codec, columns)))
+
+    def test_full_files(self, tmp_path, monkeypatch):
+        from dynakw.utils.format_parser import LineCodec
+        paths = sorted(glob.glob("test/full_files/*.k"))
+        for path in paths:
+            DynaKeywordReader(path).write(str(tmp_path / (os.path.basename(path) + ".new")))
+        monkeypatch.setattr(LineCodec, "_format_matrix", lambda self, columns: None)
+        for path in paths:
+            out = tmp_path / os.path.basename(path)
+            DynaKeywordReader(path).write(str(out))
+            assert (tmp_path / (out.name + ".new")).read_text() == out.read_text()
+
+    def test_nan_curve(self, tmp_path):
+        dkr = DynaKeywordReader(b"*DEFINE_CURVE\n       1\n"
+                                b"                 0.0                 nan\n"
+                                b"                 1.0                 nan\n")
+        dkr.write(str(tmp_path / "out.k"), reformat=True)
+        read = DynaKeywordReader(str(tmp_path / "out.k"))
+        card = read.find_keywords(KeywordType.DEFINE_CURVE)[0].cards['Card 2']
+        assert card['A1'].tolist() == [0.0, 1.0] and np.isnan(card['O1']).all()
+
+    def test_uneven_card(self, tmp_path, caplog):
+        node = DynaKeywordReader(b"*NODE\n" + b"".join(
+            f"{i:8d}{0.0:16.1f}{0.0:16.1f}{0.0:16.1f}\n".encode() for i in (1, 2)))
+        card = node.find_keywords(KeywordType.NODE)[0].cards['Card 1']
+        card['X'] = card['X'][:1]
+        node.write(str(tmp_path / "out.k"))
+        assert "differ in length" in caplog.text
@@ -0,0 +1,160 @@
+"""Reading and writing compressed keyword files.
+
+A deck or include file compressed with gzip, bzip2 or xz is read without an
+uncompressed copy, recognised by its extension or its first bytes, and
+``write`` compresses when the file name asks for it.
+
+Covers:
+- Each format, by extension and by content, reads as the plain file does
+- Compressed include files, lazy reading, ``index`` and ``keyword_at``
+- ``write`` to compressed files, and reading back
+- The inflating thread: reads of any size, errors, closing early
+"""
+
+import bz2
+import glob
+import gzip
+import lzma
+import pytest
+import sys
+import zlib
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core import compression
+from dynakw.core.compression import compression_of, open_deck
+from conftest import node_line, source_text
+
+
+FORMATS = {".gz": gzip, ".bz2": bz2, ".xz": lzma}
+
+
+def _compress(tmp_path, name, text, module):
+    path = tmp_path / name
+    path.write_bytes(module.compress(text.encode()))
+    return str(path)
+
+
+@pytest.fixture
+def plain():
+    return sorted(glob.glob("test/full_files/*.k"))[0]
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class TestRead:
+
+    @pytest.mark.parametrize("ext", sorted(FORMATS))
+    def test_by_extension(self, tmp_path, plain, ext):
+        path = _compress(tmp_path, "deck.k" + ext, open(plain).read(), FORMATS[ext])
+        expected = list(DynaKeywordReader(plain).keywords())
+        keywords = list(DynaKeywordReader(path).keywords())
+        assert source_text(keywords) == source_text(expected)
+        assert [kw._start_line for kw in keywords] == [kw._start_line for kw in expected]
+
+    @pytest.mark.parametrize("ext", sorted(FORMATS))
+    def test_by_content(self, tmp_path, plain, ext):
+        path = _compress(tmp_path, "deck.k", open(plain).read(), FORMATS[ext])
+        assert compression_of(path) is FORMATS[ext]
+        expected = source_text(DynaKeywordReader(plain).keywords())
+        assert source_text(DynaKeywordReader(path, memory_map=False).keywords()) == expected
+        assert source_text(DynaKeywordReader(path).keywords()) == expected
+
+    def test_plain_file(self, plain):
+        assert compression_of(plain) is None
+        assert compression_of("missing.k") is None
+
+    def test_lazy(self, tmp_path, plain):
+        path = _compress(tmp_path, "deck.k.gz", open(plain).read(), gzip)
+        keywords = list(DynaKeywordReader(path, lazy=True).keywords())
+        assert source_text(keywords) == source_text(DynaKeywordReader(plain, lazy=True).keywords())
+
+    def test_index_and_keyword_at(self, tmp_path):
+        text = f"*KEYWORD\n*NODE\n{node_line(1)}\n*NODE\n{node_line(2)}\n*END\n"
+        path = _compress(tmp_path, "deck.k.xz", text, lzma)
+        dkr = DynaKeywordReader(path)
+        assert [b.keyword_line for b in dkr.index()] == ["*KEYWORD", "*NODE", "*NODE", "*END"]
+        assert dkr.keyword_at(2).cards['Card 1']['NID'][0] == 2
+
+    def test_include(self, tmp_path):
+        _compress(tmp_path, "mesh.k.gz", f"*NODE\n{node_line(5)}\n", gzip)
+        _compress(tmp_path, "parts.inc", f"*NODE\n{node_line(6)}\n", bz2)
+        master = tmp_path / "master.k"
+        master.write_text("*KEYWORD\n*INCLUDE\nmesh.k.gz\n*INCLUDE\nparts.inc\n*END\n")
+        keywords = list(DynaKeywordReader(str(master), follow_include=True).keywords())
+        nodes = [kw for kw in keywords if kw.type == KeywordType.NODE]
+        assert [kw.cards['Card 1']['NID'][0] for kw in nodes] == [5, 6]
+        assert nodes[0].source_file == str(tmp_path / "mesh.k.gz")
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+class TestWrite:
+
+    @pytest.mark.parametrize("ext", sorted(FORMATS))
+    def test_round_trip(self, tmp_path, plain, ext):
+        out = str(tmp_path / ("out.k" + ext))
+        DynaKeywordReader(plain).write(out)
+        plain_out = str(tmp_path / "out.k")
+        DynaKeywordReader(plain).write(plain_out)
+        with FORMATS[ext].open(out, 'rt', encoding='utf-8') as f:
+            assert f.read() == open(plain_out, encoding='utf-8').read()
+        assert source_text(DynaKeywordReader(out).keywords()) == source_text(DynaKeywordReader(plain_out).keywords())
+
+
+# ---------------------------------------------------------------------------
+# The inflating thread
+# ---------------------------------------------------------------------------
+
+class TestInflater:
+
+    @pytest.fixture
+    def data(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(compression, "BUFFER_SIZE", 7)
+        raw = bytes(range(256)) * 10
+        path = tmp_path / "data.gz"
+        path.write_bytes(gzip.compress(raw))
+        return str(path), raw
+
+    @pytest.mark.parametrize("size", [1, 5, 7, 100, 10000])
+    def test_read_sizes(self, data, size):
+        path, raw = data
+        parts = []
+        with open_deck(path) as f:
+            while True:
+                chunk = f.read(size)
+                if not chunk:
+                    break
+                assert len(chunk) <= size
+                parts.append(chunk)
+        assert b''.join(parts) == raw
+
+    def test_read_all(self, data):
+        path, raw = data
+        with open_deck(path) as f:
+            assert f.read(3) == raw[:3]
+            assert f.read() == raw[3:]
+            assert f.read() == b''
+
+    def test_close_early(self, data):
+        f = open_deck(data[0])
+        f.read(1)
+        f.close()
+        assert not f._thread.is_alive()
+
+    def test_corrupt(self, tmp_path):
+        path = tmp_path / "bad.gz"
+        path.write_bytes(gzip.compress(b"*NODE\n" * 100)[:-12] + b"garbage!")
+        with open_deck(str(path)) as f:
+            with pytest.raises((OSError, EOFError, zlib.error)):
+                f.read()
+
+    def test_not_in_background(self, data):
+        path, raw = data
+        with open_deck(path, background=False) as f:
+            f.seek(300)
+            assert f.read(4) == raw[300:304]
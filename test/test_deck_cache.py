@@ -0,0 +1,154 @@
+"""Sidecar cache of parsed decks.
+
+``DynaKeywordReader(..., cache=True)`` writes the parsed keywords beside the
+deck and loads them from there the next time, as long as neither the deck nor
+its include files have changed.
+
+Covers:
+- A first read writes the cache, a second read loads it without parsing
+- Changes to the deck are detected by size/time and by content hash
+- Changes to an include file, the reader options or the library version
+- A corrupt cache is ignored
+- The cache holds keywords as read, not as later edited
+"""
+
+import os
+import pytest
+import sys
+sys.path.append('.')
+
+import dynakw
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core import deck_cache
+
+
+DECK = """\
+*KEYWORD
+*NODE
+       1             0.0             0.0             0.0       0       0
+       2             1.0             0.0             0.0       0       0
+*END
+"""
+
+
+@pytest.fixture
+def deck(tmp_path):
+    path = tmp_path / "deck.k"
+    path.write_text(DECK)
+    return str(path)
+
+
+def _read(path, **kwargs):
+    dkr = DynaKeywordReader(path, cache=True, **kwargs)
+    return dkr, list(dkr.keywords())
+
+
+def _node_ids(keywords):
+    return [list(kw.cards['Card 1']['NID']) for kw in keywords
+            if kw.type == KeywordType.NODE]
+
+
+def _rewrite_keeping_stat(path, text):
+    """Change the content but keep the size and modification time."""
+    st = os.stat(path)
+    with open(path, "w") as f:
+        f.write(text)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+# ---------------------------------------------------------------------------
+# Hits and misses
+# ---------------------------------------------------------------------------
+
+class TestHit:
+
+    def test_first_read_writes_cache(self, deck):
+        _read(deck)
+        assert os.path.exists(deck_cache.cache_path(deck))
+
+    def test_loaded_keywords(self, deck, monkeypatch):
+        _, first = _read(deck)
+        monkeypatch.setattr(DynaKeywordReader, "_parse_keyword_block",
+                            lambda self, lines: pytest.fail("parsed"))
+        dkr, second = _read(deck)
+        assert _node_ids(second) == _node_ids(first) == [[1, 2]]
+        assert len(dkr.index()) == 3
+
+    def test_write_from_cache(self, deck, tmp_path):
+        _read(deck)
+        dkr, _ = _read(deck)
+        out = str(tmp_path / "out.k")
+        dkr.write(out)
+        eager = str(tmp_path / "eager.k")
+        DynaKeywordReader(deck).write(eager)
+        assert open(out).read() == open(eager).read()
+
+    def test_find_keywords(self, deck):
+        _read(deck)
+        nodes = DynaKeywordReader(deck, cache=True).find_keywords(KeywordType.NODE)
+        assert _node_ids(nodes) == [[1, 2]]
+
+
+class TestMiss:
+
+    def test_changed_deck(self, deck):
+        _read(deck)
+        with open(deck, "w") as f:
+            f.write(DECK.replace("       2 ", "       7 "))
+        assert _node_ids(_read(deck)[1]) == [[1, 7]]
+
+    def test_same_size_and_time(self, deck):
+        _read(deck)
+        _rewrite_keeping_stat(deck, DECK.replace("       2 ", "       7 "))
+        assert _node_ids(_read(deck)[1]) == [[1, 7]]
+
+    def test_changed_include(self, tmp_path):
+        mesh = tmp_path / "mesh.k"
+        mesh.write_text("*NODE\n       1             0.0\n")
+        master = tmp_path / "master.k"
+        master.write_text("*KEYWORD\n*INCLUDE mesh.k\n*END\n")
+        _read(str(master), follow_include=True)
+
+        _rewrite_keeping_stat(str(mesh), "*NODE\n       5             0.0\n")
+        _, keywords = _read(str(master), follow_include=True)
+        assert _node_ids(keywords) == [[5]]
+
+    def test_other_options(self, deck):
+        _read(deck)
+        _, keywords = _read(deck, lazy=True)
+        assert not keywords[1].materialized
+
+    def test_other_version(self, deck, monkeypatch):
+        _read(deck)
+        monkeypatch.setattr(dynakw, "__version__", "0.0.0")
+        assert deck_cache.load(deck, {'follow_include': False, 'lazy': False}) is None
+
+    def test_corrupt_cache(self, deck):
+        _read(deck)
+        with open(deck_cache.cache_path(deck), "wb") as f:
+            f.write(b"not a pickle")
+        assert _node_ids(_read(deck)[1]) == [[1, 2]]
+
+
+# ---------------------------------------------------------------------------
+# What is cached
+# ---------------------------------------------------------------------------
+
+class TestContent:
+
+    def test_edits_are_not_cached(self, deck):
+        dkr = DynaKeywordReader(deck, cache=True)
+        for kw in dkr.keywords():
+            if kw.type == KeywordType.NODE:
+                kw.cards['Card 1']['NID'][0] = 99
+        assert _node_ids(_read(deck)[1]) == [[1, 2]]
+
+    def test_keywords_read_through_index(self, deck):
+        dkr = DynaKeywordReader(deck, cache=True)
+        dkr.keyword_at(1).cards['Card 1']['NID'][0] = 99
+        list(dkr.keywords())
+        assert _node_ids(_read(deck)[1]) == [[1, 2]]
+
+    def test_parameters_do_not_write_a_cache(self, deck):
+        DynaKeywordReader(deck, cache=True).parameters()
+        assert not os.path.exists(deck_cache.cache_path(deck))
@@ -0,0 +1,187 @@
+"""Reading a deck that is not a file.
+
+``DynaKeywordReader`` takes ``bytes``, ``bytearray``, ``memoryview`` and file
+objects in binary or text mode as well as file names, and reads them as it
+reads the same deck from disk.
+
+Covers:
+- Every kind of input reads as the file does, eagerly, lazily and streamed
+- ``index``, ``keyword_at`` and ``find_keywords`` on decks read again and on
+  those that can only be read once
+- Includes from a deck in memory, and what is not possible (cache, a second
+  pass over a pipe)
+"""
+
+import glob
+import io
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core.deck_source import MemorySource, StreamSource, deck_source
+from conftest import node_line, source_text
+
+
+class _Pipe(io.RawIOBase):
+    """A binary stream that cannot seek, like a pipe or a socket."""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._data.readinto(b)
+
+
+@pytest.fixture
+def plain():
+    return sorted(glob.glob("test/full_files/*.k"))[0]
+
+
+@pytest.fixture
+def data(plain):
+    with open(plain, 'rb') as f:
+        return f.read()
+
+
+INPUTS = {
+    "bytes": lambda data: data,
+    "bytearray": lambda data: bytearray(data),
+    "memoryview": lambda data: memoryview(data),
+    "binary": lambda data: io.BytesIO(data),
+    "text": lambda data: io.StringIO(data.decode('utf-8')),
+    "pipe": lambda data: io.BufferedReader(_Pipe(data)),
+}
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class TestRead:
+
+    @pytest.mark.parametrize("kind", sorted(INPUTS))
+    def test_same_as_file(self, plain, data, kind):
+        expected = list(DynaKeywordReader(plain).keywords())
+        keywords = list(DynaKeywordReader(INPUTS[kind](data)).keywords())
+        assert source_text(keywords) == source_text(expected)
+        assert [kw._start_line for kw in keywords] == [kw._start_line for kw in expected]
+
+    @pytest.mark.parametrize("kind", sorted(INPUTS))
+    def test_lazy(self, plain, data, kind):
+        keywords = list(DynaKeywordReader(INPUTS[kind](data), lazy=True).keywords())
+        assert source_text(keywords) == source_text(DynaKeywordReader(plain, lazy=True).keywords())
+
+    @pytest.mark.parametrize("kind", sorted(INPUTS))
+    def test_streamed(self, plain, data, kind):
+        dkr = DynaKeywordReader(INPUTS[kind](data))
+        assert source_text(dkr.iter_keywords(retain=False)) == source_text(DynaKeywordReader(plain).keywords())
+
+    def test_write(self, plain, data, tmp_path):
+        a, b = str(tmp_path / "a.k"), str(tmp_path / "b.k")
+        DynaKeywordReader(plain).write(a)
+        DynaKeywordReader(memoryview(data)).write(b)
+        assert open(a).read() == open(b).read()
+
+    def test_names(self, data, tmp_path):
+        assert DynaKeywordReader(data).filename == "<bytes>"
+        assert DynaKeywordReader(io.BytesIO(data)).filename == "<stream>"
+        path = tmp_path / "deck.k"
+        path.write_bytes(data)
+        with open(path, 'rb') as f:
+            keywords = list(DynaKeywordReader(f).keywords())
+            assert not f.closed
+        assert keywords[0].source_file == str(path)
+
+    def test_from_where_the_stream_stands(self, data):
+        f = io.BytesIO(b"header, not keyword text\n" + data)
+        f.readline()
+        assert source_text(DynaKeywordReader(f).keywords()) == source_text(DynaKeywordReader(data).keywords())
+
+    def test_path_like(self, plain):
+        import pathlib
+        assert DynaKeywordReader(pathlib.Path(plain)).filename == plain
+
+    def test_not_a_deck(self):
+        with pytest.raises(TypeError):
+            DynaKeywordReader(42)
+
+
+# ---------------------------------------------------------------------------
+# Random access
+# ---------------------------------------------------------------------------
+
+class TestRandomAccess:
+
+    @pytest.mark.parametrize("kind", sorted(INPUTS))
+    def test_index_and_keyword_at(self, plain, data, kind):
+        expected = DynaKeywordReader(plain)
+        dkr = DynaKeywordReader(INPUTS[kind](data))
+        index = dkr.index()
+        assert [(b.keyword_line, b.start_line, b.byte_offset) for b in index] == [
+            (b.keyword_line, b.start_line, b.byte_offset) for b in expected.index()]
+        last = len(index) - 1
+        assert source_text([dkr.keyword_at(last)]) == source_text([expected.keyword_at(last)])
+        assert len(list(dkr.keywords())) == len(index)
+
+    def test_rereadable(self, data):
+        assert deck_source(data).rereadable
+        assert deck_source(io.BytesIO(data)).rereadable
+        assert not deck_source(io.StringIO("")).rereadable
+        assert not deck_source(io.BufferedReader(_Pipe(data))).rereadable
+
+    def test_find_keywords_from_pipe(self, plain, data):
+        dkr = DynaKeywordReader(io.BufferedReader(_Pipe(data)))
+        found = dkr.find_keywords(KeywordType.NODE)
+        assert len(found) == len(DynaKeywordReader(plain).find_keywords(KeywordType.NODE))
+
+    def test_pipe_read_once(self, data, caplog):
+        dkr = DynaKeywordReader(io.BufferedReader(_Pipe(data)))
+        first = list(dkr.iter_keywords(retain=False))
+        assert len(dkr.index()) == len(first)
+        assert list(dkr.keywords()) == []
+        assert "cannot be read again" in caplog.text
+
+
+# ---------------------------------------------------------------------------
+# Includes and cache
+# ---------------------------------------------------------------------------
+
+class TestOther:
+
+    def test_includes_from_memory(self, tmp_path, monkeypatch):
+        (tmp_path / "mesh.k").write_text(f"*NODE\n{node_line(3)}\n")
+        monkeypatch.chdir(tmp_path)
+        deck = f"*KEYWORD\n*INCLUDE\nmesh.k\n*NODE\n{node_line(4)}\n*END\n".encode()
+        dkr = DynaKeywordReader(deck, follow_include=True)
+        keywords = list(dkr.keywords())
+        assert [kw.cards['Card 1']['NID'][0] for kw in keywords
+                if kw.type == KeywordType.NODE] == [3, 4]
+        assert keywords[1].source_file == "mesh.k"
+        assert [b.path for b in dkr.index()] == ["<bytes>", "mesh.k", "<bytes>", "<bytes>"]
+
+    def test_includes_from_pipe(self, tmp_path, monkeypatch):
+        (tmp_path / "mesh.k").write_text(f"*NODE\n{node_line(3)}\n")
+        monkeypatch.chdir(tmp_path)
+        deck = f"*KEYWORD\n*INCLUDE\nmesh.k\n*NODE\n{node_line(4)}\n*END\n".encode()
+        dkr = DynaKeywordReader(io.BufferedReader(_Pipe(deck)), follow_include=True)
+        assert [kw.cards['Card 1']['NID'][0] for kw in dkr.iter_keywords(retain=False)
+                if kw.type == KeywordType.NODE] == [3, 4]
+
+    def test_no_cache(self, data, caplog):
+        dkr = DynaKeywordReader(data, cache=True)
+        assert not dkr.cache
+        assert "not a file on disk" in caplog.text
+        assert len(list(dkr.keywords())) > 0
+
+    def test_memory_is_not_copied(self, data):
+        view = memoryview(data)
+        source = MemorySource(view)
+        assert source.read_at(2, 5) == data[2:7]
+        assert source._view.obj is data
+
+    def test_stream_source_name(self):
+        assert StreamSource(io.BytesIO(b""), name="blob.k").name == "blob.k"
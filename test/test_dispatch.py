@@ -0,0 +1,131 @@
+"""Keyword dispatch.
+
+``LSDynaKeyword.resolve`` looks a keyword line's prefixes up in the registry
+and remembers the answer, and ``_parse_keyword_name`` remembers the type and
+options of each name.  Both have to answer exactly what a scan of every
+registered name / every ``KeywordType`` did.
+
+Covers:
+- Agreement with the linear scan over every registered name, with option
+  suffixes, format modifiers, lower case and ``exact_match`` classes
+- Registering a class after a line was resolved
+- ``_parse_keyword_name`` agreement, and a fresh options list per call
+"""
+
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import KeywordType
+from dynakw.keywords import lsdyna_keyword
+from dynakw.keywords.lsdyna_keyword import LSDynaKeyword
+
+
+def _linear_resolve(keyword_line):
+    """The dispatch as it was: every registered name tested in turn."""
+    clean_line = keyword_line.strip().rstrip('+-% ').upper()
+    best_match, best_length = None, 0
+    for keyword_str, keyword_class in LSDynaKeyword.KEYWORD_MAP.items():
+        if not clean_line.startswith(keyword_str):
+            continue
+        if keyword_class.exact_match and clean_line != keyword_str:
+            continue
+        if len(keyword_str) > best_length:
+            best_match, best_length = keyword_class, len(keyword_str)
+    return best_match
+
+
+def _linear_parse_name(keyword_name):
+    parts = keyword_name.strip()[1:].split('_')
+    for i in range(len(parts), 0, -1):
+        try:
+            return KeywordType['_'.join(parts[:i])], parts[i:]
+        except KeyError:
+            continue
+    return KeywordType.UNKNOWN, parts
+
+
+def _lines():
+    lines = ["*", "", "*NOT_A_KEYWORD", "*KEYWORD 100m", "  *node  ", "*NODE %"]
+    for name in LSDynaKeyword.KEYWORD_MAP:
+        lines += [name, name + "_TITLE", name + "_ID_TITLE", name + "X",
+                  name.lower(), name + " +", name + "-", name[:-1]]
+    return lines
+
+
+@pytest.fixture
+def fresh_memo():
+    LSDynaKeyword._resolved.clear()
+    yield
+    LSDynaKeyword._resolved.clear()
+
+
+# ---------------------------------------------------------------------------
+# resolve
+# ---------------------------------------------------------------------------
+
+class TestResolve:
+
+    def test_agrees_with_linear_scan(self, fresh_memo):
+        for line in _lines():
+            assert LSDynaKeyword.resolve(line) is _linear_resolve(line), line
+
+    def test_agrees_from_memo(self, fresh_memo):
+        for line in _lines():
+            LSDynaKeyword.resolve(line)
+        for line in _lines():
+            assert LSDynaKeyword.resolve(line) is _linear_resolve(line), line
+
+    def test_exact_match_class(self, fresh_memo):
+        exact = [cls for cls in LSDynaKeyword.KEYWORD_MAP.values() if cls.exact_match]
+        if not exact:
+            pytest.skip("no exact_match class registered")
+        name = exact[0].keyword_string
+        assert LSDynaKeyword.resolve(name) is exact[0]
+        assert LSDynaKeyword.resolve(name + "_SOMETHING_ELSE") is not exact[0]
+
+    def test_memo_is_bounded(self, fresh_memo, monkeypatch):
+        monkeypatch.setattr(lsdyna_keyword, "_MEMO_LIMIT", 10)
+        for i in range(50):
+            LSDynaKeyword.resolve(f"*NODE_{i}")
+        assert len(LSDynaKeyword._resolved) <= 10
+
+
+class TestRegistration:
+
+    def test_new_class_is_seen(self, fresh_memo):
+        line = "*NODE_DISPATCH_TEST_ONLY"
+        before = LSDynaKeyword.resolve(line)
+        try:
+            class DispatchTestOnly(LSDynaKeyword):
+                keyword_string = line
+
+                def _parse_raw_data(self, raw_lines):
+                    pass
+
+                def write(self, file_obj):
+                    pass
+
+            assert before is not DispatchTestOnly
+            assert LSDynaKeyword.resolve(line) is DispatchTestOnly
+        finally:
+            LSDynaKeyword.KEYWORD_MAP.pop(line, None)
+            LSDynaKeyword._resolved.clear()
+        assert LSDynaKeyword.resolve(line) is before
+
+
+# ---------------------------------------------------------------------------
+# _parse_keyword_name
+# ---------------------------------------------------------------------------
+
+class TestParseName:
+
+    def test_agrees_with_linear_scan(self):
+        for line in _lines():
+            if line.strip().startswith("*"):
+                assert LSDynaKeyword._parse_keyword_name(line) == _linear_parse_name(line), line
+
+    def test_options_are_a_fresh_list(self):
+        _, options = LSDynaKeyword._parse_keyword_name("*BOUNDARY_PRESCRIBED_MOTION_SET")
+        options.append("BOX")
+        assert LSDynaKeyword._parse_keyword_name("*BOUNDARY_PRESCRIBED_MOTION_SET")[1] == ["SET"]
@@ -0,0 +1,242 @@
+"""The elements of a deck in one table per topology.
+
+``DynaKeywordReader.element_table(topology)`` puts the elements of every
+``*ELEMENT_SHELL`` or ``*ELEMENT_SOLID`` keyword into one ``ElementTable``
+(see ``dynakw.core.mesh_tables``): element and part IDs, connectivity as an
+``(n, k)`` int32 array, and where each element came from.
+
+Covers:
+- Shells, with and without options; solids in the standard, legacy and
+  higher-order formats, together in one table
+- ``keyword_index`` and ``keyword_rows``; lookups by element ID; node rows
+- The arrays of a single keyword used without copying, and copied otherwise
+- The table kept while the elements are unchanged, built again after a change
+- Unknown topologies, keywords the table cannot take, decks read by workers
+"""
+
+import numpy as np
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, ElementTable, KeywordType
+from dynakw.core.mesh_tables import ELEMENT_TOPOLOGIES, pack_columns
+from dynakw.keywords.ELEMENT_SHELL import ElementShell
+from dynakw.keywords.ELEMENT_SOLID import ElementSolid
+
+
+def _ints(*values):
+    return "".join(f"{v:8d}" for v in values)
+
+
+def _shells(*elements, keyword="*ELEMENT_SHELL"):
+    return keyword + "\n" + "".join(_ints(*e) + "\n" for e in elements)
+
+
+NODES = "*NODE\n" + "".join(f"{i:8d}{i:16.1f}{0.0:16.1f}{0.0:16.1f}\n" for i in range(1, 21))
+
+SOLIDS = ("*ELEMENT_SOLID\n"
+          + _ints(20, 2) + "\n" + _ints(1, 2, 3, 4, 5, 6, 7, 8) + "\n"
+          + _ints(21, 2) + "\n" + _ints(5, 6, 7, 8) + "\n"
+          + "*ELEMENT_SOLID\n"                                     # legacy, one line
+          + _ints(22, 3, 9, 10, 11, 12, 13, 14, 15, 16) + "\n"
+          + "*ELEMENT_SOLID_H20\n"
+          + _ints(23, 4) + "\n" + _ints(*range(1, 11)) + "\n" + _ints(*range(11, 21)) + "\n")
+
+
+@pytest.fixture
+def dkr():
+    deck = ("*KEYWORD\n" + NODES
+            + _shells((1, 1, 1, 2, 3, 4), (2, 1, 2, 3, 4, 4))
+            + _shells((10, 5, 5, 6, 7, 0), keyword="*ELEMENT_SHELL_THICKNESS") + f"{0.5:16.3f}" * 4 + "\n"
+            + SOLIDS + "*END\n")
+    return DynaKeywordReader(deck.encode())
+
+
+# ---------------------------------------------------------------------------
+# The table
+# ---------------------------------------------------------------------------
+
+class TestTable:
+
+    def test_shells(self, dkr):
+        shells = dkr.element_table("shell")
+        assert len(shells) == 3
+        assert shells.eids.tolist() == [1, 2, 10]
+        assert shells.pids.tolist() == [1, 1, 5]
+        assert shells.connectivity.dtype == np.int32
+        assert shells.connectivity.flags.c_contiguous
+        assert shells.connectivity.tolist() == [[1, 2, 3, 4, 0, 0, 0, 0],
+                                                [2, 3, 4, 4, 0, 0, 0, 0],
+                                                [5, 6, 7, 0, 0, 0, 0, 0]]
+        assert shells.keyword_index.tolist() == [0, 0, 1]
+        assert shells.keyword_rows.tolist() == [0, 1, 0]
+        assert shells.offsets.tolist() == [0, 2, 3]
+
+    def test_solids(self, dkr):
+        solids = dkr.element_table("solid")
+        assert solids.eids.tolist() == [20, 21, 22, 23]
+        assert solids.connectivity.shape == (4, 20)
+        assert solids.connectivity[0].tolist() == list(range(1, 9)) + [0] * 12
+        assert solids.connectivity[1].tolist() == [5, 6, 7, 8] + [0] * 16
+        assert solids.connectivity[2].tolist() == list(range(9, 17)) + [0] * 12
+        assert solids.connectivity[3].tolist() == list(range(1, 21))
+        assert solids.keyword_index.tolist() == [0, 0, 1, 2]
+
+    def test_read_only(self, dkr):
+        shells = dkr.element_table("shell")
+        with pytest.raises(ValueError):
+            shells.connectivity[0, 0] = 9
+
+    def test_unknown_topology(self, dkr):
+        with pytest.raises(ValueError, match="Unknown element topology"):
+            dkr.element_table("beam")
+
+    def test_empty(self):
+        shells = DynaKeywordReader(b"*KEYWORD\n*END\n").element_table("shell")
+        assert len(shells) == 0
+        assert shells.connectivity.shape == (0, 0)
+
+
+# ---------------------------------------------------------------------------
+# Lookups
+# ---------------------------------------------------------------------------
+
+class TestLookup:
+
+    def test_rows(self, dkr):
+        solids = dkr.element_table("solid")
+        assert solids.rows([23, 20]).tolist() == [3, 0]
+        with pytest.raises(KeyError, match="Element IDs not in the deck"):
+            solids.rows([24])
+
+    def test_node_rows(self, dkr):
+        nodes = dkr.node_table()
+        rows = dkr.element_table("shell").node_rows(nodes)
+        assert rows[0].tolist() == [0, 1, 2, 3, -1, -1, -1, -1]
+        assert nodes.coords[rows[2, :3]].tolist() == [[5.0, 0, 0], [6.0, 0, 0], [7.0, 0, 0]]
+
+    def test_node_rows_unknown(self, dkr):
+        nodes = DynaKeywordReader(b"*KEYWORD\n" + NODES[:NODES.index(f"{5:8d}")].encode()
+                                  + b"*END\n").node_table()
+        with pytest.raises(KeyError, match=r"Node IDs not in the deck: \[5, 6, 7\]"):
+            dkr.element_table("shell").node_rows(nodes)
+
+
+# ---------------------------------------------------------------------------
+# Copying
+# ---------------------------------------------------------------------------
+
+class TestViews:
+
+    def test_one_keyword(self):
+        dkr = DynaKeywordReader(_shells((1, 1, 1, 2, 3, 4), (2, 1, 2, 3, 4, 5)).encode())
+        shells = dkr.element_table("shell")
+        card = dkr.find_keywords(KeywordType.ELEMENT_SHELL)[0].cards['Card 1']
+        assert np.shares_memory(shells.connectivity, card['N1'])
+        assert np.shares_memory(shells.eids, card['EID'])
+        card['N1'][0] = 9
+        assert dkr.element_table("shell").connectivity[0, 0] == 9
+
+    @pytest.mark.parametrize("deck", [
+        "*ELEMENT_SOLID\n" + _ints(1, 1) + "\n" + _ints(*range(1, 9)) + "\n",
+        "*ELEMENT_SOLID\n" + _ints(1, 1, *range(1, 9)) + "\n",
+        "*ELEMENT_SOLID_H20\n" + _ints(1, 1) + "\n" + _ints(*range(1, 11)) + "\n"
+        + _ints(*range(11, 21)) + "\n",
+        _shells((1, 1, 1, 2, 3, 4), keyword="*ELEMENT_SHELL_THICKNESS") + f"{0.5:16.3f}" * 4 + "\n",
+    ])
+    def test_formats(self, deck):
+        dkr = DynaKeywordReader(deck.encode())
+        topology = "shell" if "SHELL" in deck else "solid"
+        keyword_type, card_name = ELEMENT_TOPOLOGIES[topology]
+        card = dkr.find_keywords(keyword_type)[0].cards[card_name]
+        assert np.shares_memory(dkr.element_table(topology).connectivity, card['N1'])
+
+    def test_several_keywords(self, dkr):
+        shells = dkr.element_table("shell")
+        card = dkr.find_keywords(KeywordType.ELEMENT_SHELL)[0].cards['Card 1']
+        assert not np.shares_memory(shells.connectivity, card['N1'])
+
+    def test_columns_assigned(self):
+        dkr = DynaKeywordReader(_shells((1, 1, 1, 2, 3, 4)).encode())
+        card = dkr.find_keywords(KeywordType.ELEMENT_SHELL)[0].cards['Card 1']
+        card['N2'] = card['N2'] + 100
+        shells = dkr.element_table("shell")
+        assert shells.connectivity.tolist() == [[1, 102, 3, 4, 0, 0, 0, 0]]
+        assert shells.connectivity.flags.c_contiguous
+        assert not np.shares_memory(shells.connectivity, card['N1'])
+
+    def test_pack_columns(self):
+        card = {'N1': np.array([1, 2], dtype=np.int32), 'N2': np.array([3, 4], dtype=np.int32)}
+        pack_columns(card)
+        assert card['N1'].base is card['N2'].base
+        assert card['N1'].base.tolist() == [[1, 3], [2, 4]]
+        uneven = {'N1': np.array([1, 2], dtype=np.int32), 'N2': np.array([3], dtype=np.int32)}
+        pack_columns(uneven)
+        assert uneven['N1'].base is None
+
+    def test_written_unchanged(self, tmp_path):
+        deck = ("*KEYWORD\n" + _shells((1, 1, 1, 2, 3, 4), (2, 1, 2, 3, 4, 5)) + SOLIDS + "*END\n")
+        dkr = DynaKeywordReader(deck.encode())
+        dkr.write(str(tmp_path / "out.k"), reformat=True)
+        read = DynaKeywordReader(str(tmp_path / "out.k"))
+        for topology in ("shell", "solid"):
+            assert (read.element_table(topology).connectivity.tolist()
+                    == dkr.element_table(topology).connectivity.tolist())
+
+
+# ---------------------------------------------------------------------------
+# Keeping the table
+# ---------------------------------------------------------------------------
+
+class TestCurrent:
+
+    def test_kept(self, dkr):
+        assert dkr.element_table("solid") is dkr.element_table("solid")
+
+    def test_changed(self, dkr):
+        solids = dkr.element_table("solid")
+        dkr.find_keywords(KeywordType.ELEMENT_SOLID)[1].cards['Card 1']['PID'][0] = 7
+        assert not solids.is_current()
+        assert dkr.element_table("solid").pids.tolist() == [2, 2, 7, 4]
+
+    def test_other_cards(self, dkr):
+        shells = dkr.element_table("shell")
+        dkr.find_keywords(KeywordType.ELEMENT_SHELL)[1].cards['Card 2']['THIC1'][0] = 1.0
+        assert dkr.element_table("shell") is shells
+
+    def test_lazy(self):
+        dkr = DynaKeywordReader(_shells((1, 1, 1, 2, 3, 4)).encode(), lazy=True)
+        assert len(dkr.element_table("shell")) == 1
+        assert not dkr.find_keywords(KeywordType.ELEMENT_SHELL)[0].modified
+
+
+# ---------------------------------------------------------------------------
+# Keywords the table cannot take, and decks read by workers
+# ---------------------------------------------------------------------------
+
+class TestOdd:
+
+    def test_without_columns(self, caplog):
+        broken = ElementShell("*ELEMENT_SHELL", ["*ELEMENT_SHELL", _ints(1, 1, 1, 2, 3, 4)])
+        broken.cards = {}
+        shells = ElementTable("shell", [broken, ElementShell(
+            "*ELEMENT_SHELL", ["*ELEMENT_SHELL", _ints(2, 1, 1, 2, 3, 4)])])
+        assert shells.eids.tolist() == [2]
+        assert shells.keyword_index.tolist() == [1]
+        assert "without its element columns" in caplog.text
+
+    def test_parameters(self, caplog):
+        solid = ElementSolid("*ELEMENT_SOLID", ["*ELEMENT_SOLID", _ints(1, 1),
+                                                f"{'&n1':>8}" + _ints(2, 3, 4, 5, 6, 7, 8)])
+        assert len(ElementTable("solid", [solid])) == 0
+        assert "with parameters for IDs" in caplog.text
+
+    def test_workers(self, tmp_path):
+        path = tmp_path / "mesh.k"
+        path.write_text("*KEYWORD\n" + NODES + _shells((1, 1, 1, 2, 3, 4)) + SOLIDS + "*END\n")
+        serial = DynaKeywordReader(str(path))
+        parallel = DynaKeywordReader(str(path), workers=2)
+        for topology in ("shell", "solid"):
+            assert (parallel.element_table(topology).connectivity.tolist()
+                    == serial.element_table(topology).connectivity.tolist())
@@ -10,6 +10,7 @@ The second wrote a steel density as zero.  These tests pin both directions, and
 the requirement that ordinary values keep their conventional look.
 """
 
+import math
 import pytest
 import sys
 sys.path.append('.')
@@ -200,3 +201,49 @@ def test_a_material_density_survives_a_keyword_round_trip():
     assert again.cards["Card 1"]["RO"][0] == 7.85e-9
     assert again.cards["Card 1"]["E"][0] == 210000.0
     assert again.cards["Card 1"]["PR"][0] == 0.3
+
+
+# ---------------------------------------------------------------------------
+# The shortcut: deciding from the magnitude
+# ---------------------------------------------------------------------------
+
+def _near_the_edges():
+    values = [0.0, -0.0, 5e-324, 1e308, float("inf"), -float("inf")]
+    for exponent in range(-22, 22):
+        for base in (1.0, 0.4, 0.5, 0.99995, 0.999995, 9.99995, 1.0000001):
+            for value in (base * 10.0 ** exponent, -base * 10.0 ** exponent):
+                values += [value, math.nextafter(value, 0.0), math.nextafter(value, math.inf)]
+    return values
+
+
+@pytest.mark.parametrize("width", [1, 5, 8, 10, 16, 20])
+@pytest.mark.parametrize("long_format", [False, True])
+def test_the_shortcut_agrees_with_the_search(fp, width, long_format):
+    decimals = 6 if long_format else 4
+    for value in _near_the_edges():
+        assert (fp._format_float(value, width, long_format)
+                == fp._search_float(value, width, decimals)), value
+
+
+def test_searched_values_are_remembered(fp, monkeypatch):
+    monkeypatch.setattr(FormatParser, "_float_memo", {})
+    assert _written(fp, 2.1e11) == " 2.100E+11"
+    assert FormatParser._float_memo == {(2.1e11, 10, False): "2.100E+11"}
+    monkeypatch.setattr(FormatParser, "_search_float", None)
+    assert _written(fp, 2.1e11) == " 2.100E+11"
+
+
+def test_the_memo_is_bounded_and_optional(fp, monkeypatch):
+    monkeypatch.setattr(FormatParser, "_float_memo", {})
+    monkeypatch.setattr(FormatParser, "float_memo_size", 2)
+    for value in (2.1e11, 3.1e11, 4.1e11):
+        _written(fp, value)
+    assert len(FormatParser._float_memo) == 1
+    monkeypatch.setattr(FormatParser, "float_memo_size", 0)
+    _written(fp, 5.1e11)
+    assert (5.1e11, 10, False) not in FormatParser._float_memo
+
+
+def test_negative_zero_is_not_taken_for_zero(fp):
+    assert _written(fp, -0.0) == "   -0.0000"
+    assert _written(fp, 0.0) == "    0.0000"
@@ -0,0 +1,216 @@
+"""Parsed include files shared between readers.
+
+Readers made with ``share_includes=True`` keep the keywords of the include
+files they parse in ``dynakw.core.include_cache``, and later readers in the
+process use shared copies of them instead of reading the files again.
+
+Covers:
+- A second reader parses only its master file, and reads the same keywords
+- Changes made through one reader do not show in another
+- A changed include file is read again; reader settings are part of the key
+- The size limit and least-recently-used eviction
+- ``LSDynaKeyword.shared_copy``
+"""
+
+import io
+import os
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core import include_cache, include_tree
+from dynakw.keywords.NODE import Node
+from conftest import node_line, source_text
+
+
+def _nodes(keywords):
+    return [kw for kw in keywords if kw.type == KeywordType.NODE]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    include_cache.clear()
+    yield
+    include_cache.clear()
+    include_cache.set_limit(include_cache.DEFAULT_LIMIT)
+
+
+@pytest.fixture
+def masters(tmp_path):
+    """Two masters including mesh.k, which includes parts.k."""
+    (tmp_path / "parts.k").write_text(f"*NODE\n{node_line(7)}\n")
+    (tmp_path / "mesh.k").write_text(
+        f"*NODE\n{node_line(1)}\n{node_line(2)}\n*INCLUDE\nparts.k\n")
+    paths = []
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.k"
+        path.write_text(f"*KEYWORD\n*INCLUDE\nmesh.k\n*NODE\n{node_line(100)}\n*END\n")
+        paths.append(str(path))
+    return paths
+
+
+def _read(path, **kwargs):
+    return list(DynaKeywordReader(path, follow_include=True, share_includes=True,
+                                  **kwargs).keywords())
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """The blocks parsed by readers, by keyword line."""
+    blocks = []
+    original = DynaKeywordReader._parse_keyword_block
+    def spy(self, block):
+        blocks.append(block)
+        return original(self, block)
+    monkeypatch.setattr(DynaKeywordReader, "_parse_keyword_block", spy)
+    return blocks
+
+
+# ---------------------------------------------------------------------------
+# Sharing
+# ---------------------------------------------------------------------------
+
+class TestShared:
+
+    def test_second_reader_parses_master_only(self, masters, parsed, monkeypatch):
+        first = _read(masters[0])
+        assert include_cache.cached_files() == 2
+        del parsed[:]
+        read = []
+        split = include_tree._split
+        monkeypatch.setattr(include_tree, "_split",
+                            lambda source, memory_map: read.append(source.path)
+                            or split(source, memory_map))
+
+        second = _read(masters[1])
+        assert len(parsed) == 3
+        assert set(read) == {masters[1]}
+        assert source_text(second) == source_text(first)
+        assert [kw.source_file for kw in second][1:3] == [kw.source_file for kw in first][1:3]
+        assert [kw._start_line for kw in second] == [kw._start_line for kw in first]
+
+    def test_same_reader_settings_only(self, masters, parsed):
+        _read(masters[0])
+        del parsed[:]
+        keywords = _read(masters[1], lazy=True)
+        assert len(parsed) == 5
+        assert not keywords[1].materialized
+
+    def test_not_shared_by_default(self, masters):
+        list(DynaKeywordReader(masters[0], follow_include=True).keywords())
+        assert include_cache.cached_files() == 0
+
+    def test_workers(self, masters):
+        first = _read(masters[0], workers=2)
+        assert source_text(_read(masters[1], workers=2)) == source_text(first)
+
+
+class TestIndependent:
+
+    def test_changes_do_not_leak(self, masters):
+        first = _nodes(_read(masters[0]))
+        first[0].cards['Card 1']['NID'][0] = 99
+        second = _nodes(_read(masters[1]))
+        assert second[0].cards['Card 1']['NID'][0] == 1
+        second[0].cards['Card 1']['X'][1] = -1.0
+        assert first[0].cards['Card 1']['X'][1] == 0.5
+        assert first[0].cards['Card 1']['NID'][0] == 99
+
+    def test_first_reader_too(self, masters):
+        first = _nodes(_read(masters[0]))
+        first[1].cards['Card 1']['NID'][0] = 99
+        assert _nodes(_read(masters[0]))[1].cards['Card 1']['NID'][0] == 7
+
+
+class TestChanged:
+
+    def test_changed_include_is_read_again(self, masters, tmp_path, parsed):
+        _read(masters[0])
+        mesh = tmp_path / "mesh.k"
+        st = os.stat(mesh)
+        mesh.write_text(f"*NODE\n{node_line(5)}\n{node_line(6)}\n*INCLUDE\nparts.k\n")
+        os.utime(mesh, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        del parsed[:]
+        nodes = _nodes(_read(masters[1]))
+        assert list(nodes[0].cards['Card 1']['NID']) == [5, 6]
+        assert len(parsed) == 4
+
+
+# ---------------------------------------------------------------------------
+# Size
+# ---------------------------------------------------------------------------
+
+class TestLimit:
+
+    def _deck(self, tmp_path, name, nodes):
+        include = tmp_path / f"{name}_mesh.k"
+        include.write_text("*NODE\n" + "\n".join(node_line(i) for i in range(1, nodes + 1)) + "\n")
+        master = tmp_path / f"{name}.k"
+        master.write_text(f"*INCLUDE\n{include.name}\n")
+        return str(master), os.path.getsize(include)
+
+    def test_lru(self, tmp_path):
+        a, size = self._deck(tmp_path, "a", 10)
+        b, _ = self._deck(tmp_path, "b", 10)
+        c, _ = self._deck(tmp_path, "c", 10)
+        include_cache.set_limit(2 * size)
+        _read(a)
+        _read(b)
+        _read(a)
+        _read(c)
+        assert include_cache.cached_files() == 2
+        assert include_cache.lookup(str(tmp_path / "b_mesh.k"), {'lazy': False, 'only': None}) is None
+        assert include_cache.lookup(str(tmp_path / "a_mesh.k"), {'lazy': False, 'only': None}) is not None
+
+    def test_too_large(self, tmp_path):
+        a, size = self._deck(tmp_path, "a", 10)
+        include_cache.set_limit(size - 1)
+        _read(a)
+        assert include_cache.cached_files() == 0
+
+    def test_lower_limit_evicts(self, tmp_path):
+        _read(self._deck(tmp_path, "a", 10)[0])
+        include_cache.set_limit(0)
+        assert include_cache.cached_files() == 0
+
+
+# ---------------------------------------------------------------------------
+# shared_copy
+# ---------------------------------------------------------------------------
+
+class TestSharedCopy:
+
+    @pytest.fixture
+    def node(self):
+        return Node("*NODE", ["*NODE", node_line(1), node_line(2)])
+
+    def test_written_as_origin(self, node):
+        copy = node.shared_copy()
+        a, b = io.StringIO(), io.StringIO()
+        node.write(a)
+        copy.write_source(b)
+        assert a.getvalue() == b.getvalue()
+
+    def test_cards_are_copied_on_use(self, node):
+        copy = node.shared_copy()
+        copy.cards['Card 1']['NID'][0] = 50
+        assert node.cards['Card 1']['NID'][0] == 1
+        assert copy._shared is None
+
+    def test_attributes_set_on_copy_are_kept(self, node):
+        copy = node.shared_copy()
+        copy._start_line = 12
+        copy.source_file = "mesh.k"
+        copy.options.append("SCALAR")
+        copy.cards
+        assert (copy._start_line, copy.source_file, copy.options) == (12, "mesh.k", ["SCALAR"])
+        assert node.options == [] and node.source_file is None
+
+    def test_copy_of_copy(self, node):
+        assert node.shared_copy().shared_copy()._shared is node
+
+    def test_setting_cards(self, node):
+        copy = node.shared_copy()
+        copy.cards = {}
+        assert copy.cards == {} and node.cards['Card 1']['NID'][0] == 1
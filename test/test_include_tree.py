@@ -0,0 +1,261 @@
+"""Reading a deck with its include files.
+
+With ``follow_include`` the reader works out the include tree first, reads
+each distinct file once in a pool of threads, parses each distinct block once
+and puts the keywords back in deck order.
+
+Covers:
+- Where an ``*INCLUDE`` names its file: the next line, the keyword line,
+  quotes, comments and `` +`` continuation lines
+- Nested includes relative to their parent, deck order, line numbers and the
+  file each keyword came from, in ``keywords()`` and ``index()``
+- A file included twice is read and parsed once, and is written at both places
+- Block bytes not kept by the scan; files read again a block at a time, in a
+  memory map, and closed after their last block; a file changed in between
+- Missing includes, include cycles and ``*INCLUDE_...`` keywords
+- Workers, lazy reading and streaming
+"""
+
+import os
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core import include_tree
+from dynakw.core.include_tree import include_name, load_tree
+from conftest import node_line, source_text
+
+
+def _nids(keywords):
+    return [int(kw.cards['Card 1']['NID'][0]) for kw in keywords
+            if kw.type == KeywordType.NODE]
+
+
+@pytest.fixture
+def deck(tmp_path):
+    """master -> (mesh/a.k -> mesh/shared.k), shared twice, mesh/b.k"""
+    (tmp_path / "mesh").mkdir()
+    (tmp_path / "mesh" / "shared.k").write_text(f"*NODE\n{node_line(100)}\n")
+    (tmp_path / "mesh" / "a.k").write_text(
+        f"*NODE\n{node_line(1)}\n*INCLUDE\nshared.k\n*NODE\n{node_line(2)}\n")
+    (tmp_path / "mesh" / "b.k").write_text(f"$ comment\n*NODE\n{node_line(3)}\n")
+    master = tmp_path / "master.k"
+    master.write_text("\n".join([
+        "*KEYWORD",
+        "*INCLUDE",
+        "$ the mesh",
+        "mesh/a.k",
+        "*INCLUDE",
+        "mesh/shared.k",
+        "*INCLUDE mesh/b.k",
+        "*END",
+        ""]))
+    return str(master)
+
+
+# ---------------------------------------------------------------------------
+# The file name of an *INCLUDE
+# ---------------------------------------------------------------------------
+
+class TestIncludeName:
+
+    @pytest.mark.parametrize("block, name", [
+        (b"*INCLUDE\nmesh.k\n", "mesh.k"),
+        (b"*include\r\n$ c\r\n\r\n  mesh.k  \r\n", "mesh.k"),
+        (b"*INCLUDE mesh.k\n", "mesh.k"),
+        (b'*INCLUDE\n"my mesh.k"\n', "my mesh.k"),
+        (b"*INCLUDE\n/very/long/path/ +\nto/mesh.k\n", "/very/long/path/to/mesh.k"),
+        (b"*INCLUDE\n", ""),
+    ])
+    def test_name(self, block, name):
+        assert include_name(block) == name
+
+    @pytest.mark.parametrize("block", [
+        b"*INCLUDE_PATH\n/lib\n", b"*INCLUDE_TRANSFORM\nmesh.k\n", b"*NODE\n",
+    ])
+    def test_not_an_include(self, block):
+        assert include_name(block) is None
+
+
+# ---------------------------------------------------------------------------
+# Deck order
+# ---------------------------------------------------------------------------
+
+class TestOrder:
+
+    def test_keywords(self, deck, tmp_path):
+        keywords = list(DynaKeywordReader(deck, follow_include=True).keywords())
+        assert _nids(keywords) == [1, 100, 2, 100, 3]
+        mesh = os.path.join(str(tmp_path), "mesh")
+        nodes = [kw for kw in keywords if kw.type == KeywordType.NODE]
+        assert [(kw.source_file, kw._start_line) for kw in nodes] == [
+            (os.path.join(mesh, "a.k"), 1), (os.path.join(mesh, "shared.k"), 1),
+            (os.path.join(mesh, "a.k"), 5), (os.path.join(mesh, "shared.k"), 1),
+            (os.path.join(mesh, "b.k"), 2)]
+        assert keywords[0].source_file == deck
+
+    def test_index_agrees(self, deck):
+        dkr = DynaKeywordReader(deck, follow_include=True)
+        index = dkr.index()
+        keywords = list(dkr.keywords())
+        assert [b.keyword_line for b in index] == [kw.full_keyword.upper() for kw in keywords]
+        assert [(b.path, b.start_line) for b in index] == [
+            (kw.source_file, kw._start_line) for kw in keywords]
+
+    def test_keyword_at(self, deck):
+        dkr = DynaKeywordReader(deck, follow_include=True)
+        assert _nids([dkr.keyword_at(4)]) == [100]
+        assert _nids(list(dkr.keywords())) == [1, 100, 2, 100, 3]
+
+    def test_include_files(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck, follow_include=True)
+        list(dkr.keywords())
+        assert [os.path.relpath(p, str(tmp_path)) for p in dkr._include_files] == [
+            os.path.join("mesh", "a.k"), os.path.join("mesh", "shared.k"),
+            os.path.join("mesh", "b.k")]
+
+    def test_not_followed(self, deck):
+        keywords = list(DynaKeywordReader(deck).keywords())
+        assert [kw.full_keyword for kw in keywords][1:4] == [
+            "*INCLUDE", "*INCLUDE", "*INCLUDE MESH/B.K"]
+
+
+# ---------------------------------------------------------------------------
+# Each file once
+# ---------------------------------------------------------------------------
+
+class TestOnce:
+
+    def test_read_once(self, deck, monkeypatch):
+        read = []
+        split = include_tree._split
+        monkeypatch.setattr(include_tree, "_split",
+                            lambda source, memory_map: read.append(source.path)
+                            or split(source, memory_map))
+        load_tree(deck, threads=4)
+        assert len(read) == len(set(read)) == 4
+
+    def test_parsed_once(self, deck, monkeypatch):
+        parsed = []
+        original = DynaKeywordReader._parse_keyword_block
+        def spy(self, block):
+            parsed.append(block)
+            return original(self, block)
+        monkeypatch.setattr(DynaKeywordReader, "_parse_keyword_block", spy)
+
+        keywords = list(DynaKeywordReader(deck, follow_include=True).keywords())
+        assert len(keywords) == 7 and len(parsed) == 6
+        assert keywords[2] is keywords[4]
+
+    def test_written_at_both_places(self, deck, tmp_path):
+        out = str(tmp_path / "flat.k")
+        DynaKeywordReader(deck, follow_include=True).write(out)
+        assert _nids(DynaKeywordReader(out).keywords()) == [1, 100, 2, 100, 3]
+
+
+# ---------------------------------------------------------------------------
+# Reading the blocks
+# ---------------------------------------------------------------------------
+
+class TestBlocks:
+
+    def test_scan_keeps_no_bytes(self, deck):
+        tree = load_tree(deck)
+        assert len(tree.files) == 4
+        assert all(data is None for tree_file in tree.files.values()
+                   for data, _, _ in tree_file.blocks)
+
+    @pytest.mark.parametrize("memory_map", [True, False])
+    def test_memory_map(self, deck, monkeypatch, memory_map):
+        mapped = []
+        map_split = include_tree.map_split_blocks
+        monkeypatch.setattr(include_tree, "map_split_blocks",
+                            lambda path: mapped.append(path) or map_split(path))
+        dkr = DynaKeywordReader(deck, follow_include=True, memory_map=memory_map)
+        assert _nids(dkr.keywords()) == [1, 100, 2, 100, 3]
+        assert len(set(mapped)) == (4 if memory_map else 0)
+
+    def test_one_block_at_a_time(self, deck, monkeypatch):
+        live, peak = [0], [0]
+        numbered = include_tree._numbered
+        def spy(blocks):
+            live[0] += 1
+            peak[0] = max(peak[0], live[0])
+            try:
+                yield from numbered(blocks)
+            finally:
+                live[0] -= 1
+        monkeypatch.setattr(include_tree, "_numbered", spy)
+        dkr = DynaKeywordReader(deck, follow_include=True)
+        seen = []
+        for kw in dkr.iter_keywords(retain=False):
+            seen.append(kw.type)
+            assert live[0] <= 3         # the master, mesh/a.k and mesh/shared.k
+        assert len(seen) == 7
+        assert live[0] == 0 and peak[0] == 3
+
+    def test_changed_in_between(self, deck, caplog):
+        tree = load_tree(deck)
+        b = os.path.join(os.path.dirname(deck), "mesh", "b.k")
+        with open(b, "r+") as f:
+            text = f.read()
+            f.seek(0)
+            f.write("$ a longer comment\n" + text)
+        list(tree.distinct_blocks())
+        assert "changed while it was read" in caplog.text
+
+
+# ---------------------------------------------------------------------------
+# Problems
+# ---------------------------------------------------------------------------
+
+class TestProblems:
+
+    def test_missing_include(self, tmp_path, caplog):
+        master = tmp_path / "master.k"
+        master.write_text(f"*INCLUDE\nnot_there.k\n*NODE\n{node_line(1)}\n")
+        keywords = list(DynaKeywordReader(str(master), follow_include=True).keywords())
+        assert _nids(keywords) == [1] and len(keywords) == 1
+        assert "Include file not found" in caplog.text
+
+    def test_cycle(self, tmp_path, caplog):
+        (tmp_path / "a.k").write_text(f"*NODE\n{node_line(1)}\n*INCLUDE\nb.k\n")
+        (tmp_path / "b.k").write_text(f"*NODE\n{node_line(2)}\n*INCLUDE\na.k\n")
+        keywords = list(DynaKeywordReader(str(tmp_path / "a.k"), follow_include=True).keywords())
+        assert _nids(keywords) == [1, 2]
+        assert "Include cycle" in caplog.text
+
+    def test_other_include_keywords_kept(self, tmp_path):
+        master = tmp_path / "master.k"
+        master.write_text("*INCLUDE_PATH\n/lib\n*END\n")
+        keywords = list(DynaKeywordReader(str(master), follow_include=True).keywords())
+        assert "*INCLUDE_PATH\n/lib\n" in source_text(keywords)
+
+    def test_missing_master(self, tmp_path, caplog):
+        dkr = DynaKeywordReader(str(tmp_path / "missing.k"), follow_include=True)
+        assert list(dkr.keywords()) == [] and dkr.index() == []
+        assert "File not found" in caplog.text
+
+
+# ---------------------------------------------------------------------------
+# Other reading modes
+# ---------------------------------------------------------------------------
+
+class TestModes:
+
+    def test_workers(self, deck):
+        serial = list(DynaKeywordReader(deck, follow_include=True).keywords())
+        parallel = list(DynaKeywordReader(deck, follow_include=True, workers=2).keywords())
+        assert source_text(parallel) == source_text(serial)
+        assert parallel[2] is parallel[4]
+
+    def test_lazy(self, deck):
+        keywords = list(DynaKeywordReader(deck, follow_include=True, lazy=True).keywords())
+        assert not keywords[1].materialized
+        assert _nids(keywords) == [1, 100, 2, 100, 3]
+
+    def test_streaming(self, deck):
+        dkr = DynaKeywordReader(deck, follow_include=True)
+        assert _nids(dkr.iter_keywords(retain=False)) == [1, 100, 2, 100, 3]
+        assert dkr._include_files == []
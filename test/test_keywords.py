@@ -38,8 +38,8 @@ class TestKeywords:
         # Read the keyword file
         dkw = DynaKeywordReader(str(keyword_file))
 
-        # Write to results directory
-        dkw.write(str(new_file))
+        # Write to results directory, from the cards of every keyword
+        dkw.write(str(new_file), reformat=True)
 
         # Compare with reference file
         assert reference_file.exists(
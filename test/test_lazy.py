@@ -0,0 +1,142 @@
+"""Lazy reading.
+
+With ``DynaKeywordReader(..., lazy=True)`` a keyword keeps the text of its
+block and parses it the first time ``cards`` is accessed.  A deck can then be
+scanned, or copied with a few keywords edited, without paying for the cards of
+every keyword in it.
+
+Covers:
+- Nothing is parsed until ``cards`` is touched, and then it matches eager reading
+- Untouched keywords are written back verbatim, comments and spacing included
+- Touched and edited keywords are written from their cards
+- A block that fails to parse is logged and kept verbatim
+- ``deferred``/``materialized``/``write_source`` on a keyword
+"""
+
+import glob
+import io
+import logging
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.keywords.NODE import Node
+
+
+DECK = """\
+*KEYWORD
+*NODE
+$#   nid               x               y               z      tc      rc
+       1             0.0             0.0             0.0       0       0
+       2            1.0              0.0             0.0       0       0
+*MAT_ELASTIC
+$#     mid        ro         e        pr        da        db  not used
+         1    7.85-9  210000.0       0.3       0.0       0.0         0
+*END
+"""
+
+
+@pytest.fixture
+def deck(tmp_path):
+    path = tmp_path / "deck.k"
+    path.write_text(DECK)
+    return str(path)
+
+
+def _write(reader, tmp_path, name="out.k"):
+    out = tmp_path / name
+    reader.write(str(out))
+    return out.read_text()
+
+
+# ---------------------------------------------------------------------------
+# Deferred parsing
+# ---------------------------------------------------------------------------
+
+class TestDeferred:
+
+    def test_nothing_parsed_on_read(self, deck):
+        kws = list(DynaKeywordReader(deck, lazy=True).keywords())
+        node = kws[1]
+        assert node.type == KeywordType.NODE
+        assert not node.materialized
+
+    def test_cards_parse_on_access(self, deck):
+        node = DynaKeywordReader(deck, lazy=True).find_keywords(KeywordType.NODE)[0]
+        assert list(node.cards['Card 1']['NID']) == [1, 2]
+        assert node.materialized
+
+    @pytest.mark.parametrize("path", sorted(glob.glob("test/full_files/*.k")))
+    def test_matches_eager_reading(self, path, tmp_path):
+        eager = DynaKeywordReader(path)
+        lazy = DynaKeywordReader(path, lazy=True)
+        for kw in lazy.keywords():
+            kw.cards
+        assert _write(lazy, tmp_path, "lazy.k") == _write(eager, tmp_path, "eager.k")
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+class TestWrite:
+
+    def test_untouched_deck_is_verbatim(self, deck, tmp_path):
+        out = _write(DynaKeywordReader(deck, lazy=True), tmp_path)
+        assert out == DECK
+
+    def test_edited_keyword_is_reformatted(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck, lazy=True)
+        node = dkr.find_keywords(KeywordType.NODE)[0]
+        node.cards['Card 1']['X'][1] = 2.0
+        out = _write(dkr, tmp_path)
+
+        assert "$#     mid        ro         e" in out      # untouched, verbatim
+        reread = DynaKeywordReader(str(tmp_path / "out.k"))
+        assert reread.find_keywords(KeywordType.NODE)[0].cards['Card 1']['X'][1] == 2.0
+
+    def test_parse_failure_is_kept_verbatim(self, tmp_path, caplog):
+        bad = "*NODE\n       1     not-a-number\n"
+        path = tmp_path / "bad.k"
+        path.write_text(bad)
+        dkr = DynaKeywordReader(str(path), lazy=True)
+        node = next(dkr.keywords())
+
+        with caplog.at_level(logging.ERROR):
+            assert node.cards == {}
+        assert "*NODE" in caplog.text
+        assert _write(dkr, tmp_path) == bad
+
+
+# ---------------------------------------------------------------------------
+# The keyword API
+# ---------------------------------------------------------------------------
+
+class TestKeyword:
+
+    LINES = ["*NODE", "$ comment", "       7             1.5"]
+
+    def test_deferred(self):
+        node = Node.deferred("*NODE", self.LINES)
+        assert not node.materialized
+        assert node.cards['Card 1']['NID'][0] == 7
+
+    def test_write_source(self):
+        node = Node.deferred("*NODE", self.LINES)
+        buf = io.StringIO()
+        node.write_source(buf)
+        assert buf.getvalue() == "\n".join(self.LINES) + "\n"
+
+    def test_assigning_cards_materializes(self):
+        node = Node.deferred("*NODE", self.LINES)
+        node.cards = {}
+        assert node.materialized
+        buf = io.StringIO()
+        node.write_source(buf)
+        assert "comment" not in buf.getvalue()
+
+    def test_eager_keyword_is_materialized(self):
+        node = Node("*NODE", [line for line in self.LINES if not line.startswith("$")])
+        assert node.materialized
+        assert node.cards['Card 1']['NID'][0] == 7
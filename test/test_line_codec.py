@@ -0,0 +1,102 @@
+"""Compiled card layouts.
+
+A ``LineCodec`` holds everything that depends only on a card layout -- slice
+offsets, converters, field writers, the header line -- so that reading and
+writing a line does not rebuild them.  These tests pin that a codec is built
+once and shared, and that it reads and writes exactly as the per-field
+``FormatParser`` methods do.
+
+Covers:
+- ``CardSchema.codec`` is built once and is the codec ``parse_line`` uses
+- ``parse_line``/``parse_comma_line`` agreement with the ``FormatParser`` API
+- ``format_row``/``format_rows`` agreement with ``format_field``
+- The precomputed header line
+"""
+
+import numpy as np
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw.core.card_schema import CardField, CardSchema
+from dynakw.core.parameter_ref import ParameterRef
+from dynakw.keywords.NODE import Node
+from dynakw.utils.format_parser import FormatParser
+
+
+@pytest.fixture
+def fp():
+    return FormatParser()
+
+
+@pytest.fixture
+def schema():
+    return CardSchema("Card 1", [
+        CardField("EID", "I", width=8),
+        CardField("T", "F", width=16, header_name="thick"),
+        CardField("NAME", "A", width=10),
+    ], repeating=True, write_header=True)
+
+
+class TestSharing:
+
+    def test_schema_codec_is_built_once(self, schema):
+        assert schema.codec is schema.codec
+
+    def test_schema_and_parse_line_share_a_codec(self, fp):
+        node = Node.card_schemas[0]
+        types = [f.type for f in node.fields]
+        widths = [f.width for f in node.fields]
+        assert fp.codec(types, widths, header_names=[
+            f.header_name or f.name for f in node.fields]) is node.codec
+
+    def test_every_parser_shares_codecs(self):
+        assert FormatParser().codec(["I", "F"]) is FormatParser().codec(["I", "F"])
+
+    def test_spans(self, schema):
+        assert schema.codec.spans == ((0, 8), (8, 24), (24, 34))
+        assert schema.codec.width == 34
+
+
+class TestReading:
+
+    @pytest.mark.parametrize("line", [
+        "       1          0.0025      shell",
+        "       2         8.900-3",
+        "       3           &thk",
+        "4, 1.5, abc",
+        "",
+    ])
+    def test_parse_line_agrees(self, fp, schema, line):
+        types = [f.type for f in schema.fields]
+        widths = [f.width for f in schema.fields]
+        assert schema.codec.parse_line(line) == fp.parse_line(line, types, field_len=widths)
+
+    def test_default_value(self, schema):
+        assert schema.codec.parse_line("       1", default_value=None) == [1, None, None]
+
+    def test_parameter_ref(self, schema):
+        assert schema.codec.parse_line("       1           &thk")[1] == ParameterRef("thk")
+
+
+class TestWriting:
+
+    VALUES = [[1, 0.0025, "shell"], [2, 7.85e-9, None], [3, ParameterRef("t"), "x"]]
+
+    def test_format_row_agrees(self, fp, schema):
+        for row in self.VALUES:
+            expected = "".join(fp.format_field(v, f.type, field_len=f.width)
+                               for v, f in zip(row, schema.fields))
+            assert schema.codec.format_row(row) == expected
+
+    def test_format_rows_from_columns(self, schema):
+        columns = [np.array([1, 2], dtype=np.int32),
+                   np.array([0.5, 2.1e11]),
+                   np.array(["a", "b"], dtype=object)]
+        rows = schema.codec.format_rows(columns)
+        assert rows == [schema.codec.format_row([1, 0.5, "a"]) + "\n",
+                        schema.codec.format_row([2, 2.1e11, "b"]) + "\n"]
+
+    def test_header(self, fp, schema):
+        assert schema.codec.header == fp.format_header(
+            ["EID", "thick", "NAME"], field_len=[8, 16, 10])
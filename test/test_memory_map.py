@@ -0,0 +1,114 @@
+"""Memory-mapped reading.
+
+By default the reader finds keyword blocks in a memory map of the file and
+decodes a block only when it is parsed.  It has to read exactly what reading
+the file line by line as text gave.
+
+Covers:
+- Agreement with text reading: keywords, output and line numbers, for line
+  ends, missing final newline, text before the first keyword, bad bytes
+- ``map_blocks`` block boundaries and line offsets
+- Lazy keywords keep the block as bytes, and the source file can be
+  overwritten while they are alive
+- Empty and missing files
+"""
+
+import glob
+import io
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core.block_index import map_blocks
+
+
+NODE = b"       1             0.0             0.0             0.0       0       0"
+
+DECKS = {
+    "plain": b"*KEYWORD\n*NODE\n" + NODE + b"\n*END\n",
+    "crlf": b"*KEYWORD\r\n*NODE\r\n$ comment\r\n" + NODE + b"\r\n*END\r\n",
+    "no_final_newline": b"*NODE\n" + NODE,
+    "leading_text": b"title line\n$ comment\n*NODE\n" + NODE + b"\n",
+    "bad_bytes": b"*KEYWORD\n$ caf\xe9\n*NODE\n" + NODE + b"\n*TITLE\nna\xffme\n",
+    "trailing_blanks": b"*NODE   \n" + NODE + b"   \n\n\n",
+    "no_keywords": b"just text\n",
+}
+
+
+def _read(path, **kwargs):
+    dkr = DynaKeywordReader(str(path), **kwargs)
+    keywords = list(dkr.keywords())
+    out = io.StringIO()
+    for kw in keywords:
+        kw.write_source(out)
+    return out.getvalue(), [kw._start_line for kw in keywords]
+
+
+# ---------------------------------------------------------------------------
+# Agreement with reading as text
+# ---------------------------------------------------------------------------
+
+class TestAgreement:
+
+    @pytest.mark.parametrize("name", sorted(DECKS))
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_crafted(self, tmp_path, name, lazy):
+        path = tmp_path / f"{name}.k"
+        path.write_bytes(DECKS[name])
+        assert _read(path, lazy=lazy) == _read(path, lazy=lazy, memory_map=False)
+
+    @pytest.mark.parametrize("path", sorted(glob.glob("test/full_files/*.k")))
+    def test_full_files(self, path):
+        assert _read(path) == _read(path, memory_map=False)
+
+    def test_crlf_values(self, tmp_path):
+        path = tmp_path / "crlf.k"
+        path.write_bytes(DECKS["crlf"])
+        node = DynaKeywordReader(str(path)).find_keywords(KeywordType.NODE)[0]
+        assert node.cards['Card 1']['NID'][0] == 1
+
+
+# ---------------------------------------------------------------------------
+# Blocks
+# ---------------------------------------------------------------------------
+
+class TestMapBlocks:
+
+    def test_blocks(self, tmp_path):
+        path = tmp_path / "deck.k"
+        path.write_bytes(DECKS["leading_text"] + b"*END")
+        blocks = list(map_blocks(str(path)))
+        assert [data for data, _ in blocks] == [b"*NODE\n" + NODE + b"\n", b"*END"]
+        assert [offset for _, offset in blocks] == [2, 4]
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "empty.k"
+        path.write_bytes(b"")
+        assert list(map_blocks(str(path))) == []
+        assert list(DynaKeywordReader(str(path)).keywords()) == []
+
+    def test_missing_file(self, tmp_path, caplog):
+        assert list(DynaKeywordReader(str(tmp_path / "missing.k")).keywords()) == []
+        assert "File not found" in caplog.text
+
+
+# ---------------------------------------------------------------------------
+# Lazy keywords
+# ---------------------------------------------------------------------------
+
+class TestLazy:
+
+    def test_block_kept_as_bytes(self, tmp_path):
+        path = tmp_path / "deck.k"
+        path.write_bytes(DECKS["plain"])
+        node = DynaKeywordReader(str(path), lazy=True).keyword_at(1)
+        assert isinstance(node._source, bytes)
+        assert node.cards['Card 1']['NID'][0] == 1
+
+    def test_overwrite_source(self, tmp_path):
+        path = tmp_path / "deck.k"
+        path.write_bytes(DECKS["crlf"])
+        dkr = DynaKeywordReader(str(path), lazy=True)
+        dkr.write(str(path))
+        assert path.read_bytes() == DECKS["crlf"]
@@ -0,0 +1,183 @@
+"""The nodes of a deck in one table.
+
+``DynaKeywordReader.node_table()`` puts the nodes of every ``*NODE`` keyword
+into one ``NodeTable`` (see ``dynakw.core.mesh_tables``): the IDs, the
+coordinates as a contiguous ``(n, 3)`` array, and a lookup from ID to row.
+
+Covers:
+- The arrays, in deck order across keywords and include files; ``offsets``
+- Lookups: dense and sorted indexes, shapes, missing IDs, repeated IDs
+- The table kept while the nodes are unchanged, and built again after a
+  change in place, an assigned column, or a new ``*NODE`` keyword
+- Decks without nodes, keywords without node columns, parameters
+"""
+
+import numpy as np
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType, NodeTable
+from dynakw.keywords.NODE import Node
+
+
+def _node(i, x=0.0):
+    return f"{i:8d}{x:16.6f}{-x:16.6f}{2 * x:16.6f}{0:8d}{0:8d}"
+
+
+def _deck(*blocks):
+    return ("*KEYWORD\n"
+            + "".join("*NODE\n" + "".join(_node(i, x) + "\n" for i, x in block)
+                      for block in blocks)
+            + "*END\n").encode()
+
+
+@pytest.fixture
+def dkr():
+    return DynaKeywordReader(_deck([(1, 0.5), (2, 1.5), (3, 2.5)], [(10, 3.0), (11, 4.0)]))
+
+
+# ---------------------------------------------------------------------------
+# The table
+# ---------------------------------------------------------------------------
+
+class TestTable:
+
+    def test_arrays(self, dkr):
+        nodes = dkr.node_table()
+        assert len(nodes) == 5
+        assert nodes.ids.tolist() == [1, 2, 3, 10, 11]
+        assert nodes.coords.shape == (5, 3)
+        assert nodes.coords.flags.c_contiguous
+        assert nodes.coords[3].tolist() == [3.0, -3.0, 6.0]
+        assert nodes.offsets.tolist() == [0, 3, 5]
+
+    def test_read_only(self, dkr):
+        nodes = dkr.node_table()
+        with pytest.raises(ValueError):
+            nodes.coords[0, 0] = 1.0
+
+    def test_include_files(self, tmp_path):
+        (tmp_path / "mesh.k").write_bytes(_deck([(5, 1.0), (6, 2.0)]))
+        (tmp_path / "master.k").write_bytes(
+            _deck([(1, 0.0)])[:-5] + b"*INCLUDE\nmesh.k\n*NODE\n" + _node(7).encode() + b"\n*END\n")
+        dkr = DynaKeywordReader(str(tmp_path / "master.k"), follow_include=True)
+        assert dkr.node_table().ids.tolist() == [1, 5, 6, 7]
+
+    def test_sample(self):
+        dkr = DynaKeywordReader("test/full_files/sample.k")
+        nodes = dkr.node_table()
+        keywords = dkr.find_keywords(KeywordType.NODE)
+        assert len(nodes) == sum(len(kw.cards['Card 1']['NID']) for kw in keywords)
+        card = keywords[-1].cards['Card 1']
+        assert nodes.coordinates(card['NID']).tolist() == np.stack(
+            (card['X'], card['Y'], card['Z']), axis=1).tolist()
+
+
+# ---------------------------------------------------------------------------
+# Lookups
+# ---------------------------------------------------------------------------
+
+class TestLookup:
+
+    def test_dense(self, dkr):
+        nodes = dkr.node_table()
+        assert nodes.rows([11, 1, 3]).tolist() == [4, 0, 2]
+        assert nodes._index.dense is not None
+
+    def test_sorted(self):
+        nodes = DynaKeywordReader(_deck([(1000000, 1.0), (5, 2.0), (70000, 3.0)])).node_table()
+        assert nodes.rows([5, 1000000, 70000]).tolist() == [1, 0, 2]
+        assert nodes._index.dense is None
+
+    def test_shape(self, dkr):
+        nodes = dkr.node_table()
+        assert nodes.rows(np.array([[1, 2], [10, 11]])).tolist() == [[0, 1], [3, 4]]
+        assert nodes.rows(10) == 3
+        assert nodes.coordinates([[1, 2]]).shape == (1, 2, 3)
+
+    @pytest.mark.parametrize("ids", [[1, 4, 12], [1, 0, 12], [1, -5, 10 ** 9]])
+    def test_missing(self, dkr, ids):
+        nodes = dkr.node_table()
+        with pytest.raises(KeyError, match="not in the deck"):
+            nodes.rows(ids)
+        assert nodes.rows(ids, default=-1)[0] == 0
+        assert (nodes.rows(ids, default=-1)[1:] == -1).all()
+
+    @pytest.mark.parametrize("spread", [1, 10 ** 6])
+    def test_repeated(self, spread, caplog):
+        nodes = DynaKeywordReader(_deck([(1, 1.0), (2 * spread, 2.0)],
+                                        [(2 * spread, 3.0)])).node_table()
+        assert nodes.coordinates(2 * spread)[0] == 2.0
+        assert "defined more than once" in caplog.text
+
+    def test_empty(self):
+        nodes = DynaKeywordReader(b"*KEYWORD\n*END\n").node_table()
+        assert len(nodes) == 0 and nodes.coords.shape == (0, 3)
+        assert nodes.rows([1], default=-1).tolist() == [-1]
+        with pytest.raises(KeyError):
+            nodes.rows([1])
+
+
+# ---------------------------------------------------------------------------
+# Keeping the table
+# ---------------------------------------------------------------------------
+
+class TestCurrent:
+
+    def test_kept(self, dkr):
+        assert dkr.node_table() is dkr.node_table()
+
+    def test_changed_in_place(self, dkr):
+        nodes = dkr.node_table()
+        dkr.find_keywords(KeywordType.NODE)[1].cards['Card 1']['X'][0] = 9.0
+        assert not nodes.is_current()
+        assert dkr.node_table().coordinates(10)[0] == 9.0
+
+    def test_column_assigned(self, dkr):
+        nodes = dkr.node_table()
+        card = dkr.find_keywords(KeywordType.NODE)[0].cards['Card 1']
+        card['NID'] = card['NID'] + 100
+        assert dkr.node_table() is not nodes
+        assert dkr.node_table().ids.tolist() == [101, 102, 103, 10, 11]
+
+    def test_other_columns(self, dkr):
+        nodes = dkr.node_table()
+        dkr.find_keywords(KeywordType.NODE)[0].cards['Card 1']['TC'][0] = 7
+        assert dkr.node_table() is nodes
+
+    def test_new_keyword(self, dkr):
+        list(dkr.keywords())
+        nodes = dkr.node_table()
+        dkr._keywords.insert(1, Node("*NODE", ["*NODE", _node(50, 1.0)]))
+        assert dkr.node_table() is not nodes
+        assert dkr.node_table().ids.tolist() == [50, 1, 2, 3, 10, 11]
+
+    def test_lazy(self):
+        dkr = DynaKeywordReader(_deck([(1, 0.5)]), lazy=True)
+        assert dkr.node_table().ids.tolist() == [1]
+        assert not dkr.find_keywords(KeywordType.NODE)[0].modified
+
+
+# ---------------------------------------------------------------------------
+# Keywords the table cannot take whole
+# ---------------------------------------------------------------------------
+
+class TestOdd:
+
+    def test_without_node_columns(self, caplog):
+        broken = Node("*NODE", ["*NODE", _node(1)])
+        broken.cards['Card 1'] = {}
+        nodes = NodeTable([broken, Node("*NODE", ["*NODE", _node(2, 1.0)])])
+        assert nodes.ids.tolist() == [2]
+        assert nodes.offsets.tolist() == [0, 0, 1]
+        assert "without its node columns" in caplog.text
+        assert nodes.is_current()
+
+    def test_parameters(self, caplog):
+        nodes = NodeTable([Node("*NODE", ["*NODE", f"{1:8d}{'&xpos':>16}{0.0:16.6f}{0.0:16.6f}"]),
+                           Node("*NODE", ["*NODE", f"{'&nid':>8}{0.0:16.6f}{0.0:16.6f}{0.0:16.6f}"])])
+        assert nodes.ids.tolist() == [1]
+        assert np.isnan(nodes.coords[0, 0]) and nodes.coords[0, 1] == 0.0
+        assert "given by parameters" in caplog.text
+        assert nodes.is_current()
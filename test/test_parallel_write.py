@@ -0,0 +1,177 @@
+"""Writing in worker processes.
+
+``DynaKeywordReader.write(..., workers=N)`` formats the keywords in a pool of
+N processes and writes their text in deck order, between the blocks copied
+from the file.  Within ``parallel_rows``, ``LineCodec.format_rows`` and
+``format_block`` write a large card a chunk of rows at a time.  The file has
+to be the one the serial writer gives.
+
+Covers:
+- Agreement with serial writing on the full files, in one batch and in many
+- Changed keywords among copied blocks, decks made in code
+- A large keyword written in chunks of rows, separate and grouped cards
+- Errors while writing, and keywords that cannot be sent to a worker
+- ``awrite`` with workers
+"""
+
+import asyncio
+import glob
+import io
+import numpy as np
+import pytest
+import sys
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core import keyword_file
+from dynakw.keywords.ELEMENT_SHELL import ElementShell
+from dynakw.keywords.NODE import Node
+from dynakw.utils.format_parser import FormatParser, parallel_rows
+
+
+def _node_line(i):
+    return f"{i:8d}{i * 0.5:16.6f}{-i * 0.25:16.6f}{1.0:16.6f}{0:8d}{0:8d}"
+
+
+def _written(dkr, tmp_path, name, **kwargs):
+    out = tmp_path / name
+    dkr.write(str(out), **kwargs)
+    return out.read_bytes()
+
+
+def _both(dkr, tmp_path, **kwargs):
+    """The file written serially and with two workers."""
+    return (_written(dkr, tmp_path, "serial.k", **kwargs),
+            _written(dkr, tmp_path, "workers.k", workers=2, **kwargs))
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    """One keyword per batch, so that many batches are in flight."""
+    monkeypatch.setattr(keyword_file, "_WORKER_BATCH_BYTES", 1)
+
+
+@pytest.fixture
+def row_chunks(monkeypatch):
+    """Keywords of a few hundred rows written in chunks of 50."""
+    monkeypatch.setattr(keyword_file, "_ROW_SPLIT_BYTES", 10_000)
+    monkeypatch.setattr(keyword_file, "_ROW_CHUNK_LINES", 50)
+
+
+@pytest.fixture
+def mesh(tmp_path):
+    path = tmp_path / "mesh.k"
+    path.write_text("*KEYWORD\n*NODE\n" + "".join(_node_line(i) + "\n" for i in range(1, 501))
+                    + "*ELEMENT_SHELL\n"
+                    + "".join(f"{i:8d}{1:8d}{i:8d}{i + 1:8d}{i + 2:8d}{i + 3:8d}\n"
+                              for i in range(1, 301))
+                    + "*END\n")
+    return str(path)
+
+
+# ---------------------------------------------------------------------------
+# Agreement with serial writing
+# ---------------------------------------------------------------------------
+
+class TestAgreement:
+
+    @pytest.mark.parametrize("path", sorted(glob.glob("test/full_files/*.k")))
+    def test_full_files(self, path, tmp_path):
+        serial, workers = _both(DynaKeywordReader(path), tmp_path, reformat=True)
+        assert workers == serial
+
+    def test_many_batches(self, small_batches, tmp_path):
+        serial, workers = _both(DynaKeywordReader("test/full_files/sample.k"), tmp_path,
+                                reformat=True)
+        assert workers == serial
+
+    def test_unchanged(self, tmp_path):
+        path = "test/full_files/sample.k"
+        serial, workers = _both(DynaKeywordReader(path), tmp_path)
+        assert workers == serial
+
+    def test_changed_among_copied(self, mesh, small_batches, tmp_path):
+        dkr = DynaKeywordReader(mesh)
+        dkr.find_keywords(KeywordType.NODE)[0].cards['Card 1']['X'][3] = 7.25
+        serial, workers = _both(dkr, tmp_path)
+        assert workers == serial
+        assert b"*ELEMENT_SHELL\n       1" in workers
+
+    def test_made_in_code(self, tmp_path):
+        dkr = DynaKeywordReader(b"*KEYWORD\n*END\n")
+        list(dkr.keywords())
+        dkr._keywords.insert(1, Node("*NODE", ["*NODE", _node_line(1), _node_line(2)]))
+        serial, workers = _both(dkr, tmp_path)
+        assert workers == serial
+        assert serial.count(b"\n") == 5
+
+
+# ---------------------------------------------------------------------------
+# Chunks of rows
+# ---------------------------------------------------------------------------
+
+class TestRowChunks:
+
+    def test_large_keywords(self, mesh, row_chunks, tmp_path):
+        serial, workers = _both(DynaKeywordReader(mesh), tmp_path, reformat=True)
+        assert workers == serial
+
+    def test_format_block(self):
+        codec = FormatParser().codec(["I", "F", "A"], [8, 16, 10])
+        columns = [np.arange(1000), np.linspace(-1e-9, 1e9, 1000),
+                   np.array([f"n{i}" for i in range(1000)], dtype=object)]
+        expected = codec.format_rows(columns)
+        with ThreadPoolExecutor(2) as executor, parallel_rows(executor, 64):
+            assert codec.format_rows(columns) == expected
+            assert codec.format_block(columns) == "".join(expected)
+
+    def test_grouped_cards(self):
+        lines = [f"{i:8d}{1:8d}{i:8d}{i + 1:8d}{i + 2:8d}{i + 3:8d}" for i in range(1, 201)]
+        shell = ElementShell("*ELEMENT_SHELL_THICKNESS", ["*ELEMENT_SHELL_THICKNESS"] + [
+            line for pair in zip(lines, [f"{1.0:16.3f}" * 4] * 200) for line in pair])
+        expected = io.StringIO()
+        shell.write(expected)
+        out = io.StringIO()
+        with ThreadPoolExecutor(2) as executor, parallel_rows(executor, 16):
+            shell.write(out)
+        assert out.getvalue() == expected.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Failures
+# ---------------------------------------------------------------------------
+
+class TestFailures:
+
+    def test_error_is_logged(self, tmp_path, caplog):
+        dkr = DynaKeywordReader("test/full_files/sample.k")
+        list(dkr.keywords())
+        broken = Node("*NODE", ["*NODE", _node_line(1)])
+        broken.cards['Card 1']['X'] = 5
+        dkr._keywords.insert(1, broken)
+        serial, workers = _both(dkr, tmp_path)
+        assert workers == serial
+        assert caplog.text.count("writing:") == 2
+
+    def test_unpicklable_keyword(self, tmp_path):
+        dkr = DynaKeywordReader("test/full_files/sample.k")
+        list(dkr.keywords())
+        node = Node("*NODE", ["*NODE", _node_line(1)])
+        node.handle = lambda: None
+        dkr._keywords.insert(1, node)
+        serial, workers = _both(dkr, tmp_path)
+        assert workers == serial
+
+
+# ---------------------------------------------------------------------------
+# awrite
+# ---------------------------------------------------------------------------
+
+class TestAsync:
+
+    def test_awrite(self, mesh, tmp_path):
+        a, b = str(tmp_path / "a.k"), str(tmp_path / "b.k")
+        DynaKeywordReader(mesh).write(a, reformat=True)
+        asyncio.run(DynaKeywordReader(mesh).awrite(b, reformat=True, workers=2))
+        assert open(a).read() == open(b).read()
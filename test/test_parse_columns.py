@@ -0,0 +1,168 @@
+"""Bulk column parsing of repeating cards.
+
+``FormatParser.parse_columns`` converts all lines of a repeating card at once,
+column by column, instead of calling ``parse_line`` on every line.  It has to
+give exactly what the per-line path gave, including for the lines it cannot
+take in bulk and hands back to ``parse_line``.
+
+Covers:
+- Agreement with ``parse_line`` on ordinary fixed-width rows, blank fields and
+  short lines
+- Rows that fall back to ``parse_line``: comma-separated, ``&VAR`` references,
+  exponents written without their E; blank fields of a column widened by a
+  ``&VAR``
+- String columns, dtypes, empty input
+- A numeric column holding text still raises, as casting the per-line results did
+"""
+
+import numpy as np
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw.core.parameter_ref import ParameterRef
+from dynakw.utils.format_parser import FormatParser
+
+
+NODE_TYPES = ["I", "F", "F", "F", "I", "I"]
+NODE_WIDTHS = [8, 16, 16, 16, 8, 8]
+
+
+@pytest.fixture
+def fp():
+    return FormatParser()
+
+
+def _per_line(fp, lines, types, widths):
+    """What parse_columns must reproduce: parse_line per row, then a cast."""
+    rows = [fp.parse_line(line, types, field_len=widths) for line in lines]
+    return fp.codec(types, widths).rows_to_columns(rows)
+
+
+def _assert_same(got, expected):
+    assert len(got) == len(expected)
+    for g, e in zip(got, expected):
+        assert g.dtype == e.dtype
+        assert list(g) == list(e)
+        assert [type(v) for v in g] == [type(v) for v in e]
+
+
+# ---------------------------------------------------------------------------
+# Agreement with parse_line
+# ---------------------------------------------------------------------------
+
+class TestAgreement:
+
+    LINES = [
+        "       1             0.0             0.0             0.0       0       0",
+        "       2       -21.93931     1.254000E-4         2.1e+11       7       3",
+        "       3             1.5",                              # short line
+        "                     2.0                                             ",
+        "12345678          -0.125             .5              5.       4       1",
+        "",                                                      # blank line
+    ]
+
+    def test_matches_parse_line(self, fp):
+        got = fp.parse_columns(self.LINES, NODE_TYPES, field_len=NODE_WIDTHS)
+        _assert_same(got, _per_line(fp, self.LINES, NODE_TYPES, NODE_WIDTHS))
+
+    def test_dtypes(self, fp):
+        got = fp.parse_columns(self.LINES, NODE_TYPES, field_len=NODE_WIDTHS)
+        assert [c.dtype for c in got] == [np.int32, np.float64, np.float64,
+                                          np.float64, np.int32, np.int32]
+
+    def test_every_line_is_a_row(self, fp):
+        got = fp.parse_columns(self.LINES, NODE_TYPES, field_len=NODE_WIDTHS)
+        assert len(got[0]) == len(self.LINES)
+
+    def test_float_formatted_integer(self, fp):
+        got = fp.parse_columns(["4.000E+00 0.0000000"], ["I", "I"])
+        assert list(got[0]) == [4] and list(got[1]) == [0]
+
+    def test_empty_input(self, fp):
+        got = fp.parse_columns([], NODE_TYPES, field_len=NODE_WIDTHS)
+        assert [len(c) for c in got] == [0] * 6
+        assert got[0].dtype == np.int32 and got[1].dtype == np.float64
+
+
+# ---------------------------------------------------------------------------
+# Rows handed back to parse_line
+# ---------------------------------------------------------------------------
+
+class TestLineFallback:
+
+    def test_comma_rows_mixed_with_fixed_width(self, fp):
+        lines = [
+            "       1             1.0             2.0             3.0",
+            "2, 4.0, 5.0, 6.0",
+            "       3             7.0             8.0             9.0",
+        ]
+        got = fp.parse_columns(lines, NODE_TYPES, field_len=NODE_WIDTHS)
+        _assert_same(got, _per_line(fp, lines, NODE_TYPES, NODE_WIDTHS))
+        assert list(got[0]) == [1, 2, 3]
+        assert got[1][1] == 4.0
+
+    def test_exponent_without_e(self, fp):
+        lines = [
+            "       1         8.900-3             1.0            -2.5",
+            "       2             1.0       -1.2345+2             0.0",
+        ]
+        got = fp.parse_columns(lines, NODE_TYPES, field_len=NODE_WIDTHS)
+        _assert_same(got, _per_line(fp, lines, NODE_TYPES, NODE_WIDTHS))
+        assert got[1][0] == pytest.approx(8.9e-3)
+        assert got[2][1] == pytest.approx(-1.2345e2)
+
+    def test_parameter_ref_widens_only_its_column(self, fp):
+        lines = [
+            "       1             1.0             2.0             3.0",
+            "       2           &xpos             5.0             6.0",
+        ]
+        got = fp.parse_columns(lines, NODE_TYPES, field_len=NODE_WIDTHS)
+        assert got[1].dtype == object
+        assert got[1][1] == ParameterRef("xpos")
+        assert got[1][0] == 1.0
+        assert got[2].dtype == np.float64
+
+    def test_parameter_ref_with_blank_fields(self, fp):
+        lines = [
+            "      &n           &xpos             2.0             3.0",
+            "                                     5.0             6.0",
+            "       3            2.25",
+            "       4         8.900-3",
+        ]
+        got = fp.parse_columns(lines, NODE_TYPES, field_len=NODE_WIDTHS)
+        _assert_same(got, _per_line(fp, lines, NODE_TYPES, NODE_WIDTHS))
+        assert got[0].tolist()[1:] == [0, 3, 4]
+        assert [type(v) for v in got[1][1:]] == [int, float, float]
+
+    def test_all_rows_by_line(self, fp):
+        lines = ["1, 1.0", "2, 2.0"]
+        got = fp.parse_columns(lines, NODE_TYPES, field_len=NODE_WIDTHS)
+        _assert_same(got, _per_line(fp, lines, NODE_TYPES, NODE_WIDTHS))
+
+    def test_non_ascii_line(self, fp):
+        lines = ["         1  été", "         2  ete"]
+        got = fp.parse_columns(lines, ["I", "A"])
+        assert list(got[1]) == ["été", "ete"]
+
+
+# ---------------------------------------------------------------------------
+# String columns and errors
+# ---------------------------------------------------------------------------
+
+class TestStringsAndErrors:
+
+    def test_string_column_blank_is_default(self, fp):
+        lines = ["   Rlength      10.5", "                 2.0"]
+        got = fp.parse_columns(lines, ["A", "F"])
+        _assert_same(got, _per_line(fp, lines, ["A", "F"], None))
+        assert got[0][0] == "Rlength"
+        assert got[0][1] == 0
+
+    def test_text_in_numeric_column_raises(self, fp):
+        with pytest.raises(ValueError):
+            fp.parse_columns(["foo bar baz"], NODE_TYPES, field_len=NODE_WIDTHS)
+
+    def test_field_len_mismatch(self, fp):
+        with pytest.raises(ValueError):
+            fp.parse_columns(["1"], ["I", "I"], field_len=[8])
@@ -0,0 +1,224 @@
+"""Writing unchanged keywords as they were read.
+
+A keyword read from a file remembers where its block is, and whether it
+was changed since (``modified``).  ``DynaKeywordReader.write`` copies the
+blocks of unchanged keywords from the file and formats only the others.
+
+Covers:
+- An unchanged deck is written back byte for byte, eager, lazy and in workers
+- ``modified``: cards changed in place or assigned, the keyword line, shared copies
+- Only the changed keyword is formatted; the others keep their text
+- A file changed since it was read is not copied from
+- Writing over the file read, includes, compressed files, decks in memory, the cache
+- ``reformat=True`` formats every keyword
+"""
+
+import gzip
+import io
+import os
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.keywords.NODE import Node
+
+
+NODE_1 = "       1             0.0             0.0             0.0       0       0"
+NODE_2 = "       2           1.0               0.0             0.0       0       0"
+
+DECK = (
+    "*KEYWORD\r\n"
+    "*NODE\r\n"
+    "$#   nid               x               y               z      tc      rc\r\n"
+    f"{NODE_1}   \r\n"
+    f"{NODE_2}\r\n"
+    "\r\n"
+    "*MAT_ELASTIC\r\n"
+    "         1    7.85-9  210000.0       0.3\r\n"
+    "*MADE_UP_KEYWORD\r\n"
+    "anything at all\r\n"
+    "*END"
+).encode()
+
+
+@pytest.fixture
+def deck(tmp_path):
+    path = tmp_path / "deck.k"
+    path.write_bytes(DECK)
+    return str(path)
+
+
+def _written(dkr, tmp_path, name="out.k", **kwargs):
+    out = tmp_path / name
+    dkr.write(str(out), **kwargs)
+    return out.read_bytes()
+
+
+def _node(dkr):
+    return dkr.find_keywords(KeywordType.NODE)[0]
+
+
+# ---------------------------------------------------------------------------
+# Unchanged decks
+# ---------------------------------------------------------------------------
+
+class TestUnchanged:
+
+    @pytest.mark.parametrize("options", [{}, {"lazy": True}, {"memory_map": False},
+                                         {"workers": 2}])
+    def test_byte_for_byte(self, deck, tmp_path, options):
+        # Only the missing final newline is added.
+        assert _written(DynaKeywordReader(deck, **options), tmp_path) == DECK + b"\n"
+
+    def test_cards_read_but_not_changed(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck)
+        for kw in dkr.keywords():
+            kw.cards
+        assert _node(dkr).cards['Card 1']['X'][1] == 1.0
+        assert _written(dkr, tmp_path) == DECK + b"\n"
+
+    def test_cards_are_not_formatted(self, deck, tmp_path, monkeypatch):
+        dkr = DynaKeywordReader(deck)
+        list(dkr.keywords())
+        monkeypatch.setattr(Node, "write", None)
+        assert _written(dkr, tmp_path) == DECK + b"\n"
+
+
+# ---------------------------------------------------------------------------
+# modified
+# ---------------------------------------------------------------------------
+
+class TestModified:
+
+    def test_read_keywords_are_not_modified(self, deck):
+        assert not any(kw.modified for kw in DynaKeywordReader(deck).keywords())
+
+    def test_changed_in_place(self, deck):
+        node = _node(DynaKeywordReader(deck))
+        node.cards['Card 1']['X'][1] = 2.0
+        assert node.modified
+
+    def test_changed_back(self, deck):
+        node = _node(DynaKeywordReader(deck))
+        node.cards['Card 1']['X'][1] = 2.0
+        node.cards['Card 1']['X'][1] = 1.0
+        assert not node.modified
+
+    def test_dtype_change(self, deck):
+        node = _node(DynaKeywordReader(deck))
+        node.cards['Card 1']['NID'] = node.cards['Card 1']['NID'].astype(float)
+        assert node.modified
+
+    def test_cards_assigned(self, deck):
+        node = _node(DynaKeywordReader(deck))
+        node.cards = node.cards
+        assert node.modified
+
+    def test_keyword_line(self, deck):
+        node = _node(DynaKeywordReader(deck))
+        node.full_keyword = "*NODE_SCALAR"
+        assert node.modified
+
+    def test_lazy(self, deck):
+        node = _node(DynaKeywordReader(deck, lazy=True))
+        assert not node.modified
+        node.cards['Card 1']['NID'][0] = 5
+        assert node.modified
+
+    def test_unknown_raw_data(self, deck):
+        made_up = list(DynaKeywordReader(deck).keywords())[3]
+        assert not made_up.modified
+        made_up.raw_data = "other"
+        assert made_up.modified
+
+    def test_made_in_code(self):
+        assert Node("*NODE", ["*NODE", NODE_1]).modified
+
+    def test_shared_copy(self, deck):
+        node = _node(DynaKeywordReader(deck))
+        copy = node.shared_copy()
+        assert not copy.modified
+        copy.cards['Card 1']['NID'][0] = 5
+        assert copy.modified
+        assert not node.modified
+
+
+# ---------------------------------------------------------------------------
+# Changed decks
+# ---------------------------------------------------------------------------
+
+class TestChanged:
+
+    def test_only_the_changed_keyword_is_formatted(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck)
+        _node(dkr).cards['Card 1']['X'][1] = 2.0
+        out = _written(dkr, tmp_path)
+        assert out.startswith(b"*KEYWORD\r\n*NODE\n")
+        assert out.endswith(DECK[DECK.index(b"*MAT_ELASTIC"):] + b"\n")
+        assert _node(DynaKeywordReader(str(tmp_path / "out.k"))).cards['Card 1']['X'][1] == 2.0
+
+    def test_file_changed_since_reading(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck)
+        list(dkr.keywords())
+        with open(deck, "wb") as f:
+            f.write(DECK.replace(b"210000.0", b"999999.0"))
+        out = _written(dkr, tmp_path)
+        assert b"*MAT_ELASTIC\n" in out
+        assert b"999999.0" not in out
+        assert DynaKeywordReader(str(tmp_path / "out.k")).find_keywords(
+            KeywordType.MAT_ELASTIC)[0].cards['Card 1']['E'][0] == 210000.0
+
+    def test_file_gone(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck)
+        list(dkr.keywords())
+        os.remove(deck)
+        out = _written(dkr, tmp_path)
+        assert b"*MAT_ELASTIC\n" in out
+
+    def test_reformat(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck)
+        expected = io.StringIO()
+        for kw in dkr.keywords():
+            kw.write(expected)
+        assert _written(dkr, tmp_path, reformat=True) == expected.getvalue().encode()
+
+
+# ---------------------------------------------------------------------------
+# Where the deck comes from and goes to
+# ---------------------------------------------------------------------------
+
+class TestSources:
+
+    def test_over_the_file_read(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck)
+        _node(dkr).cards['Card 1']['NID'][0] = 9
+        os.chmod(deck, 0o640)
+        dkr.write(deck)
+        assert _node(DynaKeywordReader(deck)).cards['Card 1']['NID'][0] == 9
+        assert DECK[DECK.index(b"*MAT_ELASTIC"):] in open(deck, "rb").read()
+        assert os.stat(deck).st_mode & 0o777 == 0o640
+        assert sorted(os.listdir(tmp_path)) == ["deck.k"]
+
+    def test_includes(self, tmp_path):
+        mesh = f"*NODE\r\n{NODE_1}  \r\n".encode()
+        (tmp_path / "mesh.k").write_bytes(mesh)
+        master = tmp_path / "master.k"
+        master.write_bytes(b"*KEYWORD\n*INCLUDE\nmesh.k\n" + DECK)
+        dkr = DynaKeywordReader(str(master), follow_include=True)
+        # The include file's blocks take the place of its *INCLUDE.
+        assert _written(dkr, tmp_path) == b"*KEYWORD\n" + mesh + DECK + b"\n"
+
+    @pytest.mark.parametrize("wrap", [bytes, memoryview, io.BytesIO])
+    def test_memory(self, tmp_path, wrap):
+        assert _written(DynaKeywordReader(wrap(DECK)), tmp_path) == DECK + b"\n"
+
+    def test_compressed(self, tmp_path):
+        path = tmp_path / "deck.k.gz"
+        path.write_bytes(gzip.compress(DECK))
+        assert _written(DynaKeywordReader(str(path)), tmp_path) == DECK + b"\n"
+
+    def test_cache(self, deck, tmp_path):
+        list(DynaKeywordReader(deck, cache=True).keywords())
+        dkr = DynaKeywordReader(deck, cache=True)
+        assert _written(dkr, tmp_path) == DECK + b"\n"
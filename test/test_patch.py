@@ -0,0 +1,203 @@
+"""Patching changed keywords into the files they were read from.
+
+``DynaKeywordReader.patch()`` writes only the blocks of changed keywords:
+in place when they format to their old length or shorter (padded with ``$``
+lines), otherwise by rewriting the file from the first block that grows.
+
+Covers:
+- Nothing changed, one value changed in place, padding, growing blocks
+- ``pad=False``; CRLF files keep their line ends
+- The keywords afterwards: not ``modified``, spans and line numbers as read
+- Include files, and a block shared by two places
+- Falling back to ``write``: a file changed since reading, compressed files;
+  decks in memory are not patched
+"""
+
+import gzip
+import pytest
+import re
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core import block_patch
+from dynakw.core.block_patch import padding
+
+
+DECK = (
+    "*KEYWORD\n"
+    "*PARAMETER\n"
+    "R   TERM      10.0\n"
+    "*MAT_ELASTIC\n"
+    "$ steel\n"
+    "         1    7.85-9  210000.0       0.3\n"
+    "$ steel, as given by the supplier; E in MPa, density in tonne per cubic millimetre,\n"
+    "$ Poisson's ratio from the tensile tests of the second batch of sheets\n"
+    "*NODE\n"
+    "       1             0.0             0.0             0.0       0       0\n"
+    "*END\n"
+)
+
+
+@pytest.fixture
+def deck(tmp_path):
+    path = tmp_path / "deck.k"
+    path.write_text(DECK)
+    return path
+
+
+def _mat(dkr):
+    return dkr.find_keywords(KeywordType.MAT_ELASTIC)[0]
+
+
+def _places(dkr):
+    return [(kw._span[1:3], kw._start_line) for kw in dkr.keywords()]
+
+
+# ---------------------------------------------------------------------------
+# What is written
+# ---------------------------------------------------------------------------
+
+class TestPatch:
+
+    def test_nothing_changed(self, deck):
+        assert DynaKeywordReader(str(deck)).patch() == 0
+        assert deck.read_text() == DECK
+
+    def test_in_place(self, deck, monkeypatch):
+        dkr = DynaKeywordReader(str(deck))
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        copied = []
+        monkeypatch.setattr(block_patch, "_copy", lambda *args: copied.append(args))
+        assert dkr.patch() == 1
+        assert copied == []
+        text = deck.read_text()
+        assert len(text) == len(DECK)
+        assert text.startswith(DECK[:DECK.index("*MAT")])
+        assert text.endswith(DECK[DECK.index("*NODE"):])
+        assert _mat(DynaKeywordReader(str(deck))).cards['Card 1']['PR'][0] == 0.25
+
+    def test_growing_block(self, deck):
+        dkr = DynaKeywordReader(str(deck))
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.123456789
+        dkr.full_keyword = None
+        mat = _mat(dkr)
+        mat.cards['Card 1']['DA'] = mat.cards['Card 1']['RO'].copy()
+        assert dkr.patch() == 1
+        text = deck.read_text()
+        assert text.endswith(DECK[DECK.index("*NODE"):])
+        assert _mat(DynaKeywordReader(str(deck))).cards['Card 1']['PR'][0] == pytest.approx(0.1235)
+
+    def test_no_padding(self, deck):
+        dkr = DynaKeywordReader(str(deck))
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        assert dkr.patch(pad=False) == 1
+        text = deck.read_text()
+        assert not re.search(r"^\$ *$", text, re.M)
+        assert text.endswith(DECK[DECK.index("*NODE"):])
+
+    def test_crlf(self, tmp_path):
+        path = tmp_path / "deck.k"
+        path.write_bytes(DECK.replace("\n", "\r\n").encode())
+        dkr = DynaKeywordReader(str(path))
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        dkr.patch()
+        data = path.read_bytes()
+        assert b"\n" not in data.replace(b"\r\n", b"")
+        assert len(data) == len(DECK) + DECK.count("\n")
+
+    @pytest.mark.parametrize("newline", [b"\n", b"\r\n"])
+    @pytest.mark.parametrize("size", [3, 4, 80, 81, 82, 83, 200])
+    def test_padding(self, size, newline):
+        data = padding(size, newline)
+        assert len(data) == size
+        lines = data.split(newline)
+        assert lines[-1] == b""
+        assert all(line.startswith(b"$") and b"\n" not in line and len(line) < 80
+                   for line in lines[:-1])
+
+
+# ---------------------------------------------------------------------------
+# The keywords afterwards
+# ---------------------------------------------------------------------------
+
+class TestAfterwards:
+
+    @pytest.mark.parametrize("pad", [True, False])
+    def test_as_read(self, deck, pad):
+        dkr = DynaKeywordReader(str(deck))
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        dkr.patch(pad=pad)
+        assert not any(kw.modified for kw in dkr.keywords())
+        assert _places(dkr) == _places(DynaKeywordReader(str(deck)))
+        assert dkr.patch() == 0
+
+    def test_patched_twice(self, deck):
+        dkr = DynaKeywordReader(str(deck))
+        card = _mat(dkr).cards['Card 1']
+        card['PR'][0] = 0.25
+        dkr.patch(pad=False)
+        card['PR'][0] = 0.3
+        assert dkr.patch(pad=False) == 1
+        assert _mat(DynaKeywordReader(str(deck))).cards['Card 1']['PR'][0] == 0.3
+
+    def test_write_afterwards(self, deck, tmp_path):
+        dkr = DynaKeywordReader(str(deck))
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        dkr.patch(pad=False)
+        dkr.write(str(tmp_path / "out.k"))
+        assert (tmp_path / "out.k").read_text() == deck.read_text()
+
+    def test_lazy(self, deck):
+        dkr = DynaKeywordReader(str(deck), lazy=True)
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        dkr.patch(pad=False)
+        _, offset, length, _ = _mat(dkr)._span
+        assert _mat(dkr)._source == deck.read_bytes()[offset:offset + length]
+
+
+# ---------------------------------------------------------------------------
+# Include files
+# ---------------------------------------------------------------------------
+
+class TestIncludes:
+
+    def test_include_file(self, deck, tmp_path):
+        master = tmp_path / "master.k"
+        master.write_text("*KEYWORD\n*INCLUDE\ndeck.k\n*INCLUDE\ndeck.k\n*END\n")
+        dkr = DynaKeywordReader(str(master), follow_include=True)
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        assert dkr.patch(pad=False) == 1
+        assert master.read_text() == "*KEYWORD\n*INCLUDE\ndeck.k\n*INCLUDE\ndeck.k\n*END\n"
+        assert _mat(DynaKeywordReader(str(deck))).cards['Card 1']['PR'][0] == 0.25
+
+
+# ---------------------------------------------------------------------------
+# Writing whole instead
+# ---------------------------------------------------------------------------
+
+class TestWhole:
+
+    def test_file_changed(self, deck, caplog):
+        dkr = DynaKeywordReader(str(deck))
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        deck.write_text(DECK.replace("210000.0", "200000.0"))
+        caplog.set_level("INFO")
+        assert dkr.patch() == 1
+        assert "changed since it was read" in caplog.text
+        card = _mat(DynaKeywordReader(str(deck))).cards['Card 1']
+        assert card['PR'][0] == 0.25 and card['E'][0] == 210000.0
+
+    def test_compressed(self, tmp_path):
+        path = tmp_path / "deck.k.gz"
+        path.write_bytes(gzip.compress(DECK.encode()))
+        dkr = DynaKeywordReader(str(path))
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        assert dkr.patch() == 1
+        assert _mat(DynaKeywordReader(str(path))).cards['Card 1']['PR'][0] == 0.25
+
+    def test_memory(self, caplog):
+        dkr = DynaKeywordReader(DECK.encode())
+        _mat(dkr).cards['Card 1']['PR'][0] = 0.25
+        assert dkr.patch() == 0
+        assert "not read from a file" in caplog.text
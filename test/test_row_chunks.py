@@ -0,0 +1,171 @@
+"""Parsing the rows of one large card in chunks.
+
+Inside ``parallel_rows(executor)``, ``LineCodec.parse_columns`` splits a large
+repeating card into chunks of lines, parses them on the executor and joins the
+columns.  The reader does this for very large blocks when ``workers`` is set,
+so that a deck holding its whole mesh in one ``*NODE`` block still uses every
+worker.  The result has to be what parsing the card whole gives.
+
+Covers:
+- Agreement with whole-card parsing, including a ``&VAR`` in one chunk only,
+  blank fields in the other chunks, exponents without E and comma-separated
+  lines; text in a numeric column widened by a ``&VAR`` in another chunk
+- Thread and process executors; small cards are not split
+- ``*NODE``, basic ``*ELEMENT_SHELL`` and standard ``*ELEMENT_SOLID`` blocks
+- The reader sending a large block's rows to its workers
+"""
+
+import io
+import pytest
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader
+from dynakw.core import keyword_file
+from dynakw.core.parameter_ref import ParameterRef
+from dynakw.keywords.ELEMENT_SHELL import ElementShell
+from dynakw.keywords.ELEMENT_SOLID import ElementSolid
+from dynakw.keywords.NODE import Node
+from dynakw.utils.format_parser import FormatParser, parallel_rows
+
+
+NODE_TYPES = ["I", "F", "F", "F", "I", "I"]
+NODE_WIDTHS = [8, 16, 16, 16, 8, 8]
+
+
+def _node_line(i):
+    return f"{i:8d}{i * 0.5:16.6f}{-i * 0.25:16.6f}{1.0:16.6f}{0:8d}{0:8d}"
+
+
+def _assert_same(got, expected):
+    assert len(got) == len(expected)
+    for g, e in zip(got, expected):
+        assert g.dtype == e.dtype
+        assert list(g) == list(e)
+        assert [type(v) for v in g] == [type(v) for v in e]
+
+
+@pytest.fixture(scope="module")
+def threads():
+    with ThreadPoolExecutor(2) as executor:
+        yield executor
+
+
+# ---------------------------------------------------------------------------
+# LineCodec.parse_columns in chunks
+# ---------------------------------------------------------------------------
+
+class TestChunks:
+
+    LINES = [_node_line(i) for i in range(1, 40)]
+
+    @pytest.fixture
+    def codec(self):
+        return FormatParser().codec(NODE_TYPES, NODE_WIDTHS)
+
+    def test_plain(self, codec, threads):
+        with parallel_rows(threads, chunk_rows=7):
+            got = codec.parse_columns(self.LINES)
+        _assert_same(got, codec.parse_columns(self.LINES))
+
+    def test_text_rows_in_one_chunk(self, codec, threads):
+        lines = list(self.LINES)
+        lines[3] = "       4           &xpos             5.0             6.0"
+        lines[20] = "21, 1.0, 2.0, 3.0"
+        lines[30] = "      31         8.900-3             1.0            -2.5"
+        with parallel_rows(threads, chunk_rows=7):
+            got = codec.parse_columns(lines)
+        _assert_same(got, codec.parse_columns(lines))
+        assert got[1].dtype == object and got[1][3] == ParameterRef("xpos")
+
+    def test_blank_fields_beside_a_parameter(self, codec, threads):
+        lines = [_node_line(i) for i in range(1, 30)]
+        lines[2] = "       3           &xpos             5.0             6.0"
+        lines[20] = "      21                             5.0             6.0"
+        with parallel_rows(threads, chunk_rows=7):
+            got = codec.parse_columns(lines)
+        _assert_same(got, codec.rows_to_columns([codec.parse_line(line) for line in lines]))
+        assert type(got[1][20]) is int
+
+    def test_small_card_not_split(self, codec):
+        class NoExecutor:
+            def map(self, *args):
+                raise AssertionError("split")
+        with parallel_rows(NoExecutor(), chunk_rows=len(self.LINES)):
+            _assert_same(codec.parse_columns(self.LINES), codec.parse_columns(self.LINES))
+
+    def test_processes(self, codec):
+        with ProcessPoolExecutor(2) as executor, parallel_rows(executor, chunk_rows=10):
+            got = codec.parse_columns(self.LINES)
+        _assert_same(got, codec.parse_columns(self.LINES))
+
+    def test_text_beside_a_parameter(self, codec, threads):
+        lines = list(self.LINES)
+        lines[2] = "       3           &xpos             5.0             6.0"
+        lines[25] = "      26            text             5.0             6.0"
+        with parallel_rows(threads, chunk_rows=7):
+            got = codec.parse_columns(lines)
+        _assert_same(got, codec.rows_to_columns([codec.parse_line(line) for line in lines]))
+        assert got[1][25] == "text"
+
+    def test_error_propagates(self, codec, threads):
+        lines = list(self.LINES)
+        lines[25] = "foo bar baz"
+        with parallel_rows(threads, chunk_rows=7), pytest.raises(ValueError):
+            codec.parse_columns(lines)
+
+
+# ---------------------------------------------------------------------------
+# Keywords
+# ---------------------------------------------------------------------------
+
+def _shell_line(i):
+    return "".join(f"{v:8d}" for v in [i, 1, i, i + 1, i + 2, i + 3])
+
+
+def _solid_lines(i):
+    return [f"{i:8d}{1:8d}", "".join(f"{v:8d}" for v in range(i, i + 8))]
+
+
+class TestKeywords:
+
+    @pytest.mark.parametrize("cls, name, lines", [
+        (Node, "*NODE", [_node_line(i) for i in range(1, 30)]),
+        (ElementShell, "*ELEMENT_SHELL", [_shell_line(i) for i in range(1, 30)]),
+        (ElementSolid, "*ELEMENT_SOLID",
+         [line for i in range(1, 30) for line in _solid_lines(i)]),
+    ])
+    def test_same_cards(self, threads, cls, name, lines):
+        expected = cls(name, [name] + lines).cards
+        with parallel_rows(threads, chunk_rows=4):
+            got = cls(name, [name] + lines).cards
+        assert got.keys() == expected.keys()
+        for card in expected:
+            assert got[card].keys() == expected[card].keys()
+            _assert_same(list(got[card].values()), list(expected[card].values()))
+
+    def test_reader_splits_large_block(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(keyword_file, "_WORKER_BATCH_BYTES", 500)
+        monkeypatch.setattr(keyword_file, "_ROW_SPLIT_BYTES", 1000)
+        monkeypatch.setattr(keyword_file, "_ROW_CHUNK_LINES", 10)
+        used = []
+        def spy(executor, chunk_rows):
+            used.append(chunk_rows)
+            return parallel_rows(executor, chunk_rows)
+        monkeypatch.setattr(keyword_file, "parallel_rows", spy)
+
+        path = tmp_path / "mesh.k"
+        path.write_text("\n".join(
+            ["*KEYWORD", "*NODE"] + [_node_line(i) for i in range(1, 100)]
+            + ["*ELEMENT_SHELL"] + [_shell_line(i) for i in range(1, 50)]
+            + ["*END", ""]))
+
+        def read(**kwargs):
+            out = io.StringIO()
+            for kw in DynaKeywordReader(str(path), **kwargs).keywords():
+                kw.write_source(out)
+            return out.getvalue()
+
+        assert read(workers=2) == read()
+        assert used == [10, 10]
@@ -0,0 +1,174 @@
+"""Parsing only some keyword types.
+
+``DynaKeywordReader(..., only=[...])`` parses the keywords of the listed types
+and keeps every other block as it was read, without decoding it, as an
+``Unknown`` that writes the block back byte for byte.
+
+Covers:
+- Listed types are parsed, others are skipped and reported as ``UNKNOWN``
+- Skipped blocks write back byte-identical: comments, blanks, ``\\r\\n``
+- ``Unknown.skipped`` decodes its block only when ``raw_data`` is used
+- With ``lazy``, workers, includes, ``find_keywords`` and the sidecar cache
+- The parameter methods, which read selectively the same way
+"""
+
+import io
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.keywords.UNKNOWN import Unknown
+from dynakw.keywords import lsdyna_keyword
+
+
+NODE = "       1             0.5             0.0             0.0       0       0"
+
+DECK = (
+    "*KEYWORD\n"
+    "*PARAMETER\n"
+    "R   TERM     10.0\n"
+    "*NODE  \r\n"
+    "$ comment kept\r\n"
+    f"{NODE}   \r\n"
+    "\n"
+    "*PART\n"
+    "$ heading\n"
+    "part one\n"
+    "         1         1         1\n"
+    "*MADE_UP_KEYWORD\n"
+    "anything\n"
+    "*END\n"
+).encode()
+
+
+@pytest.fixture
+def deck(tmp_path):
+    path = tmp_path / "deck.k"
+    path.write_bytes(DECK)
+    return str(path)
+
+
+def _types(keywords):
+    return [kw.type for kw in keywords]
+
+
+# ---------------------------------------------------------------------------
+# What is parsed
+# ---------------------------------------------------------------------------
+
+class TestOnly:
+
+    def test_listed_types(self, deck):
+        keywords = list(DynaKeywordReader(deck, only=[KeywordType.PART]).keywords())
+        assert _types(keywords) == [KeywordType.UNKNOWN, KeywordType.UNKNOWN, KeywordType.UNKNOWN,
+                                    KeywordType.PART, KeywordType.UNKNOWN, KeywordType.UNKNOWN]
+        assert keywords[3].cards['Card 2']['PID'][0] == 1
+        assert keywords[2].full_keyword == "*NODE"
+
+    def test_same_as_full_reading(self, deck):
+        full = list(DynaKeywordReader(deck).keywords())
+        only = list(DynaKeywordReader(deck, only=[KeywordType.NODE, KeywordType.PART]).keywords())
+        for a, b in zip(full, only):
+            if b.type != KeywordType.UNKNOWN:
+                assert a.type == b.type
+                out_a, out_b = io.StringIO(), io.StringIO()
+                a.write(out_a)
+                b.write(out_b)
+                assert out_a.getvalue() == out_b.getvalue()
+
+    def test_empty(self, deck):
+        keywords = list(DynaKeywordReader(deck, only=[]).keywords())
+        assert set(_types(keywords)) == {KeywordType.UNKNOWN}
+
+    def test_skipped_are_not_decoded(self, deck, monkeypatch):
+        decoded = []
+        original = lsdyna_keyword.block_lines
+        monkeypatch.setattr(lsdyna_keyword, "block_lines",
+                            lambda block: decoded.append(block) or original(block))
+        keywords = list(DynaKeywordReader(deck, only=[KeywordType.PART], lazy=True).keywords())
+        keywords[3].cards
+        assert len(decoded) == 1
+
+
+# ---------------------------------------------------------------------------
+# Writing back
+# ---------------------------------------------------------------------------
+
+class TestWrite:
+
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_byte_identical(self, deck, tmp_path, lazy):
+        out = tmp_path / "out.k"
+        DynaKeywordReader(deck, only=[KeywordType.MAT_ELASTIC], lazy=lazy).write(str(out))
+        assert out.read_bytes() == DECK
+
+    def test_parsed_keywords_written_from_cards(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck, only=[KeywordType.PART])
+        part = dkr.find_keywords(KeywordType.PART)[0]
+        part.cards['Card 2']['MID'][0] = 7
+        out = tmp_path / "out.k"
+        dkr.write(str(out))
+        text = out.read_bytes()
+        assert b"*NODE  \r\n$ comment kept\r\n" in text
+        assert DynaKeywordReader(str(out)).find_keywords(KeywordType.PART)[0].cards['Card 2']['MID'][0] == 7
+
+
+# ---------------------------------------------------------------------------
+# Unknown.skipped
+# ---------------------------------------------------------------------------
+
+class TestSkipped:
+
+    def test_raw_data(self):
+        kw = Unknown.skipped("*NODE", b"*NODE\n$ c\n1\n")
+        assert not kw.materialized
+        assert kw.raw_data == "$ c\n1"
+        assert kw.cards == {}
+
+    def test_setting_raw_data(self):
+        kw = Unknown.skipped("*NODE", b"*NODE\n1\n")
+        kw.raw_data = "2"
+        out = io.StringIO()
+        kw.write_source(out)
+        assert out.getvalue() == "*NODE\n2\n"
+
+    def test_lines(self):
+        out = io.StringIO()
+        Unknown.skipped("*NODE", ["*NODE", "1"]).write_source(out)
+        assert out.getvalue() == "*NODE\n1\n"
+
+
+# ---------------------------------------------------------------------------
+# Other reading modes
+# ---------------------------------------------------------------------------
+
+class TestModes:
+
+    def test_workers(self, deck):
+        keywords = list(DynaKeywordReader(deck, only=[KeywordType.PART], workers=2).keywords())
+        assert _types(keywords)[3] == KeywordType.PART
+        assert _types(keywords)[2] == KeywordType.UNKNOWN
+
+    def test_find_keywords(self, deck):
+        dkr = DynaKeywordReader(deck, only=[KeywordType.PART])
+        assert len(dkr.find_keywords(KeywordType.PART)) == 1
+        assert dkr.find_keywords(KeywordType.NODE) == []
+
+    def test_includes(self, tmp_path):
+        (tmp_path / "mesh.k").write_bytes(b"*NODE\n" + NODE.encode() + b"\n")
+        master = tmp_path / "master.k"
+        master.write_bytes(b"*INCLUDE\nmesh.k\n" + DECK)
+        keywords = list(DynaKeywordReader(str(master), follow_include=True,
+                                          only=[KeywordType.NODE]).keywords())
+        assert _types(keywords).count(KeywordType.NODE) == 2
+
+    def test_cache_keyed_on_only(self, deck):
+        list(DynaKeywordReader(deck, cache=True, only=[KeywordType.PART]).keywords())
+        keywords = list(DynaKeywordReader(deck, cache=True).keywords())
+        assert KeywordType.NODE in _types(keywords)
+        keywords = list(DynaKeywordReader(deck, cache=True, only=[KeywordType.PART]).keywords())
+        assert KeywordType.NODE not in _types(keywords)
+
+    def test_parameters(self, deck):
+        assert DynaKeywordReader(deck).parameters() == {"TERM": 10.0}
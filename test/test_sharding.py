@@ -0,0 +1,207 @@
+"""Writing a deck as a master file and include files.
+
+``DynaKeywordReader.write(filename, shard=...)`` spreads the keywords over
+include files by a policy (see ``dynakw.core.deck_shards``) and writes a
+master that includes them.  Read back with ``follow_include``, the files give
+the keywords of the deck, in order.
+
+Covers:
+- ``"include"``: the layout the deck was read from, nested and repeated
+  includes, in place, in another directory, after using the cache
+- ``"type"``: a file per keyword family, ``*KEYWORD`` and ``*END`` kept
+- One ``*KEYWORD`` and one ``*END`` in the master, whatever the include files held
+- ``"part"``: keywords of several parts split, keywords without parts kept
+- A callable, unknown policies, compressed masters, workers
+- ``IncludeTree.includes``
+"""
+
+import gzip
+import os
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core.deck_shards import plan_shards
+from dynakw.core.include_tree import load_tree
+from conftest import node_line
+
+
+FILES = {
+    "mesh/shared.k": f"*NODE\n{node_line(100)}\n",
+    "mesh/a.k": f"*NODE\n{node_line(1)}\n*INCLUDE\nshared.k\n*NODE\n{node_line(2)}\n",
+    "mats.k": "*MAT_ELASTIC\n         1    7.85-9  210000.0       0.3\n",
+    "master.k": ("*KEYWORD\n"
+                 "*INCLUDE\nmesh/a.k\n"
+                 "*PART\npart one\n         1         1         1\n"
+                 "part two\n         2         1         1\n"
+                 "*INCLUDE\nmats.k\n"
+                 "*ELEMENT_SHELL\n"
+                 "       1       1       1       2     100     100\n"
+                 "       2       2       1       2     100     100\n"
+                 "       3       1       1       2     100     100\n"
+                 "*INCLUDE\nmesh/shared.k\n"
+                 "*END\n"),
+}
+
+
+@pytest.fixture
+def deck(tmp_path):
+    for name, text in FILES.items():
+        path = tmp_path / "in" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return str(tmp_path / "in" / "master.k")
+
+
+def _files(directory):
+    found = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            found[os.path.relpath(path, directory).replace(os.sep, "/")] = open(path).read()
+    return found
+
+
+# ---------------------------------------------------------------------------
+# The include layout the deck was read from
+# ---------------------------------------------------------------------------
+
+class TestInclude:
+
+    def test_other_directory(self, deck, tmp_path):
+        DynaKeywordReader(deck, follow_include=True).write(
+            str(tmp_path / "out" / "master.k"), shard="include")
+        assert _files(tmp_path / "out") == FILES
+
+    def test_in_place(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck, follow_include=True)
+        dkr.find_keywords(KeywordType.MAT_ELASTIC)[0].cards['Card 1']['PR'][0] = 0.25
+        dkr.write(deck, shard="include")
+        files = _files(tmp_path / "in")
+        assert set(files) == set(FILES)
+        assert files["mats.k"] != FILES["mats.k"]
+        assert {k: v for k, v in files.items() if k != "mats.k"} == {
+            k: v for k, v in FILES.items() if k != "mats.k"}
+        mat = DynaKeywordReader(str(tmp_path / "in" / "mats.k")).find_keywords(
+            KeywordType.MAT_ELASTIC)[0]
+        assert mat.cards['Card 1']['PR'][0] == 0.25
+
+    def test_cached(self, deck, tmp_path):
+        list(DynaKeywordReader(deck, follow_include=True, cache=True).keywords())
+        dkr = DynaKeywordReader(deck, follow_include=True, cache=True)
+        dkr.write(str(tmp_path / "out" / "master.k"), shard="include")
+        assert _files(tmp_path / "out") == FILES
+
+    def test_not_following_includes(self, deck, tmp_path):
+        DynaKeywordReader(deck).write(str(tmp_path / "out" / "master.k"), shard="include")
+        assert _files(tmp_path / "out") == {"master.k": FILES["master.k"]}
+
+    def test_includes(self, deck, tmp_path):
+        base = str(tmp_path / "in")
+        master, a, shared, mats = (os.path.join(base, name) for name in
+                                   ["master.k", "mesh/a.k", "mesh/shared.k", "mats.k"])
+        # Blocks: KEYWORD, NODE 1, NODE 100, NODE 2, PART, MAT, ELEMENT, NODE 100, END
+        assert load_tree(deck).includes == [(1, 4, master, a), (2, 3, a, shared),
+                                            (5, 6, master, mats), (7, 8, master, shared)]
+
+    def test_empty_include(self, tmp_path):
+        (tmp_path / "in").mkdir()
+        (tmp_path / "in" / "empty.k").write_text("$ nothing yet\n")
+        (tmp_path / "in" / "master.k").write_text("*KEYWORD\n*INCLUDE\nempty.k\n*END\n")
+        DynaKeywordReader(str(tmp_path / "in" / "master.k"), follow_include=True).write(
+            str(tmp_path / "out" / "master.k"), shard="include")
+        assert _files(tmp_path / "out") == {"master.k": "*KEYWORD\n*INCLUDE\nempty.k\n*END\n",
+                                            "empty.k": ""}
+
+
+# ---------------------------------------------------------------------------
+# New layouts
+# ---------------------------------------------------------------------------
+
+class TestPolicies:
+
+    def test_type(self, deck, tmp_path):
+        master = str(tmp_path / "out" / "model.k")
+        DynaKeywordReader(deck, follow_include=True).write(master, shard="type")
+        files = _files(tmp_path / "out")
+        assert sorted(files) == ["model.k", "model_element.k", "model_mat.k",
+                                 "model_node.k", "model_part.k"]
+        assert files["model.k"] == ("*KEYWORD\n*INCLUDE\nmodel_node.k\n*INCLUDE\nmodel_part.k\n"
+                                    "*INCLUDE\nmodel_mat.k\n*INCLUDE\nmodel_element.k\n*END\n")
+        assert files["model_node.k"].count("*NODE") == 4
+
+    def test_type_keeps_the_keywords(self, deck, tmp_path):
+        master = str(tmp_path / "out" / "model.k")
+        DynaKeywordReader(deck, follow_include=True).write(master, shard="type")
+        read = DynaKeywordReader(master, follow_include=True)
+        original = DynaKeywordReader(deck, follow_include=True)
+        assert sorted(kw.type.name for kw in read.keywords()) == sorted(
+            kw.type.name for kw in original.keywords())
+
+    @pytest.mark.parametrize("policy", ["type", "part"])
+    def test_one_end(self, tmp_path, policy):
+        (tmp_path / "in").mkdir()
+        (tmp_path / "in" / "mesh.k").write_text(
+            f"*KEYWORD\n*NODE\n{node_line(1)}\n*PART\npart\n         1         1         1\n*END\n")
+        (tmp_path / "in" / "master.k").write_text(
+            "*KEYWORD\n*INCLUDE\nmesh.k\n"
+            "*MAT_ELASTIC\n         1    7.85-9  210000.0       0.3\n*END\n")
+        master = str(tmp_path / "out" / "model.k")
+        DynaKeywordReader(str(tmp_path / "in" / "master.k"), follow_include=True).write(
+            master, shard=policy)
+        text = open(master).read()
+        assert text.startswith("*KEYWORD\n") and text.count("*KEYWORD") == 1
+        assert text.endswith("*END\n") and text.count("*END") == 1
+        read = DynaKeywordReader(master, follow_include=True)
+        assert {KeywordType.NODE, KeywordType.PART, KeywordType.MAT_ELASTIC} <= {
+            kw.type for kw in read.keywords()}
+
+    def test_part(self, deck, tmp_path):
+        master = str(tmp_path / "out" / "model.k")
+        DynaKeywordReader(deck, follow_include=True).write(master, shard="part")
+        files = _files(tmp_path / "out")
+        assert sorted(files) == ["model.k", "model_part1.k", "model_part2.k"]
+        one = DynaKeywordReader(str(tmp_path / "out" / "model_part1.k"))
+        assert list(one.find_keywords(KeywordType.PART)[0].cards['Card 2']['PID']) == [1]
+        assert list(one.find_keywords(KeywordType.ELEMENT_SHELL)[0].cards['Card 1']['EID']) == [1, 3]
+        two = DynaKeywordReader(str(tmp_path / "out" / "model_part2.k"))
+        assert list(two.find_keywords(KeywordType.ELEMENT_SHELL)[0].cards['Card 1']['EID']) == [2]
+        assert "*NODE" in files["model.k"] and "*MAT_ELASTIC" in files["model.k"]
+
+    def test_part_leaves_the_deck_alone(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck, follow_include=True)
+        dkr.write(str(tmp_path / "out" / "model.k"), shard="part")
+        shell = dkr.find_keywords(KeywordType.ELEMENT_SHELL)[0]
+        assert len(shell.cards['Card 1']['EID']) == 3
+        assert not shell.modified
+
+    def test_callable(self, deck, tmp_path):
+        master = str(tmp_path / "out" / "model.k")
+        DynaKeywordReader(deck, follow_include=True).write(
+            master, shard=lambda kw: "mesh/nodes.k" if kw.type == KeywordType.NODE else None)
+        files = _files(tmp_path / "out")
+        assert sorted(files) == ["mesh/nodes.k", "model.k"]
+        assert files["model.k"].startswith("*KEYWORD\n*INCLUDE\nmesh/nodes.k\n*PART\n")
+
+    def test_unknown_policy(self, deck, tmp_path):
+        with pytest.raises(ValueError, match="Unknown shard policy"):
+            DynaKeywordReader(deck).write(str(tmp_path / "out.k"), shard="size")
+
+    def test_compressed_master(self, deck, tmp_path):
+        master = str(tmp_path / "out" / "model.k.gz")
+        DynaKeywordReader(deck, follow_include=True).write(master, shard="type")
+        assert gzip.open(master, "rt").read().startswith("*KEYWORD\n*INCLUDE\nmodel_node.k.gz\n")
+        assert os.path.exists(str(tmp_path / "out" / "model_mat.k.gz"))
+
+    def test_workers(self, deck, tmp_path):
+        dkr = DynaKeywordReader(deck, follow_include=True)
+        dkr.write(str(tmp_path / "a" / "model.k"), shard="part", reformat=True)
+        dkr.write(str(tmp_path / "b" / "model.k"), shard="part", reformat=True, workers=2)
+        assert _files(tmp_path / "a") == _files(tmp_path / "b")
+
+    def test_plan(self, deck):
+        keywords = list(DynaKeywordReader(deck, follow_include=True).keywords())
+        files = plan_shards(keywords, "type", "model.k")
+        assert [path for path, _ in files] == ["model.k", "model_node.k", "model_part.k",
+                                               "model_mat.k", "model_element.k"]
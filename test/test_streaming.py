@@ -0,0 +1,104 @@
+"""Streaming iteration.
+
+``DynaKeywordReader.iter_keywords(retain=False)`` yields the keywords of a
+deck without keeping them, so that a deck can be scanned in memory that does
+not grow with its size.
+
+Covers:
+- The same keywords, in the same order and with the same line numbers, as
+  ``keywords()``; with includes, workers, lazy reading and a cache
+- Keywords are not kept by the reader, and can be freed as soon as the caller
+  lets go of them
+- Keywords already read are yielded as they are
+"""
+
+import gc
+import pytest
+import sys
+import weakref
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core import deck_cache
+from conftest import node_line, source_text
+
+
+@pytest.fixture
+def deck(tmp_path):
+    """Many small blocks, as in a deck with a *NODE block per part."""
+    lines = ["*KEYWORD"]
+    for part in range(200):
+        lines += ["*NODE", "$ part nodes"] + [node_line(n, n * 0.5)
+                                              for n in range(part * 5, part * 5 + 5)]
+    lines.append("*END")
+    path = tmp_path / "deck.k"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+# ---------------------------------------------------------------------------
+# Agreement with keywords()
+# ---------------------------------------------------------------------------
+
+class TestAgreement:
+
+    @pytest.mark.parametrize("kwargs", [{}, {"lazy": True}, {"memory_map": False},
+                                        {"workers": 2}])
+    def test_same_keywords(self, deck, kwargs):
+        streamed = list(DynaKeywordReader(deck, **kwargs).iter_keywords(retain=False))
+        retained = list(DynaKeywordReader(deck, **kwargs).keywords())
+        assert source_text(streamed) == source_text(retained)
+        assert [kw._start_line for kw in streamed] == [kw._start_line for kw in retained]
+
+    def test_includes(self, tmp_path):
+        (tmp_path / "mesh.k").write_text("*NODE\n" + node_line(1) + "\n")
+        master = tmp_path / "master.k"
+        master.write_text("*KEYWORD\n*INCLUDE mesh.k\n*END\n")
+        dkr = DynaKeywordReader(str(master), follow_include=True)
+        streamed = list(dkr.iter_keywords(retain=False))
+        assert streamed[1].type == KeywordType.NODE
+        assert len(streamed) == 3
+        assert streamed[1]._start_line == 1
+        assert dkr._include_files == []
+
+    def test_cache(self, deck):
+        list(DynaKeywordReader(deck, cache=True).keywords())
+        dkr = DynaKeywordReader(deck, cache=True)
+        assert source_text(dkr.iter_keywords(retain=False)) == source_text(DynaKeywordReader(deck).keywords())
+
+    def test_retain(self, deck):
+        dkr = DynaKeywordReader(deck)
+        assert len(list(dkr.iter_keywords())) == len(dkr._keywords) == 202
+
+
+# ---------------------------------------------------------------------------
+# Memory
+# ---------------------------------------------------------------------------
+
+class TestNotRetained:
+
+    def test_reader_keeps_nothing(self, deck):
+        dkr = DynaKeywordReader(deck, cache=True)
+        for _ in dkr.iter_keywords(retain=False):
+            pass
+        assert dkr._keywords == []
+        assert not dkr._fully_parsed
+        assert not dkr._cache_records
+        assert not deck_cache.load(deck, dkr._cache_options())
+
+    def test_keywords_are_freed(self, deck):
+        refs = []
+        for kw in DynaKeywordReader(deck).iter_keywords(retain=False):
+            refs.append(weakref.ref(kw))
+        del kw
+        gc.collect()
+        assert len(refs) == 202
+        assert all(ref() is None for ref in refs)
+
+    def test_already_read(self, deck):
+        dkr = DynaKeywordReader(deck)
+        node = dkr.keyword_at(1)
+        assert list(dkr.iter_keywords(retain=False))[1] is node
+
+        dkr._read_all()
+        assert list(dkr.iter_keywords(retain=False)) == dkr._keywords
@@ -0,0 +1,86 @@
+"""Parsing in worker processes.
+
+``DynaKeywordReader(..., workers=N)`` splits the file in this process and
+parses the blocks in a pool of N processes.  The keywords it yields must be
+those serial reading yields, in the same order.
+
+Covers:
+- Agreement with serial reading on the full files, in one batch and in many
+- Keywords already read through the index are kept
+- Caching, lazy reading and abandoning the iteration part way
+"""
+
+import glob
+import io
+import pytest
+import sys
+sys.path.append('.')
+
+from dynakw import DynaKeywordReader, KeywordType
+from dynakw.core import keyword_file
+
+
+def _read(path, **kwargs):
+    dkr = DynaKeywordReader(str(path), **kwargs)
+    keywords = list(dkr.keywords())
+    out = io.StringIO()
+    for kw in keywords:
+        kw.write_source(out)
+    return out.getvalue(), [kw._start_line for kw in keywords]
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    """One block per batch, so that many batches are in flight."""
+    monkeypatch.setattr(keyword_file, "_WORKER_BATCH_BYTES", 1)
+
+
+# ---------------------------------------------------------------------------
+# Agreement with serial reading
+# ---------------------------------------------------------------------------
+
+class TestAgreement:
+
+    @pytest.mark.parametrize("path", sorted(glob.glob("test/full_files/*.k")))
+    def test_full_files(self, path):
+        assert _read(path, workers=2) == _read(path)
+
+    def test_many_batches(self, small_batches):
+        path = "test/full_files/sample.k"
+        assert _read(path, workers=2) == _read(path)
+
+    def test_text_reading(self):
+        path = "test/full_files/sets.k"
+        assert _read(path, workers=2, memory_map=False) == _read(path)
+
+
+# ---------------------------------------------------------------------------
+# Interaction with the other reading modes
+# ---------------------------------------------------------------------------
+
+class TestModes:
+
+    def test_fetched_keyword_is_kept(self, small_batches):
+        dkr = DynaKeywordReader("test/full_files/sample.k", workers=2)
+        ordinal = next(b.ordinal for b in dkr.index() if b.type != KeywordType.UNKNOWN)
+        keyword = dkr.keyword_at(ordinal)
+        assert list(dkr.keywords())[ordinal] is keyword
+
+    def test_cache(self, tmp_path):
+        path = tmp_path / "deck.k"
+        path.write_bytes(open("test/full_files/sample.k", "rb").read())
+        first = _read(path, workers=2, cache=True)
+        assert _read(path, cache=True) == first
+
+    def test_lazy_parses_nothing(self):
+        dkr = DynaKeywordReader("test/full_files/sample.k", workers=2, lazy=True)
+        assert not any(kw.materialized for kw in dkr.keywords()
+                       if kw.type != KeywordType.UNKNOWN)
+
+    def test_abandoned_iteration(self, small_batches):
+        dkr = DynaKeywordReader("test/full_files/sample.k", workers=2)
+        keywords = dkr.keywords()
+        next(keywords)
+        keywords.close()
+        dkr._keyword_generator.close()
+        assert len(dkr._keywords) == 1